@@ -6,7 +6,12 @@ from flask import Flask, render_template, request, jsonify, flash, redirect, url
 import json
 import traceback
 from datetime import datetime
-from pipeline import HealthAssessmentPipeline
+from pipeline import HealthAssessmentPipeline, grid_health_report
+from feature_mapper import FeatureMapper
+from health_scorer import HealthScorer
+from input_schema import InputSchema, InputValidationError
+from models.imputer import load_imputer
+from models.risk_grid import load_risk_grid
 from user_interface import UserInterface
 from nutrition_analyzer import NutritionAnalyzer
 import os
@@ -31,6 +36,22 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # This prevents memory issues on Render's free tier (512MB limit)
 pipeline = None
 nutrition_analyzer = None
+risk_grid = None
+grid_feature_mapper = None
+
+# Imputer of the pipeline's feature mapper, unless IMPUTER points elsewhere
+DEFAULT_IMPUTER = 'saved_models/imputer.npz'
+
+# Validates and coerces every assessment input before any model work
+input_schema = InputSchema()
+
+def invalid_input(error):
+    """400 response listing the field-level errors of an InputValidationError"""
+    return jsonify({
+        'success': False,
+        'error': f'Invalid input: {error}',
+        'field_errors': error.errors
+    }), 400
 
 def get_pipeline():
     """Lazy load the pipeline only when needed"""
@@ -49,7 +70,22 @@ def get_pipeline():
         try:
             import time
             start_time = time.time()
-            pipeline = HealthAssessmentPipeline(train_models=False)
+            # Compiled flat-array forests skip sklearn's per-call overhead on
+            # single-row requests; set MODEL_ENGINE=sklearn to serve with sklearn
+            engine = os.getenv('MODEL_ENGINE', 'flat')
+            # A memory-mapped bundle of compiled forests (build_model_bundle.py) loads
+            # near-instantly and its pages are shared between workers; the pickles
+            # are used if it is absent or when serving with sklearn. The bundle's
+            # forests (flat or compact) take precedence over MODEL_ENGINE.
+            bundle_path = os.getenv('MODEL_BUNDLE', 'saved_models/models.bundle') if engine != 'sklearn' else None
+            # MODEL_WORKERS > 0 runs the four models of a request concurrently
+            max_workers = int(os.getenv('MODEL_WORKERS', '0'))
+            # Missing inputs are filled from the nearest training records once
+            # build_imputer.py has been run; otherwise constant defaults are used
+            imputer_path = os.getenv('IMPUTER', DEFAULT_IMPUTER)
+            pipeline = HealthAssessmentPipeline(train_models=False, engine=engine,
+                                                bundle_path=bundle_path, max_workers=max_workers,
+                                                imputer_path=imputer_path)
             load_time = time.time() - start_time
             print(f"✅ Pipeline loaded successfully in {load_time:.2f} seconds!")
         except Exception as e:
@@ -72,6 +108,36 @@ def get_nutrition_analyzer():
             raise
     return nutrition_analyzer
 
+def get_risk_grid():
+    """Lazy load the precomputed quick-check risk grid (None if it is not built or stale)"""
+    global risk_grid
+    if risk_grid is None:
+        # Built with build_risk_grid.py; serves quick checks without loading any model
+        grid_path = os.getenv('RISK_GRID', 'saved_models/risk_grid.npz')
+        try:
+            risk_grid = load_risk_grid(grid_path) or False
+        except Exception as e:
+            print(f"⚠️  Could not load risk grid: {e}")
+            risk_grid = False
+        if risk_grid:
+            print(f"✅ Risk grid loaded from {grid_path}")
+    return risk_grid or None
+
+def get_grid_feature_mapper():
+    """
+    Feature mapper for the feature_sets of grid-served reports: the pipeline's
+    if it is loaded, otherwise one with the same imputer (no models loaded)
+    """
+    global grid_feature_mapper
+    if pipeline is not None:
+        return pipeline.feature_mapper
+    if grid_feature_mapper is None:
+        grid_feature_mapper = FeatureMapper()
+        imputer = load_imputer(os.getenv('IMPUTER', DEFAULT_IMPUTER))
+        if imputer is not None:
+            grid_feature_mapper.use_imputer(imputer)
+    return grid_feature_mapper
+
 # Initialize WhatsApp handler (lightweight, can initialize now)
 try:
     init_whatsapp_handler(None)  # Pass None, will be set later
@@ -172,35 +238,30 @@ def api_assess():
         form_data = request.get_json() if request.is_json else request.form.to_dict()
         print(f"📝 Received form data with {len(form_data)} fields")
         
-        # Convert numeric fields
-        numeric_fields = [
-            'age', 'height', 'weight', 'systolic_bp', 'diastolic_bp', 'glucose', 
-            'cholesterol', 'ldl', 'hdl', 'triglycerides', 'resting_heart_rate', 
-            'max_heart_rate', 'sleep_hours', 'vegetable_consumption_frequency',
-            'num_main_meals', 'daily_water_consumption', 'pregnancies', 'insulin',
-            'chest_pain_type', 'physical_activity_frequency', 'tech_usage_time',
-            'skin_thickness', 'st_depression', 'slope_st_segment', 'num_major_vessels',
-            'thalassemia', 'resting_ecg'
-        ]
-        
-        user_data = {}
-        for key, value in form_data.items():
-            if key in numeric_fields:
-                try:
-                    user_data[key] = float(value) if value else None
-                except (ValueError, TypeError):
-                    user_data[key] = None
-            else:
-                user_data[key] = value if value else None
-        
-        # Remove None values to let the system use defaults
-        user_data = {k: v for k, v in user_data.items() if v is not None and v != ''}
+        # Coerce and range-check the inputs; blank fields are dropped so the
+        # models use their defaults
+        try:
+            user_data = input_schema.validate(form_data)
+        except InputValidationError as e:
+            print(f"⚠️  Rejected assessment input: {e}")
+            return invalid_input(e)
         
         print(f"🔍 Processing assessment for user data: {list(user_data.keys())}")
         
-        # Run assessment
-        print("🧠 Running health assessment...")
-        report = current_pipeline.assess_and_report(user_data)
+        # Run assessment. A resubmitted form only reruns the models whose
+        # inputs changed since the assessment stored in the session, unless
+        # that assessment came from other (e.g. retrained) models
+        previous = session.get('assessment_results', {}).get('report')
+        if previous and 'risk_scores' in previous and \
+                previous.get('model_version') == current_pipeline.model_version:
+            changed = {k: v for k, v in user_data.items() if previous['user_data'].get(k) != v}
+            changed.update({k: None for k in previous['user_data'] if k not in user_data})
+            print(f"🧠 Re-assessing {len(changed)} changed fields...")
+            report = current_pipeline.assess_delta(previous, changed)
+            current_pipeline.print_report(report)
+        else:
+            print("🧠 Running health assessment...")
+            report = current_pipeline.assess_and_report(user_data)
         print(f"✅ Assessment completed: {report.get('health_score', 'N/A')}")
         
         # Store results in session for results page
@@ -250,6 +311,157 @@ def api_assess():
             'error': f'Assessment failed: {str(e)}'
         }), 500
 
+@app.route('/api/quick-assess', methods=['POST'])
+def api_quick_assess():
+    """API endpoint for the quick health check, served from the precomputed risk grid"""
+    try:
+        form_data = request.get_json() if request.is_json else request.form.to_dict()
+        
+        quick_fields = ['age', 'height', 'weight', 'systolic_bp', 'diastolic_bp', 'glucose', 'cholesterol']
+        try:
+            user_data = input_schema.validate({key: form_data.get(key) for key in quick_fields + ['gender']},
+                                              required=quick_fields)
+        except InputValidationError as e:
+            return invalid_input(e)
+        user_data.setdefault('gender', 'Male')
+        
+        grid = get_risk_grid()
+        scorer = HealthScorer()
+        # Scores within the grid's interpolation error of a risk level edge are assessed live
+        scores = grid.lookup(user_data, scorer.risk_thresholds.values()) if grid is not None else None
+        if scores is not None:
+            report = grid_health_report(scores, user_data, get_grid_feature_mapper(), scorer)
+        else:
+            report = get_pipeline().assess_health(user_data, verbose=False, tier='quick')
+        
+        session['assessment_results'] = {
+            'report': report,
+            'user_data': user_data,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        return jsonify({
+            'success': True,
+            'report': report,
+            'redirect_url': '/results'
+        })
+        
+    except Exception as e:
+        print(f"❌ Error during quick assessment: {e}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Quick assessment failed: {str(e)}'
+        }), 500
+
+# Largest sweep /api/what-if evaluates in one request
+MAX_WHAT_IF_POINTS = 200
+
+@app.route('/api/what-if', methods=['POST'])
+def api_what_if():
+    """
+    Risk curves for a sweep of one input, e.g. systolic BP from 120 to 160
+    
+    JSON body: 'field' plus either 'values' (list) or 'start', 'stop' and
+    'steps' (evenly spaced numbers). 'user_data' defaults to the inputs of the
+    last assessment in the session.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            user_data = input_schema.validate(data['user_data']) if data.get('user_data') else \
+                session.get('assessment_results', {}).get('user_data')
+        except InputValidationError as e:
+            return invalid_input(e)
+        if not user_data:
+            return jsonify({'success': False, 'error': 'No user data given and no assessment in session'}), 400
+        
+        current_pipeline = get_pipeline()
+        field = data.get('field')
+        known_fields = set().union(*current_pipeline.feature_mapper.dependencies.values())
+        if field not in known_fields:
+            return jsonify({'success': False, 'error': f'Unknown field: {field}'}), 400
+        
+        try:
+            if 'values' in data:
+                values = list(data['values'])
+            else:
+                steps = int(data.get('steps', 20))
+                start, stop = float(data['start']), float(data['stop'])
+                values = [start + (stop - start) * i / max(steps - 1, 1) for i in range(steps)]
+        except (KeyError, ValueError, TypeError):
+            return jsonify({'success': False, 'error': "Give 'values' or numeric 'start', 'stop' and 'steps'"}), 400
+        if not 0 < len(values) <= MAX_WHAT_IF_POINTS:
+            return jsonify({'success': False, 'error': f'Between 1 and {MAX_WHAT_IF_POINTS} values are allowed'}), 400
+        try:
+            values = [input_schema.coerce(field, value) for value in values]
+        except ValueError as e:
+            return invalid_input(InputValidationError({field: str(e)}))
+        
+        curves = current_pipeline.sensitivity(user_data, field, values)
+        return jsonify({'success': True, **curves})
+        
+    except Exception as e:
+        print(f"❌ Error during what-if analysis: {e}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'What-if analysis failed: {str(e)}'
+        }), 500
+
+# Years shown in the risk outlook of the results page and the PDF report
+OUTLOOK_YEARS = (0, 1, 3, 5, 10)
+# Furthest year /api/projection projects
+MAX_PROJECTION_YEARS = 50
+
+def risk_outlook(user_data):
+    """Risk trajectory over OUTLOOK_YEARS, or None if it cannot be projected"""
+    if not user_data or user_data.get('age') is None:
+        return None
+    try:
+        return get_pipeline().project(user_data, years=OUTLOOK_YEARS)
+    except Exception as e:
+        print(f"⚠️  Could not project risks: {e}")
+        return None
+
+@app.route('/api/projection', methods=['POST'])
+def api_projection():
+    """
+    Per-year risk trajectories if nothing but age changes
+    
+    JSON body: optional 'years' (list, default 1 to 10) and 'user_data'
+    (defaults to the inputs of the last assessment in the session).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            user_data = input_schema.validate(data['user_data']) if data.get('user_data') else \
+                session.get('assessment_results', {}).get('user_data')
+        except InputValidationError as e:
+            return invalid_input(e)
+        if not user_data:
+            return jsonify({'success': False, 'error': 'No user data given and no assessment in session'}), 400
+        if user_data.get('age') is None:
+            return jsonify({'success': False, 'error': 'Projecting risks needs an age'}), 400
+        
+        try:
+            years = [int(year) for year in data.get('years', range(1, 11))]
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': "'years' must be a list of whole years"}), 400
+        if not years or not all(0 <= year <= MAX_PROJECTION_YEARS for year in years):
+            return jsonify({'success': False, 'error': f'Years must be between 0 and {MAX_PROJECTION_YEARS}'}), 400
+        
+        trajectory = get_pipeline().project(user_data, years=years)
+        return jsonify({'success': True, **trajectory})
+        
+    except Exception as e:
+        print(f"❌ Error during risk projection: {e}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Risk projection failed: {str(e)}'
+        }), 500
+
 @app.route('/api/sample-assessment')
 def api_sample_assessment():
     """API endpoint for sample patient assessment"""
@@ -389,11 +601,21 @@ def generate_health_plan():
         obesity_risk = health_scores.get('obesity_risk', 0)
         overall_score = health_scores.get('health_score', 0)
         
+        # What raises each risk most, from the assessment stored in the session
+        individual_risks = (session.get('assessment_results', {}).get('report') or {}).get('individual_risks', {})
+        driver_labels = {'diabetes': 'DM', 'heart_disease': 'Heart', 'hypertension': 'HTN', 'obesity': 'Obesity'}
+        drivers = []
+        for key, label in driver_labels.items():
+            raising = [d for d in individual_risks.get(key, {}).get('drivers', []) if d['contribution'] > 0][:3]
+            if raising:
+                drivers.append(f"{label} " + ", ".join(f"{d['feature']} +{d['contribution']:.0f}" for d in raising))
+        drivers_line = f"\nRisk drivers (points added): {'; '.join(drivers)}" if drivers else ""
+        
         # Build optimized prompt (token-efficient)
         prompt = f"""Create 7-day health plan for:
 Age {age}, {gender}, BMI {bmi}, BP {bp}, Glucose {glucose}, Chol {cholesterol}
 Smoking: {smoking}, Alcohol: {alcohol}, Activity: {activity}
-Risks: DM {diabetes_risk:.0f}%, Heart {heart_risk:.0f}%, HTN {hypertension_risk:.0f}%, Obesity {obesity_risk:.0f}%
+Risks: DM {diabetes_risk:.0f}%, Heart {heart_risk:.0f}%, HTN {hypertension_risk:.0f}%, Obesity {obesity_risk:.0f}%{drivers_line}
 Overall Score: {overall_score:.0f}/100
 
 Format: Day 1-7, each with:
@@ -402,7 +624,7 @@ Format: Day 1-7, each with:
 - Exercise (10-15min, realistic)
 - One measurable goal
 
-Make it actionable, personalized, encouraging. Focus on highest risks."""
+Make it actionable, personalized, encouraging. Focus on highest risks and their drivers."""
         
         # Try multiple Gemini models with fallback
         models_to_try = [
@@ -737,6 +959,36 @@ def download_health_plan_pdf():
                 story.append(scores_table)
                 story.append(Spacer(1, 0.25*inch))
         
+        # ===== RISK OUTLOOK TABLE =====
+        outlook = risk_outlook(user_data)
+        if outlook:
+            story.append(Paragraph("RISK OUTLOOK IF NOTHING CHANGES", section_header_style))
+            
+            outlook_data = [['Condition'] + ['Now' if year == 0 else f"+{year} yr" for year in outlook['years']]]
+            for key, risks in outlook['risks'].items():
+                outlook_data.append([key.replace('_', ' ').title()] + [f"{risk:.0f}%" for risk in risks])
+            outlook_data.append(['Health Score'] + [f"{score:.0f} ({grade})" for score, grade in
+                                                    zip(outlook['health_score'], outlook['health_grade'])])
+            
+            year_width = 5 * inch / len(outlook['years'])
+            outlook_table = Table(outlook_data, colWidths=[2*inch] + [year_width] * len(outlook['years']))
+            outlook_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), ACCENT_BLUE),
+                ('TEXTCOLOR', (0, 0), (-1, 0), white),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+                ('GRID', (0, 0), (-1, -1), 0.5, BORDER_COLOR),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [white, SECTION_BG]),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ]))
+            
+            story.append(outlook_table)
+            story.append(Spacer(1, 0.25*inch))
+        
         # ===== HEALTH PLAN CONTENT =====
         story.append(Paragraph("DETAILED HEALTH PLAN", section_header_style))
         story.append(Spacer(1, 0.1*inch))
@@ -958,7 +1210,8 @@ def results():
     
     return render_template('results.html', 
                          has_results=True, 
-                         assessment_data=report)
+                         assessment_data=report,
+                         outlook=risk_outlook(assessment_results.get('user_data')))
 
 @app.route('/login')
 def login():    
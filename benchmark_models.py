@@ -0,0 +1,1188 @@
+"""
+Model Inference Benchmarks
+Measures latency of the model wrappers and checks that optimized paths match sklearn
+
+Usage:
+    python benchmark_models.py            # run all benchmarks
+    python benchmark_models.py fused      # run one benchmark by name
+"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from models.diabetes_model import DiabetesModel
+from models.heart_model import HeartModel
+from models.hypertension_model import HypertensionModel
+from models.obesity_model import ObesityModel
+from models.inference import forest_predict
+from models.forest_engine import FlatForest, CompactForest
+from models.pruning import load_holdout, score_probabilities
+from models.quick_models import create_quick_models
+from feature_mapper import FeatureMapper
+from health_scorer import HealthScorer
+
+# Loading pickles trained on DataFrames and predicting on arrays triggers
+# sklearn feature-name warnings on every call; they only add noise here
+warnings.filterwarnings('ignore', category=UserWarning)
+
+DATASETS = {
+    'diabetes': ('dataset/diabetes.csv', 'Outcome'),
+    'heart': ('dataset/heart.csv', 'target'),
+    'hypertension': ('dataset/hypertension_dataset.csv', 'Hypertension'),
+    'obesity': ('dataset/obesity.csv', 'NObeyesdad'),
+}
+
+SAMPLE_USER = {
+    'age': 52, 'gender': 'Male', 'height': 178, 'weight': 92,
+    'systolic_bp': 142, 'diastolic_bp': 92, 'glucose': 126, 'cholesterol': 245,
+    'ldl': 155, 'hdl': 42, 'triglycerides': 195, 'resting_heart_rate': 78,
+    'max_heart_rate': 145, 'smoking_status': 'Former', 'alcohol_intake': 'Moderate',
+    'physical_activity': 'Low', 'sleep_hours': 5.5, 'stress_level': 'High',
+    'family_history_diabetes': 'yes', 'family_history_hypertension': 'Yes',
+    'insulin': 95, 'chest_pain_type': 1
+}
+
+# What the quick assessment collects
+QUICK_USER = {
+    'age': 52, 'gender': 'Male', 'height': 178, 'weight': 92,
+    'systolic_bp': 142, 'diastolic_bp': 92, 'glucose': 126, 'cholesterol': 245
+}
+
+
+def synthetic_patients(n_patients, seed=0, quick_share=0.3):
+    """
+    Random patients as a DataFrame of user_data columns
+
+    A quick_share of them only carry quick-check fields (NaN elsewhere), the
+    rest fill in the detailed fields as well.
+    """
+    rng = np.random.default_rng(seed)
+    height = rng.integers(145, 200, n_patients)
+    patients = pd.DataFrame({
+        'age': rng.integers(18, 86, n_patients),
+        'gender': rng.choice(['Male', 'Female'], n_patients),
+        'height': height,
+        'weight': np.round(rng.uniform(17, 42, n_patients) * (height / 100) ** 2),
+        'systolic_bp': rng.integers(95, 190, n_patients),
+        'diastolic_bp': rng.integers(60, 115, n_patients),
+        'glucose': rng.integers(70, 200, n_patients),
+        'cholesterol': rng.integers(140, 320, n_patients),
+        'ldl': rng.integers(60, 200, n_patients),
+        'hdl': rng.integers(30, 80, n_patients),
+        'triglycerides': rng.integers(60, 300, n_patients),
+        'resting_heart_rate': rng.integers(50, 100, n_patients),
+        'max_heart_rate': rng.integers(100, 200, n_patients),
+        'smoking_status': rng.choice(['Never', 'Former', 'Current'], n_patients),
+        'alcohol_intake': rng.choice(['None', 'Moderate', 'Heavy'], n_patients),
+        'physical_activity': rng.choice(['Low', 'Moderate', 'High'], n_patients),
+        'sleep_hours': np.round(rng.uniform(4, 9, n_patients), 1),
+        'stress_level': rng.choice(['Low', 'Moderate', 'High'], n_patients),
+        'family_history_diabetes': rng.choice(['yes', 'no'], n_patients),
+        'family_history_hypertension': rng.choice(['Yes', 'No'], n_patients),
+        'insulin': rng.integers(20, 250, n_patients),
+        'chest_pain_type': rng.integers(0, 4, n_patients),
+    })
+    quick = rng.random(n_patients) < quick_share
+    detailed = [column for column in patients.columns if column not in QUICK_USER]
+    patients.loc[quick, detailed] = np.nan
+    return patients
+
+
+def print_header(text):
+    """Print formatted header"""
+    print("\n" + "="*70)
+    print(f"  {text}")
+    print("="*70)
+
+
+def time_call(func, repeats=200):
+    """Return the median wall time of func() in microseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def process_memory():
+    """Resident memory of this process in MB: total, private (anon) and file-backed"""
+    memory = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                    memory[key] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        # Peak RSS only (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory['VmRSS'] = peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return memory
+
+
+def load_models():
+    """Load every saved model wrapper, skipping models that are not available"""
+    wrappers = {
+        'diabetes': DiabetesModel(),
+        'heart': HeartModel(),
+        'hypertension': HypertensionModel(),
+        'obesity': ObesityModel(),
+    }
+    loaded = {}
+    for name, wrapper in wrappers.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = wrapper.load_model()
+        if ok:
+            loaded[name] = wrapper
+        else:
+            print(f"⚠️  {name} model not found - run train_all_models.py first")
+    return loaded
+
+
+def sample_features():
+    """Model feature dicts for the sample patient"""
+    return FeatureMapper().get_all_features(SAMPLE_USER)
+
+
+def load_dataset_matrix(name, wrapper):
+    """Encoded feature matrix of a model's full training dataset, or None if missing"""
+    path, target = DATASETS[name]
+    if not os.path.exists(path):
+        print(f"⚠️  {path} not found - skipping {name}")
+        return None
+    X = pd.read_csv(path).drop(target, axis=1)
+    if name in ('diabetes', 'heart'):
+        return X[wrapper.feature_names].to_numpy(dtype=float)
+    return wrapper._encode_batch(X)
+
+
+def encoded_sample(name, wrapper, features):
+    """Encoded 1-row feature array for a model, as fed to the forest"""
+    if name in ('diabetes', 'heart'):
+        return np.array([[features[col] for col in wrapper.feature_names]], dtype=float)
+    return wrapper._encode_batch([features])
+
+
+def bench_batch():
+    """Batched get_risk_scores vs a Python loop over get_risk_score"""
+    print_header("BATCH SCORING (predict_batch / get_risk_scores)")
+    models = load_models()
+    rows = [sample_features()] * 500
+
+    for name, wrapper in models.items():
+        model_rows = [features[name] for features in rows]
+        loop_us = time_call(lambda: [wrapper.get_risk_score(r) for r in model_rows], repeats=3)
+        batch_us = time_call(lambda: wrapper.get_risk_scores(model_rows), repeats=20)
+        print(f"  {name:<13} 500 rows: loop {loop_us/1000:8.1f} ms | "
+              f"batch {batch_us/1000:6.1f} ms | {loop_us/batch_us:6.1f}x")
+
+
+def bench_fused():
+    """Fused single traversal vs predict() followed by predict_proba()"""
+    print_header("FUSED INFERENCE (one traversal vs predict + predict_proba)")
+    models = load_models()
+    features = sample_features()
+
+    total_old = total_new = 0.0
+    all_match = True
+    for name, wrapper in models.items():
+        X = encoded_sample(name, wrapper, features[name])
+
+        def two_pass():
+            wrapper.model.predict(X)
+            wrapper.model.predict_proba(X)
+
+        old_us = time_call(two_pass)
+        new_us = time_call(lambda: forest_predict(wrapper.model, X))
+        total_old += old_us
+        total_new += new_us
+
+        result = forest_predict(wrapper.model, X)
+        match = (np.array_equal(result.probabilities, wrapper.model.predict_proba(X))
+                 and np.array_equal(result.classes, wrapper.model.predict(X)))
+        all_match = all_match and match
+        print(f"  {'✅' if match else '❌'} {name:<13} {old_us:8.0f} µs -> {new_us:7.0f} µs "
+              f"({old_us/new_us:4.1f}x)  vote spread {result.spread.max():.3f}")
+
+    print(f"\n  Per-assessment model latency: {total_old/1000:.2f} ms -> "
+          f"{total_new/1000:.2f} ms ({total_old/total_new:.1f}x)")
+    return all_match
+
+
+def bench_flat():
+    """Compiled flat-array engine: parity with sklearn over dataset/*.csv and latency"""
+    print_header("FLAT FOREST ENGINE (parity over dataset/*.csv + latency)")
+    models = load_models()
+    features = sample_features()
+
+    all_match = True
+    for name, wrapper in models.items():
+        compiled = FlatForest.from_sklearn(wrapper.model)
+
+        X_all = load_dataset_matrix(name, wrapper)
+        if X_all is not None:
+            result = compiled.predict(X_all)
+            match = (np.array_equal(result.probabilities, wrapper.model.predict_proba(X_all))
+                     and np.array_equal(result.classes, wrapper.model.predict(X_all)))
+            all_match = all_match and match
+            status = "bit-identical to predict_proba" if match else "DIFFERS from predict_proba"
+            print(f"  {'✅' if match else '❌'} {name:<13} {len(X_all)} rows {status}")
+
+        X = encoded_sample(name, wrapper, features[name])
+        sklearn_us = time_call(lambda: wrapper.model.predict_proba(X))
+        fused_us = time_call(lambda: forest_predict(wrapper.model, X))
+        flat_us = time_call(lambda: compiled.predict(X))
+        print(f"     1 row: predict_proba {sklearn_us:6.0f} µs | fused {fused_us:5.0f} µs | "
+              f"flat {flat_us:5.0f} µs ({compiled.n_trees} trees, depth {compiled.max_depth}, "
+              f"{compiled.nbytes / 1024:.0f} KB)")
+
+    return all_match
+
+
+def sklearn_forest_nbytes(model):
+    """Memory held by the node and value arrays of a fitted sklearn forest"""
+    return sum(estimator.tree_.__getstate__()['nodes'].nbytes + estimator.tree_.value.nbytes
+               for estimator in model.estimators_)
+
+
+def bench_compact():
+    """Quantized CompactForest: memory saved and probability deviation per model"""
+    print_header("COMPACT FOREST (memory + max probability deviation over dataset/*.csv)")
+    models = load_models()
+    features = sample_features()
+
+    all_match = True
+    for name, wrapper in models.items():
+        flat = FlatForest.from_sklearn(wrapper.model)
+        sklearn_kb = sklearn_forest_nbytes(wrapper.model) / 1024
+        print(f"  {name:<13} sklearn {sklearn_kb:6.0f} KB | flat {flat.nbytes / 1024:6.0f} KB")
+
+        X_all = load_dataset_matrix(name, wrapper)
+        X = encoded_sample(name, wrapper, features[name])
+        for leaf_bits in (16, 8):
+            compact = CompactForest.from_flat(flat, leaf_bits)
+            line = (f"     {leaf_bits:>2}-bit leaves {compact.nbytes / 1024:6.0f} KB "
+                    f"(-{1 - compact.nbytes / (sklearn_kb * 1024):.0%} vs sklearn)")
+            if X_all is not None:
+                # Splits are exact, so only leaf quantization can move probabilities
+                routed = np.array_equal(compact.apply(X_all), flat.apply(X_all))
+                deviation = np.abs(compact.predict_proba(X_all) - wrapper.model.predict_proba(X_all)).max()
+                all_match = all_match and routed and deviation <= 0.5 / compact.value_scale
+                line += (f" | {'✅' if routed else '❌'} max |Δp| {deviation:.2e} "
+                         f"(bound {0.5 / compact.value_scale:.1e})")
+            line += f" | 1 row {time_call(lambda: compact.predict(X)):4.0f} µs"
+            print(line)
+
+    return all_match
+
+
+def bench_encode():
+    """Fitted CategoricalEncoder vs per-request get_dummies + column alignment"""
+    print_header("CATEGORICAL ENCODER (parity with training get_dummies + latency)")
+    models = load_models()
+    features = sample_features()
+
+    all_match = True
+    for name in ('hypertension', 'obesity'):
+        if name not in models:
+            continue
+        wrapper = models[name]
+        path, target = DATASETS[name]
+        if os.path.exists(path):
+            X = pd.read_csv(path).drop(target, axis=1)
+            expected = pd.get_dummies(X, drop_first=True).reindex(
+                columns=wrapper.encoded_columns, fill_value=0).to_numpy(dtype=float)
+            match = np.array_equal(wrapper.encoder.transform(X), expected)
+            all_match = all_match and match
+            status = "matches" if match else "DIFFERS from"
+            print(f"  {'✅' if match else '❌'} {name:<13} {len(X)} rows {status} training get_dummies")
+
+        row = features[name]
+
+        def get_dummies_row():
+            feature_df = pd.get_dummies(pd.DataFrame([row]), drop_first=True)
+            return feature_df.reindex(columns=wrapper.encoded_columns, fill_value=0)
+
+        old_us = time_call(get_dummies_row)
+        new_us = time_call(lambda: wrapper.encoder.transform(row))
+        print(f"     1 row: get_dummies {old_us:6.0f} µs | encoder {new_us:5.0f} µs "
+              f"({old_us/new_us:.0f}x)")
+
+    return all_match
+
+
+def load_dataset_rows(name, max_rows=None):
+    """Raw feature rows of a model's training dataset, or None if missing"""
+    path, target = DATASETS[name]
+    if not os.path.exists(path):
+        print(f"⚠️  {path} not found - skipping {name}")
+        return None
+    return pd.read_csv(path, nrows=max_rows).drop(target, axis=1)
+
+
+def bench_anytime():
+    """Early-exit evaluation: trees evaluated, level agreement and latency saved"""
+    print_header("ANYTIME EVALUATION (early exit once the risk level is decided)")
+    models = load_models()
+    scorer = HealthScorer()
+    bands = (scorer.risk_thresholds, scorer.risk_levels)
+
+    all_match = True
+    for name, wrapper in models.items():
+        rows = load_dataset_rows(name, max_rows=2000)
+        if rows is None:
+            continue
+        full_scores = wrapper.get_risk_scores(rows)
+        full_levels = np.array([scorer.get_risk_level(score) for score in full_scores])
+        full_ms = time_call(lambda: wrapper.get_risk_scores(rows), repeats=5) / 1000
+        print(f"  {name} ({len(rows)} rows, {wrapper._anytime_forest().n_trees} trees, "
+              f"batch get_risk_scores {full_ms:.1f} ms)")
+
+        sample = rows.iloc[:100].to_dict('records')
+        single_us = np.median([time_call(lambda: wrapper.get_risk_score(row), repeats=5) for row in sample])
+        for confidence in (1.0, 0.95):
+            result = wrapper.anytime_risks(rows, *bands, confidence=confidence)
+            agreement = (result.level == full_levels).mean()
+            bounded = ((full_scores >= result.low) & (full_scores <= result.high)).mean()
+            if confidence == 1.0:
+                all_match = all_match and agreement == 1 and bounded == 1
+            batch_ms = time_call(lambda: wrapper.anytime_risks(rows, *bands, confidence=confidence), repeats=5) / 1000
+            anytime_us = np.median([time_call(lambda: wrapper.anytime_risk(row, *bands, confidence=confidence), repeats=5)
+                                    for row in sample])
+            print(f"     confidence {confidence:.2f}: {result.trees.mean():5.1f} trees avg | "
+                  f"level agreement {agreement:.2%} | score in bounds {bounded:.2%} | "
+                  f"batch {batch_ms:6.1f} ms | 1 row {anytime_us:5.0f} µs vs {single_us:5.0f} µs full")
+
+    return all_match
+
+
+def bench_quick():
+    """Quick-check tier vs full models: size, held-out accuracy and latency"""
+    print_header("QUICK-CHECK TIER (quick-field models vs full models)")
+    models = load_models()
+    quick_models = create_quick_models()
+    features = FeatureMapper().get_all_features(QUICK_USER)
+
+    for name, quick in quick_models.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = quick.load_model()
+        if not ok:
+            print(f"  ⚠️  {name} quick model not found - run train_all_models.py --tier quick")
+            continue
+        tiers = [('full', models[name])] if name in models else []
+        tiers.append(('quick', quick))
+
+        print(f"  {name}")
+        for tier, wrapper in tiers:
+            X_test, y_test = load_holdout(name, wrapper)
+            probabilities = forest_predict(wrapper.model, X_test).probabilities
+            accuracy = score_probabilities('accuracy', y_test, probabilities, wrapper.model.classes_)
+            nodes = sum(estimator.tree_.node_count for estimator in wrapper.model.estimators_)
+            risk_us = time_call(lambda: wrapper.get_risk_score(features[name]))
+            print(f"     {tier:<5} {len(wrapper.feature_names):>2} inputs, {len(wrapper.model.estimators_):>3} trees, "
+                  f"{nodes:>6} nodes | accuracy {accuracy:.4f} | get_risk_score {risk_us:6.0f} µs")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from pipeline import HealthAssessmentPipeline
+        pipeline = HealthAssessmentPipeline()
+    print()
+    for tier in ('full', 'quick'):
+        assess_us = time_call(lambda: pipeline.assess_health(QUICK_USER, verbose=False, tier=tier), repeats=50)
+        print(f"  assess_health ({tier:<5} tier) {assess_us / 1000:6.2f} ms")
+    routed = pipeline.assess_health(QUICK_USER, verbose=False)['model_tier']
+    detailed = pipeline.assess_health(SAMPLE_USER, verbose=False)['model_tier']
+    match = routed == 'quick' and detailed == 'full'
+    print(f"  {'✅' if match else '❌'} Routing: quick-field input -> {routed}, detailed input -> {detailed}")
+    return match
+
+
+def bench_population():
+    """Vectorized batch_assess: parity with assess_health and patients per minute"""
+    print_header("POPULATION BATCH (batch_assess vs assess_health per user)")
+    with contextlib.redirect_stdout(io.StringIO()):
+        from pipeline import HealthAssessmentPipeline
+        pipeline = HealthAssessmentPipeline(engine='flat')
+
+    sample = synthetic_patients(500, seed=1)
+    users = [{key: value for key, value in row.items() if pd.notna(value)}
+             for row in sample.to_dict('records')]
+    reports = pipeline.batch_assess(users, verbose=False).reports
+    keys = ('individual_risks', 'composite_risk', 'health_score', 'risk_level', 'health_grade',
+            'recommendations', 'model_tier')
+    matches = sum(all(report[key] == reference[key] for key in keys)
+                  for report, reference in zip(reports, (pipeline.assess_health(user, verbose=False)
+                                                         for user in users)))
+    match = matches == len(users)
+    print(f"  {'✅' if match else '❌'} Parity with assess_health: {matches}/{len(users)} reports identical")
+
+    single_us = time_call(lambda: pipeline.assess_health(SAMPLE_USER, verbose=False), repeats=50)
+    print(f"  assess_health loop: {60e6 / single_us:12,.0f} patients/min")
+    patients = synthetic_patients(100000)
+    for reports in (False, True):
+        start = time.perf_counter()
+        pipeline.batch_assess(patients, reports=reports, verbose=False)
+        elapsed = time.perf_counter() - start
+        label = 'columnar + reports' if reports else 'columnar'
+        print(f"  batch_assess ({label:<18}) 100k patients in {elapsed:5.1f} s: "
+              f"{len(patients) / elapsed * 60:12,.0f} patients/min")
+        match = match and elapsed <= 60
+    return match
+
+
+def bench_concurrent():
+    """assess_health with the models run one after another vs on the shared thread pool"""
+    print_header("CONCURRENT MODEL EVALUATION (assess_health, max_workers=4)")
+    from pipeline import HealthAssessmentPipeline
+
+    match = True
+    for engine in ('sklearn', 'flat'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sequential = HealthAssessmentPipeline(engine=engine)
+            concurrent = HealthAssessmentPipeline(engine=engine, max_workers=4)
+        reports = [pipeline.assess_health(SAMPLE_USER, verbose=False) for pipeline in (sequential, concurrent)]
+        match = match and reports[0]['health_score'] == reports[1]['health_score']
+
+        timings = {name: np.median([sequential.assess_health(SAMPLE_USER, verbose=False)['model_timings_ms'][name]
+                                    for _ in range(50)])
+                   for name in reports[0]['model_timings_ms']}
+        sequential_ms = time_call(lambda: sequential.assess_health(SAMPLE_USER, verbose=False), repeats=100) / 1000
+        concurrent_ms = time_call(lambda: concurrent.assess_health(SAMPLE_USER, verbose=False), repeats=100) / 1000
+        concurrent.close()
+
+        print(f"  {engine}")
+        print("     per model: " + " | ".join(f"{name} {ms:.2f} ms" for name, ms in timings.items()))
+        print(f"     sum {sum(timings.values()):.2f} ms, slowest {max(timings.values()):.2f} ms")
+        print(f"     assess_health: sequential {sequential_ms:.2f} ms | concurrent {concurrent_ms:.2f} ms "
+              f"| {sequential_ms / concurrent_ms:.2f}x")
+
+    print(f"  {'✅' if match else '❌'} Concurrent and sequential reports match")
+    return match
+
+
+def bench_parallel():
+    """ParallelAssessor: throughput of 1..N worker processes on synthetic patients"""
+    print_header("PARALLEL SHARDED ASSESSMENT (ParallelAssessor, 1..N workers)")
+    from parallel_assess import ParallelAssessor
+    from pipeline import HealthAssessmentPipeline
+
+    patients = synthetic_patients(100000, seed=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+    pipeline.batch_assess(patients.iloc[:100], verbose=False)
+    start = time.perf_counter()
+    expected = pipeline.batch_assess(patients, verbose=False).results
+    single_s = time.perf_counter() - start
+    print(f"  in-process batch_assess: {len(patients) / single_s * 60:12,.0f} patients/min")
+
+    cpus = os.cpu_count() or 1
+    match = True
+    for workers in sorted({1, *range(2, cpus + 1, max(1, cpus // 8)), cpus}):
+        with ParallelAssessor(workers=workers, engine='flat') as assessor:
+            # Warm-up: start the workers and load their models
+            assessor.batch_assess(patients.iloc[:workers])
+            start = time.perf_counter()
+            results = assessor.batch_assess(patients).results
+            elapsed = time.perf_counter() - start
+        same = results.equals(expected)
+        match = match and same
+        print(f"  {workers:>3} workers: {len(patients) / elapsed * 60:12,.0f} patients/min | "
+              f"{single_s / elapsed:5.2f}x | {'✅' if same else '❌'} results match")
+    if cpus == 1:
+        print("  ⚠️  Only one CPU available - no parallel speedup possible here")
+    return match
+
+
+def bench_delta():
+    """assess_delta: equality with a full recomputation and latency of one-field edits"""
+    print_header("INCREMENTAL RE-ASSESSMENT (assess_delta vs assess_health)")
+    from pipeline import HealthAssessmentPipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+
+    edits = [
+        {'weight': 75}, {'systolic_bp': 128}, {'chest_pain_type': 3}, {'smoking_status': 'Current'},
+        {'glucose': 105, 'cholesterol': 190}, {'insulin': None}, {'age': 61}, {'sleep_hours': 8},
+        {'ldl': None, 'hdl': None, 'triglycerides': None, 'resting_heart_rate': None, 'max_heart_rate': None,
+         'smoking_status': None, 'alcohol_intake': None, 'physical_activity': None, 'sleep_hours': None,
+         'stress_level': None, 'family_history_diabetes': None, 'family_history_hypertension': None,
+         'insulin': None, 'chest_pain_type': None},
+    ]
+    keys = ('individual_risks', 'composite_risk', 'health_score', 'risk_level', 'health_grade',
+            'recommendations', 'feature_sets', 'model_tier', 'risk_scores', 'user_data')
+    rng = np.random.default_rng(0)
+    checked = matches = 0
+    for row in synthetic_patients(200, seed=4).to_dict('records'):
+        user = {key: value for key, value in row.items() if pd.notna(value)}
+        report = pipeline.assess_health(user, verbose=False)
+        for _ in range(3):
+            changes = edits[rng.integers(len(edits))]
+            report = pipeline.assess_delta(report, changes)
+            expected = pipeline.assess_health(report['user_data'], verbose=False)
+            checked += 1
+            matches += all(report[key] == expected[key] for key in keys)
+    match = matches == checked
+    print(f"  {'✅' if match else '❌'} Equal to full recomputation: {matches}/{checked} edits")
+
+    report = pipeline.assess_health(SAMPLE_USER, verbose=False)
+    full_us = time_call(lambda: pipeline.assess_health(SAMPLE_USER, verbose=False))
+    print(f"  assess_health: {full_us:6.0f} µs")
+    for changes in ({'weight': 80}, {'chest_pain_type': 2}, {'sleep_hours': 7}, {'nickname': 'Sam'}):
+        rerun = pipeline.assess_delta(report, changes)['model_timings_ms']
+        delta_us = time_call(lambda: pipeline.assess_delta(report, changes))
+        print(f"  assess_delta {str(changes):<24} {delta_us:6.0f} µs | reran {', '.join(rerun) or 'no models'}")
+    return match
+
+
+def bench_sensitivity():
+    """sensitivity(): curves equal per-point assessments; sweep cost vs one assessment"""
+    print_header("WHAT-IF SENSITIVITY (50-point sweep vs one assessment)")
+    from pipeline import HealthAssessmentPipeline
+
+    match = True
+    for engine in ('sklearn', 'flat'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline = HealthAssessmentPipeline(engine=engine)
+        single_us = time_call(lambda: pipeline.assess_health(SAMPLE_USER, verbose=False), repeats=50)
+        print(f"  {engine}: assess_health {single_us / 1000:.2f} ms")
+        for field, values in (('systolic_bp', range(110, 160)), ('weight', range(55, 105)),
+                              ('smoking_status', ['Never', 'Former', 'Current'])):
+            curves = pipeline.sensitivity(SAMPLE_USER, field, values)
+            expected = [pipeline.assess_health({**SAMPLE_USER, field: value}, verbose=False) for value in values]
+            same = all(
+                report['health_score'] == curves['health_score'][i] and
+                all(report['individual_risks'][key]['score'] == curves['risks'][key][i] for key in curves['risks'])
+                for i, report in enumerate(expected)
+            )
+            match = match and same
+            sweep_us = time_call(lambda: pipeline.sensitivity(SAMPLE_USER, field, values), repeats=20)
+            print(f"     {'✅' if same else '❌'} {field:<15} {len(curves['values']):>2} points "
+                  f"{sweep_us / 1000:6.2f} ms ({sweep_us / single_us:4.1f}x one assessment, "
+                  f"{len(curves['values']) * single_us / sweep_us:4.1f}x faster than a loop)")
+    return match
+
+
+def bench_projection():
+    """project(): trajectories equal assessments of the aged profiles; cost vs a loop"""
+    print_header("RISK PROJECTION (10 years vs one assessment)")
+    from pipeline import HealthAssessmentPipeline, aged_profile
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+
+    match = True
+    for label, user in (('full', SAMPLE_USER), ('quick', QUICK_USER)):
+        trajectory = pipeline.project(user)
+        same = all(
+            report['health_score'] == trajectory['health_score'][i] and
+            all(report['individual_risks'][key]['score'] == trajectory['risks'][key][i]
+                for key in trajectory['risks'])
+            for i, report in enumerate(pipeline.assess_health(aged_profile(user, year), verbose=False)
+                                       for year in trajectory['years'])
+        )
+        match = match and same
+        single_us = time_call(lambda: pipeline.assess_health(user, verbose=False), repeats=50)
+        project_us = time_call(lambda: pipeline.project(user), repeats=50)
+        print(f"  {'✅' if same else '❌'} {label:<5} ages {trajectory['ages'][0]}-{trajectory['ages'][-1]}: "
+              f"{project_us / 1000:5.2f} ms ({project_us / single_us:4.1f}x one assessment, "
+              f"{len(trajectory['years']) * single_us / project_us:4.1f}x faster than a loop)")
+        print(f"        health score {trajectory['health_score'][0]:.1f} -> {trajectory['health_score'][-1]:.1f}")
+    return match
+
+
+def bench_uncertainty():
+    """uncertainty(): exact-input scores match assess_health; K=1000 bands well under a second"""
+    print_header("UNCERTAINTY BANDS (1,000 perturbed inputs)")
+    from pipeline import HealthAssessmentPipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+
+    match = True
+    for label, user in (('full', SAMPLE_USER), ('quick', QUICK_USER)):
+        bands = pipeline.uncertainty(user, samples=1000, seed=0)
+        report = pipeline.assess_health(user, verbose=False)
+        same = report['health_score'] == bands['health_score']['score'] and \
+            all(report['individual_risks'][key]['score'] == band['score'] for key, band in bands['risks'].items())
+        repeatable = bands == pipeline.uncertainty(user, samples=1000, seed=0)
+        ordered = all(band['p5'] <= band['p50'] <= band['p95']
+                      for band in [*bands['risks'].values(), bands['health_score']])
+        match = match and same and repeatable and ordered
+
+        bands_us = time_call(lambda: pipeline.uncertainty(user, samples=1000), repeats=10)
+        single_us = time_call(lambda: pipeline.assess_health(user, verbose=False), repeats=50)
+        match = match and bands_us < 1e6
+        print(f"  {'✅' if same and repeatable and ordered else '❌'} {label:<5} "
+              f"{bands_us / 1000:6.1f} ms ({1000 * single_us / bands_us:4.1f}x faster than 1,000 assessments)")
+        print(f"        health score {bands['health_score']['score']:.1f}, "
+              f"90% band {bands['health_score']['p5']:.1f}-{bands['health_score']['p95']:.1f}")
+        for key, band in bands['risks'].items():
+            print(f"        {key:<14} {band['score']:5.1f}  [{band['p5']:5.1f}, {band['p95']:5.1f}]")
+    return match
+
+
+def bench_scorer():
+    """Columnar HealthScorer: parity with generate_health_report and rows per second"""
+    print_header("VECTORIZED SCORING (score_batch vs generate_health_report)")
+    scorer = HealthScorer()
+    rng = np.random.default_rng(13)
+    names = ('heart', 'diabetes', 'hypertension', 'obesity')
+    # Random scores plus every threshold and its neighbours
+    edges = [*scorer.risk_thresholds.values(), *(100 - t for t in scorer.grade_thresholds.values())]
+    special = np.array([[edge + delta] * 4 for edge in edges for delta in (-0.01, 0, 0.01)])
+    matrix = np.vstack([rng.uniform(0, 100, (10000, 4)), np.round(rng.uniform(0, 100, (10000, 4)), 2), special])
+
+    batch = scorer.score_batch(matrix, recommendations=True)
+    mismatches = 0
+    for i, row in enumerate(matrix.tolist()):
+        report = scorer.generate_health_report(dict(zip(names, row)))
+        mismatches += any(report[key] != batch[key][i]
+                          for key in ('composite_risk', 'health_score', 'risk_level', 'health_grade'))
+        mismatches += report['recommendations'] != batch['recommendations'][i]
+        for name, key in zip(names, ('heart_disease', 'diabetes', 'hypertension', 'obesity')):
+            risk = report['individual_risks'][key]
+            mismatches += risk['score'] != batch[f'{name}_risk'][i] or risk['level'] != batch[f'{name}_level'][i]
+    match = mismatches == 0
+    print(f"  {'✅' if match else '❌'} {len(matrix):,} score rows equal generate_health_report() "
+          f"({mismatches} mismatches)")
+
+    rows = [dict(zip(names, row)) for row in matrix[:10000].tolist()]
+    loop_us = time_call(lambda: [scorer.generate_health_report(row) for row in rows], repeats=3) / len(rows)
+    population = rng.uniform(0, 100, (1000000, 4))
+    for recommendations in (False, True):
+        n_rows = len(population) if not recommendations else 100000
+        batch_us = time_call(lambda: scorer.score_batch(population[:n_rows], recommendations=recommendations),
+                             repeats=3) / n_rows
+        label = 'with recommendations' if recommendations else 'scores, levels, grades'
+        print(f"  score_batch ({label:<22}) {1e6 / batch_us:12,.0f} rows/s "
+              f"vs generate_health_report loop {1e6 / loop_us:10,.0f} rows/s")
+    return match
+
+
+def nested_get_features(user_data):
+    """
+    The hand-written dict-of-dicts mapping FEATURE_SPEC replaced: four
+    mappers, each with its own chain of nested user_data.get() fallbacks
+    """
+    get = user_data.get
+    return {
+        'diabetes': {
+            'Pregnancies': get('pregnancies', 0),
+            'Glucose': get('glucose', get('fasting_glucose', 100)),
+            'BloodPressure': get('blood_pressure', get('systolic_bp', 80)),
+            'SkinThickness': get('skin_thickness', 20),
+            'Insulin': get('insulin', 80),
+            'BMI': get('bmi', round(get('weight', 70) / (get('height', 170) / 100) ** 2, 2)),
+            'DiabetesPedigreeFunction': get('diabetes_pedigree',
+                                            0.5 if get('family_history_diabetes', 'no').lower() == 'yes' else 0.2),
+            'Age': get('age', 30)
+        },
+        'heart': {
+            'age': get('age', 30),
+            'sex': 1 if get('gender', 'male').lower() in ['male', 'm', '1'] else 0,
+            'cp': get('chest_pain_type', 0),
+            'trestbps': get('systolic_bp', get('resting_bp', 120)),
+            'chol': get('cholesterol', 200),
+            'fbs': 1 if get('fasting_glucose', 100) > 120 else 0,
+            'restecg': get('resting_ecg', 0),
+            'thalach': get('max_heart_rate', 150),
+            'exang': 1 if get('exercise_induced_angina', 'no').lower() == 'yes' else 0,
+            'oldpeak': get('st_depression', 0),
+            'slope': get('slope_st_segment', 1),
+            'ca': get('num_major_vessels', 0),
+            'thal': get('thalassemia', 2)
+        },
+        'hypertension': {
+            'Age': get('age', 30),
+            'BMI': get('bmi', round(get('weight', 70) / (get('height', 170) / 100) ** 2, 2)),
+            'Cholesterol': get('cholesterol', 200),
+            'Systolic_BP': get('systolic_bp', 120),
+            'Diastolic_BP': get('diastolic_bp', 80),
+            'Smoking_Status': get('smoking_status', 'Never'),
+            'Alcohol_Intake': get('alcohol_intake', 'None'),
+            'Physical_Activity_Level': get('physical_activity', 'Moderate'),
+            'Family_History': get('family_history_hypertension', 'No'),
+            'Diabetes': get('has_diabetes', 'No'),
+            'Stress_Level': get('stress_level', 'Moderate'),
+            'Salt_Intake': get('salt_intake', 'Moderate'),
+            'Sleep_Duration': get('sleep_hours', 7),
+            'Heart_Rate': get('resting_heart_rate', 70),
+            'LDL': get('ldl', 100),
+            'HDL': get('hdl', 50),
+            'Triglycerides': get('triglycerides', 150),
+            'Glucose': get('glucose', get('fasting_glucose', 100)),
+            'Gender': get('gender', 'Male')
+        },
+        'obesity': {
+            'Gender': get('gender', 'Male'),
+            'Age': get('age', 30),
+            'Height': get('height', 170) / 100,
+            'Weight': get('weight', 70),
+            'family_history_with_overweight': get('family_history_overweight', 'no'),
+            'FAVC': get('frequent_high_caloric_food', 'no'),
+            'FCVC': get('vegetable_consumption_frequency', 2),
+            'NCP': get('num_main_meals', 3),
+            'CAEC': get('food_between_meals', 'Sometimes'),
+            'SMOKE': get('smokes', 'no'),
+            'CH2O': get('daily_water_consumption', 2),
+            'SCC': get('calorie_monitoring', 'no'),
+            'FAF': get('physical_activity_frequency', 1),
+            'TUE': get('tech_usage_time', 1),
+            'CALC': get('alcohol_consumption', 'no'),
+            'MTRANS': get('transportation_mode', 'Public_Transportation')
+        }
+    }
+
+
+def bench_mapper():
+    """Compiled FEATURE_SPEC extractor vs the nested-get mappers: equality and speed"""
+    print_header("FEATURE MAPPING (compiled spec vs nested-get dicts)")
+    from feature_mapper import FeatureMapper
+    mapper = FeatureMapper()
+    users = [{key: value for key, value in row.items() if pd.notna(value)}
+             for row in synthetic_patients(2000, seed=7).to_dict('records')]
+    users += [SAMPLE_USER, QUICK_USER, {}, {'fasting_glucose': 130, 'bmi': 31.5, 'resting_bp': 135,
+                                            'exercise_induced_angina': 'Yes', 'diabetes_pedigree': 0.9}]
+
+    expected = [nested_get_features(user) for user in users]
+    same_dicts = all(mapper.get_all_features(user) == reference and
+                     all(list(mapper.get_all_features(user)[name]) == list(features)
+                         for name, features in reference.items())
+                     for user, reference in zip(users, expected))
+    rows = mapper.get_all_feature_rows(users)
+    same_rows = all(rows[name][i].tolist() == list(reference[name].values())
+                    for i, reference in enumerate(expected) for name in rows)
+    print(f"  {'✅' if same_dicts else '❌'} Feature dicts equal the nested-get mapping for {len(users):,} users")
+    print(f"  {'✅' if same_rows else '❌'} Feature rows equal it too "
+          f"({', '.join(f'{name} {array.dtype}' for name, array in rows.items())})")
+
+    # Timed in loops of 1,000 calls: a single call is shorter than the clock's overhead
+    for label, user in (('full', SAMPLE_USER), ('quick', QUICK_USER)):
+        nested_us = time_call(lambda: [nested_get_features(user) for _ in range(1000)], repeats=50) / 1000
+        compiled_us = time_call(lambda: [mapper.get_all_features(user) for _ in range(1000)], repeats=50) / 1000
+        print(f"  {label:<5} one user: nested get {nested_us:5.2f} µs -> compiled {compiled_us:5.2f} µs "
+              f"({nested_us / compiled_us:.2f}x)")
+    batch = users[:2000]
+    nested_us = time_call(lambda: [nested_get_features(user) for user in batch], repeats=20)
+    rows_us = time_call(lambda: mapper.get_all_feature_rows(batch), repeats=20)
+    print(f"  {len(batch):,} users: nested get dicts {nested_us / 1000:5.1f} ms -> "
+          f"compiled rows {rows_us / 1000:5.1f} ms ({nested_us / rows_us:.2f}x)")
+    return same_dicts and same_rows
+
+
+def random_user_data(rng):
+    """
+    A random user_data dict for property checks: any subset of the mapped
+    keys (aliases included), with numbers, mixed-case strings and values
+    on the feature thresholds
+    """
+    numbers = {
+        'age': (18, 90), 'height': (140, 200), 'weight': (40, 150), 'bmi': (15, 50),
+        'systolic_bp': (90, 200), 'diastolic_bp': (60, 120), 'blood_pressure': (60, 200),
+        'resting_bp': (90, 200), 'glucose': (60, 250), 'fasting_glucose': (110, 130),
+        'cholesterol': (120, 350), 'ldl': (50, 250), 'hdl': (20, 100), 'triglycerides': (50, 400),
+        'insulin': (0, 300), 'skin_thickness': (0, 60), 'pregnancies': (0, 10),
+        'diabetes_pedigree': (0, 2), 'max_heart_rate': (90, 200), 'resting_heart_rate': (45, 110),
+        'sleep_hours': (3, 10), 'st_depression': (0, 5), 'chest_pain_type': (0, 3),
+        'resting_ecg': (0, 2), 'slope_st_segment': (0, 2), 'num_major_vessels': (0, 3),
+        'thalassemia': (1, 3), 'vegetable_consumption_frequency': (1, 3), 'num_main_meals': (1, 4),
+        'daily_water_consumption': (1, 3), 'physical_activity_frequency': (0, 3), 'tech_usage_time': (0, 2),
+    }
+    choices = {
+        'gender': ['Male', 'Female', 'male', 'FEMALE', 'M', 'F', '1', '0'],
+        'family_history_diabetes': ['yes', 'no', 'Yes', 'NO'],
+        'exercise_induced_angina': ['yes', 'no', 'YES', 'No'],
+        'smoking_status': ['Never', 'Former', 'Current'],
+        'alcohol_intake': ['None', 'Moderate', 'Heavy'],
+        'physical_activity': ['Low', 'Moderate', 'High'],
+        'stress_level': ['Low', 'Moderate', 'High'], 'salt_intake': ['Low', 'Moderate', 'High'],
+        'family_history_hypertension': ['Yes', 'No'], 'has_diabetes': ['Yes', 'No'],
+        'family_history_overweight': ['yes', 'no'], 'frequent_high_caloric_food': ['yes', 'no'],
+        'food_between_meals': ['no', 'Sometimes', 'Frequently', 'Always'], 'smokes': ['yes', 'no'],
+        'calorie_monitoring': ['yes', 'no'], 'alcohol_consumption': ['no', 'Sometimes', 'Frequently'],
+        'transportation_mode': ['Public_Transportation', 'Walking', 'Automobile', 'Bike'],
+    }
+    user = {}
+    for key, (low, high) in numbers.items():
+        if rng.random() < 0.5:
+            value = rng.uniform(low, high)
+            # Whole numbers, one decimal (BMI rounding ties) or the fbs threshold
+            user[key] = [int(round(value)), round(value, 1), 120][rng.integers(3)] if key == 'fasting_glucose' \
+                else [int(round(value)), round(value, 1)][rng.integers(2)]
+    for key, options in choices.items():
+        if rng.random() < 0.5:
+            user[key] = options[rng.integers(len(options))]
+    return user
+
+
+def bench_columnar():
+    """Columnar feature mapping: property check against the dict path on random inputs, and speed"""
+    print_header("COLUMNAR FEATURE MAPPING (frames vs per-user dicts)")
+    from feature_mapper import FeatureMapper
+    mapper = FeatureMapper()
+    rng = np.random.default_rng(8)
+
+    mismatches = checked = 0
+    for _ in range(20):
+        users = [random_user_data(rng) for _ in range(500)]
+        frames = mapper.get_all_feature_frames(pd.DataFrame(users))
+        for name, frame in frames.items():
+            expected = pd.DataFrame([getattr(mapper, f'map_to_{name}_features')(user) for user in users])
+            for column in frame.columns:
+                got, want = frame[column].tolist(), expected[column].tolist()
+                mismatches += sum(a != b for a, b in zip(got, want))
+                checked += len(got)
+    print(f"  {'✅' if mismatches == 0 else '❌'} {checked:,} random feature values equal to the dict path "
+          f"({mismatches} mismatches)")
+
+    # BMI rounding on decimal ties, where numpy and Python round apart
+    from feature_mapper import round_column
+    ties = pd.Series(rng.integers(1000, 5000, 100000) / 100 + 0.005)
+    tie_mismatches = sum(a != round(b, 2) for a, b in zip(round_column(ties, 2).tolist(), ties.tolist()))
+    print(f"  {'✅' if tie_mismatches == 0 else '❌'} round_column() equals round() on {len(ties):,} near-ties")
+    match = mismatches == 0 and tie_mismatches == 0
+
+    patients = synthetic_patients(100000, seed=9)
+    user_dicts = [{key: value for key, value in row.items() if pd.notna(value)}
+                  for row in patients.iloc[:10000].to_dict('records')]
+    frames_us = time_call(lambda: mapper.get_all_feature_frames(patients), repeats=5)
+    dicts_us = time_call(lambda: [mapper.get_all_features(user) for user in user_dicts], repeats=5) * 10
+    print(f"  100k patients: columnar {frames_us / 1000:6.0f} ms vs per-user dicts {dicts_us / 1000:6.0f} ms "
+          f"({dicts_us / frames_us:.1f}x)")
+    return match
+
+
+def bench_imputer():
+    """Nearest-neighbour imputation: dict, row and frame paths agree; latency vs constant defaults"""
+    print_header("NEAREST-NEIGHBOUR IMPUTATION (vs constant defaults)")
+    from feature_mapper import FeatureMapper
+    from models.imputer import build_imputer
+    with contextlib.redirect_stdout(io.StringIO()):
+        imputer = build_imputer()
+    mapper, plain = FeatureMapper(), FeatureMapper()
+    mapper.use_imputer(imputer)
+    rng = np.random.default_rng(11)
+
+    mismatches = checked = changed = 0
+    for _ in range(10):
+        users = [random_user_data(rng) for _ in range(500)]
+        frames = mapper.get_all_feature_frames(pd.DataFrame(users))
+        rows = mapper.get_all_feature_rows(users)
+        for name, frame in frames.items():
+            dicts = [getattr(mapper, f'map_to_{name}_features')(user) for user in users]
+            expected = pd.DataFrame(dicts)
+            for column in frame.columns:
+                got, want = frame[column].tolist(), expected[column].tolist()
+                mismatches += sum(a != b for a, b in zip(got, want))
+                checked += len(got)
+            mismatches += sum(rows[name][i].tolist() != list(features.values()) for i, features in enumerate(dicts))
+            # Features the user supplied keep their mapped values
+            keys = mapper.compiled.feature_keys[name]
+            for user, features in zip(users, dicts):
+                defaults = plain.compiled.extract_model[name](user)
+                for column in imputer.fill_columns(name):
+                    if any(user.get(key) not in (None, '') for key in keys[column]):
+                        mismatches += features[column] != defaults[column]
+                    else:
+                        changed += features[column] != defaults[column]
+    match = mismatches == 0 and changed > 0
+    print(f"  {'✅' if match else '❌'} {checked:,} feature values agree between dict, row and frame paths, "
+          f"supplied inputs untouched ({mismatches} mismatches, {changed:,} defaults replaced)")
+
+    for label, user in (('full', SAMPLE_USER), ('quick', QUICK_USER)):
+        plain_us = time_call(lambda: [plain.get_all_features(user) for _ in range(1000)], repeats=20) / 1000
+        imputed_us = time_call(lambda: [mapper.get_all_features(user) for _ in range(1000)], repeats=20) / 1000
+        match = match and imputed_us < 1000
+        print(f"  {label:<5} one user: constant defaults {plain_us:6.1f} µs -> imputed {imputed_us:6.1f} µs")
+    patients = synthetic_patients(100000, seed=12)
+    plain_us = time_call(lambda: plain.get_all_feature_frames(patients), repeats=3)
+    imputed_us = time_call(lambda: mapper.get_all_feature_frames(patients), repeats=3)
+    print(f"  100k patients (30% quick-check only): constant defaults {plain_us / 1000:6.0f} ms -> "
+          f"imputed {imputed_us / 1000:6.0f} ms")
+    return match
+
+
+def random_raw_input(rng):
+    """A random_user_data() dict as it may arrive at the edge: strings, blanks and bad values"""
+    user = random_user_data(rng)
+    for key in list(user):
+        roll = rng.random()
+        if roll < 0.2:
+            user[key] = f" {user[key]} "
+        elif roll < 0.205:
+            user[key] = ['', None, 'abc', -1, 1e6][rng.integers(5)]
+    return user
+
+
+def bench_schema():
+    """InputSchema: dict and columnar validation agree on random raw inputs, the web form passes, and speed"""
+    print_header("INPUT SCHEMA (validate vs validate_frame)")
+    from input_schema import InputSchema, InputValidationError
+    schema = InputSchema()
+    rng = np.random.default_rng(11)
+    raws = [random_raw_input(rng) for _ in range(5000)]
+
+    clean, frame_errors = schema.validate_frame(pd.DataFrame(raws))
+    disagreements = rejected = 0
+    for i, raw in enumerate(raws):
+        try:
+            expected, errors = schema.validate(raw), {}
+        except InputValidationError as e:
+            expected, errors = None, e.errors
+        fields = {part.split(':')[0] for part in frame_errors.iat[i].split('; ')} if frame_errors.iat[i] else set()
+        rejected += bool(errors)
+        if set(errors) != fields:
+            disagreements += 1
+        elif expected is not None:
+            row = clean.iloc[i]
+            same = all((field in expected) == pd.notna(row[field]) and
+                       (field not in expected or row[field] == expected[field])
+                       for field in raw)
+            disagreements += not same
+    print(f"  {'✅' if disagreements == 0 else '❌'} validate_frame() agrees with validate() on "
+          f"{len(raws):,} raw inputs ({rejected:,} rejected, {disagreements} disagreements)")
+
+    # The values the web assessment form sends by default
+    form = {'age': '30', 'gender': 'male', 'height': '170', 'weight': '70', 'systolic_bp': '120',
+            'diastolic_bp': '80', 'resting_heart_rate': '70', 'max_heart_rate': '180', 'glucose': '90',
+            'cholesterol': '180', 'ldl': '100', 'hdl': '50', 'triglycerides': '150', 'insulin': '10',
+            'smoking_status': 'never', 'alcohol_consumption': 'low', 'physical_activity_level': 'veryHigh',
+            'sleep_hours': '7', 'stress_level': 'veryHigh', 'salt_intake': 'moderate',
+            'vegetable_consumption_frequency': '2', 'num_main_meals': '3', 'daily_water_consumption': '2',
+            'frequent_high_caloric_food': 'yes', 'food_consumption_between_meals': 'sometimes',
+            'family_history_diabetes': 'no', 'family_history_hypertension': 'yes', 'pregnancies': '0'}
+    try:
+        user = schema.validate(form)
+        form_ok = user['gender'] == 'Male' and user['family_history_hypertension'] == 'Yes'
+    except InputValidationError as e:
+        print(f"     {e}")
+        form_ok = False
+    print(f"  {'✅' if form_ok else '❌'} The web form's default values pass with canonical categories")
+
+    # Timed in loops of 1,000 calls: a single call is shorter than the clock's overhead
+    validate_us = time_call(lambda: [schema.validate(form) for _ in range(1000)], repeats=20) / 1000
+    patients = synthetic_patients(100000, seed=9)
+    frame_us = time_call(lambda: schema.validate_frame(patients), repeats=5)
+    print(f"  one web form: {validate_us:5.1f} µs | 100k patients columnar: {frame_us / 1000:5.0f} ms")
+    return disagreements == 0 and form_ok
+
+
+def bench_counterfactual():
+    """Counterfactual search: plans verified with assess_health, search cost and time budget"""
+    print_header("COUNTERFACTUAL SEARCH (path to grade B)")
+    from counterfactual import CounterfactualSearch, GRADES
+    from pipeline import HealthAssessmentPipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+    search = CounterfactualSearch(pipeline)
+
+    users = [{key: value for key, value in row.items() if pd.notna(value)}
+             for row in synthetic_patients(60, seed=5).to_dict('records')]
+    users = [user for user in users
+             if GRADES.index(pipeline.assess_health(user, verbose=False)['health_grade']) < GRADES.index('B')][:15]
+
+    verified = total = found = 0
+    elapsed, evaluated, batches = [], [], []
+    for user in users:
+        result = search.search(user, 'B')
+        found += bool(result['plans'])
+        elapsed.append(result['elapsed_ms'])
+        evaluated.append(result['evaluated'])
+        batches.append(result['batches'])
+        for plan in result['plans']:
+            changed = {**user, **{field: change['to'] for field, change in plan['changes'].items()}}
+            report = pipeline.assess_health(changed, verbose=False)
+            total += 1
+            verified += GRADES.index(report['health_grade']) >= GRADES.index('B') and \
+                report['health_score'] == plan['health_score']
+    match = verified == total
+    print(f"  Plans found for {found}/{len(users)} users below grade B")
+    print(f"  {'✅' if match else '❌'} {verified}/{total} plans reach grade B with assess_health")
+    print(f"  Per search: {np.median(evaluated):.0f} candidates in {np.median(batches):.0f} batches, "
+          f"median {np.median(elapsed):.0f} ms (max {np.max(elapsed):.0f} ms)")
+
+    budget = CounterfactualSearch(pipeline, time_budget_ms=50)
+    result = budget.search(users[0], 'A')
+    within = result['elapsed_ms'] < 50 + 4 * result['elapsed_ms'] / result['batches']
+    print(f"  {'✅' if within else '❌'} 50 ms budget: stopped after {result['elapsed_ms']:.0f} ms, "
+          f"complete={result['complete']} ({result['stop_reason']})")
+    return match and within
+
+
+def bench_drivers():
+    """Risk drivers: path attribution exactness and overhead over plain inference"""
+    print_header("RISK DRIVERS (path attributions vs plain inference)")
+    from pipeline import HealthAssessmentPipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+    mapper = pipeline.feature_mapper
+    users = [{key: value for key, value in row.items() if pd.notna(value)}
+             for row in synthetic_patients(500, seed=6).to_dict('records')]
+
+    # bias + contributions reproduce the explained score of every row
+    max_error = 0
+    for tier in ('full', 'quick'):
+        for name, model in pipeline._tier_models(tier).items():
+            rows = [getattr(mapper, f'map_to_{name}_features')(user) for user in users]
+            model.get_risk_scores(rows[:1])     # Compiles the forest
+            weights = np.eye(len(model.compiled.classes))[-1] * 100
+            explanation = model.predict_contributions(rows, weights)
+            expected = explanation.prediction.probabilities @ weights
+            error = np.abs(explanation.bias + explanation.contributions.sum(axis=1) - expected).max()
+            max_error = max(max_error, error)
+    exact = max_error < 1e-3
+    print(f"  {'✅' if exact else '❌'} bias + contributions = score (max error {max_error:.1e} points)")
+
+    # The sklearn engine walks estimators_[i].tree_ itself and must agree with the flat tables
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = HealthAssessmentPipeline(engine='sklearn')
+    max_gap, uncached = 0, True
+    for name, model in pipeline._tier_models('full').items():
+        rows = [getattr(mapper, f'map_to_{name}_features')(user) for user in users]
+        weights = np.eye(len(model.compiled.classes))[-1] * 100
+        flat = model.predict_contributions(rows, weights)
+        sklearn_model = reference._tier_models('full')[name]
+        direct = sklearn_model.predict_contributions(rows, weights)
+        uncached = uncached and sklearn_model.compiled is None
+        max_gap = max(max_gap, np.abs(flat.contributions - direct.contributions).max(),
+                      np.abs(flat.prediction.probabilities - direct.prediction.probabilities).max())
+    agree = max_gap < 1e-3 and uncached
+    exact = exact and agree
+    print(f"  {'✅' if agree else '❌'} sklearn engine attributions = flat engine (max gap {max_gap:.1e}), "
+          f"no compiled copy kept")
+
+    # Interleaved so both calls see the same machine load
+    overheads = []
+    for tier, user in (('full', SAMPLE_USER), ('quick', QUICK_USER)):
+        features = mapper.get_all_features(user)
+        plain_total = explain_total = 0
+        for name, model in pipeline._tier_models(tier).items():
+            plain, explained = [], []
+            for _ in range(1000):
+                start = time.perf_counter()
+                model.get_risk_score(features[name])
+                middle = time.perf_counter()
+                model.explain_risk_score(features[name])
+                plain.append(middle - start)
+                explained.append(time.perf_counter() - middle)
+            plain_us, explained_us = np.median(plain) * 1e6, np.median(explained) * 1e6
+            plain_total += plain_us
+            explain_total += explained_us
+            print(f"  {tier:<5} {name:<13} {plain_us:6.0f} µs -> {explained_us:6.0f} µs with drivers "
+                  f"({explained_us / plain_us - 1:+.0%})")
+        overheads.append(explain_total / plain_total - 1)
+        print(f"  {tier:<5} {'all models':<13} {plain_total:6.0f} µs -> {explain_total:6.0f} µs "
+              f"({overheads[-1]:+.0%})")
+
+    rows = [mapper.map_to_hypertension_features(user) for user in users] * 20
+    model = pipeline._tier_models('full')['hypertension']
+    plain_us = time_call(lambda: model.get_risk_scores(rows), repeats=5)
+    explained_us = time_call(lambda: model.explain_risk_scores(rows), repeats=5)
+    print(f"  Batch of {len(rows):,} (hypertension): {plain_us / 1000:.0f} ms -> {explained_us / 1000:.0f} ms")
+
+    cheap = max(overheads) < 0.20
+    print(f"  {'✅' if cheap else '❌'} Overhead per assessment under 20%")
+    return exact and cheap
+
+
+# Runs in a fresh interpreter so load time and RSS are not skewed by this process
+LOAD_PROBE = """
+import contextlib, io, json, time, warnings
+warnings.filterwarnings('ignore')
+from pipeline import HealthAssessmentPipeline
+from benchmark_models import SAMPLE_USER, process_memory
+before = process_memory()
+with contextlib.redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    pipeline = HealthAssessmentPipeline(engine='flat', bundle_path={bundle_path!r})
+    load_s = time.perf_counter() - start
+    report = pipeline.assess_health(SAMPLE_USER, verbose=False)
+print(json.dumps({{'load_s': load_s, 'before': before, 'after': process_memory(),
+                  'health_score': report['health_score'],
+                  'bundled': pipeline.diabetes_model.model is None}}))
+"""
+
+
+def bench_bundle():
+    """Memory-mapped bundle vs unpickling the four models (_load_all_models)"""
+    print_header("MODEL BUNDLE (load time + RSS vs pickles, fresh process each)")
+    from build_model_bundle import build_model_bundle
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_path = os.path.join(tmp_dir, 'models.bundle')
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_model_bundle(bundle_path)
+
+        results = {}
+        for label, path in (('pickles', None), ('bundle', bundle_path)):
+            output = subprocess.run([sys.executable, '-c', LOAD_PROBE.format(bundle_path=path)],
+                                    capture_output=True, text=True, check=True).stdout
+            results[label] = json.loads(output.strip().splitlines()[-1])
+
+    for label, result in results.items():
+        before, after = result['before'], result['after']
+        line = (f"  {label:<8} load {result['load_s'] * 1000:7.1f} ms | "
+                f"RSS +{after['VmRSS'] - before['VmRSS']:6.1f} MB")
+        if 'RssAnon' in after:
+            line += (f" (private +{after['RssAnon'] - before['RssAnon']:5.1f} MB, "
+                     f"shared page cache +{after['RssFile'] - before['RssFile']:4.1f} MB)")
+        print(line)
+
+    pickles, bundle = results['pickles'], results['bundle']
+    match = bundle['bundled'] and bundle['health_score'] == pickles['health_score']
+    print(f"\n  {'✅' if match else '❌'} Health score from bundle: {bundle['health_score']} "
+          f"(pickles: {pickles['health_score']})")
+    print(f"  Load speedup: {pickles['load_s'] / bundle['load_s']:.0f}x")
+    return match
+
+
+BENCHMARKS = {
+    'batch': bench_batch,
+    'fused': bench_fused,
+    'flat': bench_flat,
+    'encode': bench_encode,
+    'bundle': bench_bundle,
+    'compact': bench_compact,
+    'quick': bench_quick,
+    'anytime': bench_anytime,
+    'population': bench_population,
+    'concurrent': bench_concurrent,
+    'parallel': bench_parallel,
+    'delta': bench_delta,
+    'sensitivity': bench_sensitivity,
+    'mapper': bench_mapper,
+    'columnar': bench_columnar,
+    'imputer': bench_imputer,
+    'schema': bench_schema,
+    'projection': bench_projection,
+    'uncertainty': bench_uncertainty,
+    'scorer': bench_scorer,
+    'counterfactual': bench_counterfactual,
+    'drivers': bench_drivers,
+}
+
+
+def main(selected=None):
+    """Run the selected benchmarks (all by default)"""
+    names = selected or list(BENCHMARKS)
+    results = []
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}")
+            return False
+        results.append(BENCHMARKS[name]() is not False)
+    return all(results)
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    success = main(sys.argv[1:])
+    sys.exit(0 if success else 1)
@@ -0,0 +1,143 @@
+"""
+Build the nearest-neighbour imputer
+Fits a KD-tree per model over the training datasets and reports, on held-out
+records, how much closer the neighbour fills come to the true values than
+FeatureMapper's constant defaults. The pipeline imputes missing inputs with it
+when it is present
+
+Usage:
+    python build_imputer.py [output_path] [--neighbors 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from feature_mapper import FeatureMapper
+from models.imputer import (DEFAULT_IMPUTER_PATH, DEFAULT_NEIGHBORS, IMPUTED_FEATURES,
+                            build_imputer, load_imputer, load_records)
+from models.quick_models import QUICK_FEATURES, dataset_path
+
+# Quick-check input: every imputed feature is missing
+QUICK_USER = {
+    'age': 52, 'gender': 'Male', 'height': 178, 'weight': 92,
+    'systolic_bp': 142, 'diastolic_bp': 92, 'glucose': 126, 'cholesterol': 245
+}
+
+
+def holdout_error(dataset_dir='dataset', k=DEFAULT_NEIGHBORS, holdout=0.2, seed=0):
+    """
+    Impute every feature of held-out records from an imputer built on the rest
+
+    Returns:
+        dict: Model -> column -> {'kind', 'imputed', 'default'}: mean absolute
+              error of 'mean' columns or accuracy of 'mode' columns, for the
+              neighbour fill and the constant default
+    """
+    defaults = FeatureMapper().get_all_features({})
+    rng = np.random.default_rng(seed)
+    report = {}
+    for name, fill in IMPUTED_FEATURES.items():
+        if not os.path.exists(dataset_path(name, dataset_dir)):
+            continue
+        records = load_records(name, dataset_dir)
+        test = rng.random(len(records)) < holdout
+        imputer = build_imputer(k=k, records={name: records[~test]})
+        held_out = records[test].dropna(subset=QUICK_FEATURES[name])
+
+        query = {column: held_out[column].to_numpy() for column in QUICK_FEATURES[name]}
+        missing = {column: np.ones(len(held_out), dtype=bool) for column in fill}
+        filled = imputer.impute_columns(name, query, missing)
+
+        report[name] = {'records': len(held_out), 'columns': {}}
+        for column, kind in fill.items():
+            truth = held_out[column].to_numpy()
+            measured = ~held_out[column].isna().to_numpy()
+            imputed = np.full(len(held_out), defaults[name][column], dtype=object)
+            if column in filled:
+                rows, values = filled[column]
+                imputed[rows] = values
+            truth, imputed = truth[measured], imputed[measured]
+            if kind == 'mean':
+                imputed_error = np.abs(imputed.astype(float) - truth.astype(float)).mean()
+                default_error = np.abs(float(defaults[name][column]) - truth.astype(float)).mean()
+            else:
+                imputed_error = (imputed == truth).mean()
+                default_error = (truth == defaults[name][column]).mean()
+            report[name]['columns'][column] = {'kind': kind, 'imputed': float(imputed_error),
+                                               'default': float(default_error)}
+    return report
+
+
+def single_row_latency(imputer, repeats=2000):
+    """Median get_all_features() time of a quick-check user with and without the imputer (µs)"""
+    timings = {}
+    for label, model_imputer in (('default', None), ('imputed', imputer)):
+        mapper = FeatureMapper()
+        mapper.use_imputer(model_imputer)
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            mapper.get_all_features(QUICK_USER)
+            samples.append(time.perf_counter() - start)
+        timings[label] = float(np.median(samples) * 1e6)
+    return timings
+
+
+def build(imputer_path=DEFAULT_IMPUTER_PATH, k=DEFAULT_NEIGHBORS, dataset_dir='dataset'):
+    """
+    Build the imputer from the datasets and report its accuracy
+
+    Args:
+        imputer_path (str): Output file
+        k (int): Neighbours each fill is taken from
+        dataset_dir (str): Directory of the training datasets
+    """
+    print("=" * 60)
+    print("Building Nearest-Neighbour Imputer")
+    print("=" * 60)
+
+    imputer = build_imputer(dataset_dir, k)
+    if not imputer.tables:
+        raise ValueError(f"No datasets found in {dataset_dir}")
+    for name, table in imputer.tables.items():
+        print(f"  - {name}: {len(table['points'])} records, searched by {', '.join(table['query'])}")
+
+    print(f"\nHeld-out records, every feature imputed from the {k} nearest (vs constant default):")
+    report = holdout_error(dataset_dir, k)
+    for name, model_report in report.items():
+        print(f"  {name} ({model_report['records']} records)")
+        for column, error in model_report['columns'].items():
+            better = error['imputed'] < error['default'] if error['kind'] == 'mean' \
+                else error['imputed'] > error['default']
+            metric = 'MAE     ' if error['kind'] == 'mean' else 'accuracy'
+            print(f"     {'✓' if better else '·'} {column:<31} {metric} {error['imputed']:8.3f} "
+                  f"vs {error['default']:8.3f}")
+
+    latency = single_row_latency(imputer)
+    print(f"\n  get_all_features (quick-check user): {latency['imputed']:.0f} µs imputed "
+          f"vs {latency['default']:.0f} µs with constant defaults")
+
+    imputer.meta['error'] = report
+    imputer.meta['latency_us'] = latency
+    imputer.save(imputer_path)
+    if load_imputer(imputer_path) is None:
+        raise ValueError("Imputer could not be read back")
+    print(f"\n✅ Imputer written to {imputer_path} ({os.path.getsize(imputer_path) / 1024:.0f} KB)")
+    return imputer
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Build the nearest-neighbour imputer")
+    parser.add_argument('output', nargs='?', default=DEFAULT_IMPUTER_PATH)
+    parser.add_argument('--neighbors', type=int, default=DEFAULT_NEIGHBORS,
+                        help=f"Neighbours each fill is taken from (default: {DEFAULT_NEIGHBORS})")
+    args = parser.parse_args()
+    try:
+        build(args.output, args.neighbors)
+    except Exception as e:
+        print(f"\n❌ Error building imputer: {e}")
+        sys.exit(1)
@@ -0,0 +1,73 @@
+"""
+Build the memory-mapped model bundle from the saved model pickles
+Run this after training; the web app serves from the bundle when it is present
+
+Usage:
+    python build_model_bundle.py [output_path] [--engine flat|compact|compact8]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from models.diabetes_model import DiabetesModel
+from models.heart_model import HeartModel
+from models.hypertension_model import HypertensionModel
+from models.obesity_model import ObesityModel
+from models.bundle import save_bundle, load_bundle
+
+DEFAULT_BUNDLE_PATH = 'saved_models/models.bundle'
+
+
+def build_model_bundle(bundle_path=DEFAULT_BUNDLE_PATH, engine='flat'):
+    """
+    Convert the four saved model pickles into one bundle file
+    
+    Args:
+        bundle_path (str): Output file
+        engine (str): 'flat', or 'compact'/'compact8' for quantized forests
+                      (see models.forest_engine.CompactForest)
+    """
+    print("=" * 60)
+    print("Building Model Bundle")
+    print("=" * 60)
+
+    models = {
+        'diabetes': DiabetesModel(),
+        'heart': HeartModel(),
+        'hypertension': HypertensionModel(),
+        'obesity': ObesityModel()
+    }
+
+    entries = {}
+    for name, model in models.items():
+        forest, metadata = model.bundle_entry(engine)
+        entries[name] = (forest, metadata)
+        print(f"  - {name}: {forest.n_trees} trees, {len(forest.feature)} nodes, "
+              f"{forest.nbytes / 1024:.0f} KB")
+
+    size = save_bundle(bundle_path, entries)
+
+    # Read the bundle back and make sure every model evaluates the same
+    for name, (forest, _) in load_bundle(bundle_path).items():
+        original = entries[name][0]
+        for array_name in forest.ARRAYS:
+            if not np.array_equal(getattr(forest, array_name), getattr(original, array_name)):
+                raise ValueError(f"Bundle verification failed for {name}.{array_name}")
+
+    print(f"\n✅ {engine} bundle written to {bundle_path} ({size / 1024 / 1024:.1f} MB)")
+    return bundle_path
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Build the memory-mapped model bundle")
+    parser.add_argument('output', nargs='?', default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument('--engine', default='flat', choices=['flat', 'compact', 'compact8'])
+    args = parser.parse_args()
+    try:
+        build_model_bundle(args.output, args.engine)
+    except Exception as e:
+        print(f"\n❌ Error building model bundle: {e}")
+        sys.exit(1)
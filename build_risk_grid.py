@@ -0,0 +1,191 @@
+"""
+Build the precomputed quick-check risk grid
+Evaluates the pipeline's models over a quantized grid of the quick-check inputs
+and reports the interpolation error against live inference. The web app's quick
+check is served from the grid when it is present, and assessed live when a score
+lies within the measured error of a risk level edge. The build fails when the
+error exceeds its budget
+
+Usage:
+    python build_risk_grid.py [output_path] [--samples 2000] [--max-error 25]
+                              [--min-level-agreement 0.995]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from pipeline import REPORT_KEYS, HealthAssessmentPipeline
+from models.risk_grid import GENDERS, GRID_AXES, build_risk_grid, load_risk_grid
+
+DEFAULT_GRID_PATH = 'saved_models/risk_grid.npz'
+
+
+def random_quick_users(n_samples, seed=0):
+    """Random quick-check inputs in whole units, as the quick check form sends them"""
+    rng = np.random.default_rng(seed)
+    users = []
+    for _ in range(n_samples):
+        height = int(rng.integers(140, 201))
+        bmi = rng.uniform(15, 50)
+        users.append({
+            'age': int(rng.integers(18, 86)),
+            'gender': GENDERS[rng.integers(len(GENDERS))],
+            'height': height,
+            'weight': int(round(bmi * (height / 100) ** 2)),
+            'systolic_bp': int(rng.integers(90, 201)),
+            'diastolic_bp': int(rng.integers(60, 121)),
+            'glucose': int(rng.integers(60, 201)),
+            'cholesterol': int(rng.integers(140, 321)),
+        })
+    return users
+
+
+def interpolation_error(grid, pipeline, n_samples=2000, seed=0):
+    """
+    Compare grid lookups with live pipeline assessments of random quick-check users
+
+    Returns:
+        dict: Per condition max / mean absolute error and level agreement, plus
+              the max health score error and median latency of both paths.
+              With the grid's margins (see RiskGrid.margin) the share of users
+              sent to live inference and the level agreement of what is served
+              (grid or live) are included too
+    """
+    scorer = pipeline.health_scorer
+    edges = list(scorer.risk_thresholds.values())
+    errors = {name: [] for name in GRID_AXES}
+    levels_match = {name: 0 for name in GRID_AXES}
+    served_match = {name: 0 for name in GRID_AXES}
+    health_errors, grid_times, live_times = [], [], []
+    fallbacks = 0
+
+    for user in random_quick_users(n_samples, seed):
+        start = time.perf_counter()
+        scores = grid.lookup(user)
+        grid_times.append(time.perf_counter() - start)
+        confident = grid.lookup(user, edges) is not None
+        fallbacks += not confident
+
+        start = time.perf_counter()
+        report = pipeline.assess_health(user, verbose=False, tier=grid.tier)
+        live_times.append(time.perf_counter() - start)
+
+        for name, score in scores.items():
+            live = report['individual_risks'][REPORT_KEYS[name]]
+            errors[name].append(abs(score - live['score']))
+            match = scorer.get_risk_level(score) == live['level']
+            levels_match[name] += match
+            served_match[name] += match or not confident
+        health_errors.append(abs(scorer.calculate_health_score(scores) - report['health_score']))
+
+    return {
+        'samples': n_samples,
+        'conditions': {
+            name: {
+                'max_abs_error': float(np.max(values)),
+                'mean_abs_error': float(np.mean(values)),
+                'level_agreement': levels_match[name] / n_samples,
+                'served_level_agreement': served_match[name] / n_samples
+            }
+            for name, values in errors.items()
+        },
+        'health_score_max_abs_error': float(np.max(health_errors)),
+        'lookup_us': float(np.median(grid_times) * 1e6),
+        'live_us': float(np.median(live_times) * 1e6),
+        'fallback_rate': fallbacks / n_samples,
+    }
+
+
+def build(grid_path=DEFAULT_GRID_PATH, n_samples=2000, max_error=25.0, min_level_agreement=0.995):
+    """
+    Build the risk grid from the saved models and report its error
+
+    The error measured on one sample sets each condition's fallback margin;
+    a second, independent sample checks the levels served with it.
+
+    Args:
+        grid_path (str): Output file
+        n_samples (int): Random users compared against live inference
+        max_error (float): Largest interpolation error allowed, in risk points
+        min_level_agreement (float): Smallest share of served risk levels
+                                     (grid or live fallback) that must match
+                                     live inference, per condition
+
+    Raises:
+        ValueError: If the grid misses the error budget; nothing is written
+    """
+    print("=" * 60)
+    print("Building Quick-Check Risk Grid")
+    print("=" * 60)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline = HealthAssessmentPipeline(engine='flat')
+    # The tier assess_health() picks for quick-check inputs
+    tier = 'quick' if pipeline.quick_models else 'full'
+    models = pipeline._tier_models(tier)
+    mapper = pipeline.feature_mapper
+    map_features = {name: getattr(mapper, f'map_to_{name}_features') for name in models}
+
+    start = time.perf_counter()
+    grid = build_risk_grid(models, map_features, tier)
+    print(f"Evaluated {tier} tier models in {time.perf_counter() - start:.1f} s")
+    for name, table in grid.tables.items():
+        print(f"  - {name}: {' x '.join(map(str, table['values'].shape))} nodes "
+              f"({', '.join(table['fields'])}), {table['values'].nbytes / 1024:.0f} KB")
+
+    print(f"\nComparing with live inference on {n_samples} random quick-check users...")
+    report = interpolation_error(grid, pipeline, n_samples)
+    for name, error in report['conditions'].items():
+        print(f"  - {name:<13} max |error| {error['max_abs_error']:6.2f} | "
+              f"mean {error['mean_abs_error']:5.2f} | level agreement {error['level_agreement']:.1%}")
+    print(f"  Health score max |error|: {report['health_score_max_abs_error']:.2f}")
+    print(f"  Latency: lookup {report['lookup_us']:.0f} µs vs live {report['live_us']:.0f} µs")
+    grid.meta['error'] = report
+
+    print(f"\nChecking the live fallback near risk level edges on {n_samples} new users...")
+    check = interpolation_error(grid, pipeline, n_samples, seed=1)
+    for name, error in check['conditions'].items():
+        print(f"  - {name:<13} margin {grid.margin(name):6.2f} | "
+              f"served level agreement {error['served_level_agreement']:.1%}")
+    print(f"  Assessed live: {check['fallback_rate']:.1%} of users")
+    grid.meta['fallback_check'] = check
+
+    over_budget = [
+        f"{name} max |error| {report['conditions'][name]['max_abs_error']:.2f} > {max_error}"
+        for name in GRID_AXES if report['conditions'][name]['max_abs_error'] > max_error
+    ] + [
+        f"{name} served level agreement {check['conditions'][name]['served_level_agreement']:.1%} "
+        f"< {min_level_agreement:.1%}"
+        for name in GRID_AXES if check['conditions'][name]['served_level_agreement'] < min_level_agreement
+    ]
+    if over_budget:
+        raise ValueError(f"Risk grid misses its error budget: {'; '.join(over_budget)}")
+
+    grid.save(grid_path)
+    if load_risk_grid(grid_path) is None:
+        raise ValueError("Risk grid could not be read back")
+    print(f"\n✅ Risk grid written to {grid_path} ({os.path.getsize(grid_path) / 1024 / 1024:.1f} MB)")
+    return grid
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Build the quick-check risk grid")
+    parser.add_argument('output', nargs='?', default=DEFAULT_GRID_PATH)
+    parser.add_argument('--samples', type=int, default=2000,
+                        help="Random users compared against live inference (default: 2000)")
+    parser.add_argument('--max-error', type=float, default=25.0,
+                        help="Largest interpolation error allowed, in risk points (default: 25)")
+    parser.add_argument('--min-level-agreement', type=float, default=0.995,
+                        help="Smallest share of served risk levels matching live inference (default: 0.995)")
+    args = parser.parse_args()
+    try:
+        build(args.output, args.samples, args.max_error, args.min_level_agreement)
+    except Exception as e:
+        print(f"\n❌ Error building risk grid: {e}")
+        sys.exit(1)
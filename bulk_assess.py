@@ -0,0 +1,293 @@
+"""
+Streaming bulk assessment of patient files
+Reads patients in fixed-size chunks, assesses each chunk with the pipeline's
+vectorized batch_assess() and appends the results to the output file, so memory
+stays bounded whatever the file size. A checkpoint written after every chunk
+lets an interrupted run continue where it stopped. Every chunk is checked
+against the InputSchema first; rejected patients are written with their
+field-level errors instead of results.
+
+Usage:
+    python main.py assess --input patients.csv --output results.ndjson
+    python bulk_assess.py --input patients.ndjson --output results.csv [--chunk-size 50000]
+
+Formats (picked from the file extension, or --input-format / --output-format):
+    csv, ndjson (.ndjson / .jsonl) and parquet (needs pyarrow). Parquet output
+    is a directory of part files, one per chunk, readable with pd.read_parquet().
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from input_schema import InputSchema
+from pipeline import HealthAssessmentPipeline
+from parallel_assess import ParallelAssessor
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'}
+DEFAULT_CHUNK_SIZE = 20000
+
+
+def file_format(path, fmt=None):
+    """Format of a file from its extension unless given explicitly"""
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Unknown file format for {path} - use one of: csv, ndjson, parquet")
+    return fmt
+
+
+def import_pyarrow():
+    """pyarrow modules for Parquet files (an optional dependency)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def read_chunks(path, fmt, chunk_size, skip_rows=0):
+    """
+    Yield DataFrames of at most chunk_size patients, after skipping skip_rows
+
+    Args:
+        path (str): Input file
+        fmt (str): 'csv', 'ndjson' or 'parquet'
+        chunk_size (int): Patients per chunk
+        skip_rows (int): Leading patients already assessed
+    """
+    if fmt == 'csv':
+        skip = (lambda line: 0 < line <= skip_rows) if skip_rows else None
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skip)
+
+    elif fmt == 'ndjson':
+        with open(path) as f:
+            lines = (line for line in f if line.strip())
+            for _ in itertools.islice(lines, skip_rows):
+                pass
+            while True:
+                records = [json.loads(line) for line in itertools.islice(lines, chunk_size)]
+                if not records:
+                    break
+                yield pd.DataFrame(records)
+
+    else:
+        _, parquet = import_pyarrow()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+
+
+class ResultWriter:
+    """
+    Appends result chunks to a CSV / NDJSON file or a Parquet part directory
+
+    position() describes what has been written; opening with a position from a
+    checkpoint drops anything written after it (e.g. a half-written chunk).
+    """
+
+    def __init__(self, path, fmt, position=None):
+        self.path = path
+        self.fmt = fmt
+        self.file = None
+
+        if fmt == 'parquet':
+            self.pyarrow, self.parquet = import_pyarrow()
+            self.parts = position or 0
+            if self.parts == 0 and os.path.isdir(path):
+                shutil.rmtree(path)
+            elif self.parts == 0 and os.path.exists(path):
+                os.remove(path)
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                if name.startswith('part-') and int(name[5:10]) >= self.parts:
+                    os.remove(os.path.join(path, name))
+        else:
+            if position:
+                self.file = open(path, 'r+b')
+                self.file.truncate(position)
+                self.file.seek(position)
+            else:
+                self.file = open(path, 'wb')
+
+    def write(self, results):
+        """Append a DataFrame of results and make it durable"""
+        if self.fmt == 'parquet':
+            table = self.pyarrow.Table.from_pandas(results, preserve_index=False)
+            self.parquet.write_table(table, os.path.join(self.path, f'part-{self.parts:05d}.parquet'))
+            self.parts += 1
+            return
+
+        if self.fmt == 'csv':
+            text = results.to_csv(index=False, header=self.file.tell() == 0)
+        else:
+            # Scores are rounded to 2 decimals; np.round can leave 1.6600000000000001
+            text = results.to_json(orient='records', lines=True, double_precision=10)
+            if not text.endswith('\n'):
+                text += '\n'
+        self.file.write(text.encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self):
+        """Bytes written (CSV / NDJSON) or parts written (Parquet)"""
+        return self.parts if self.fmt == 'parquet' else self.file.tell()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def load_checkpoint(checkpoint_path, input_path):
+    """
+    Checkpoint of an earlier run over the same, unchanged input file
+
+    Returns:
+        dict or None: {'rows', 'position', ...}
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    stat = os.stat(input_path)
+    if checkpoint.get('input') != os.path.abspath(input_path) or \
+            checkpoint.get('input_size') != stat.st_size or checkpoint.get('input_mtime') != stat.st_mtime:
+        print(f"⚠️  Ignoring checkpoint {checkpoint_path}: the input file has changed")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, input_path, rows, position):
+    """Atomically record that `rows` patients are assessed and written up to `position`"""
+    stat = os.stat(input_path)
+    checkpoint = {
+        'input': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'rows': rows,
+        'position': position
+    }
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def bulk_assess(pipeline, input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, input_format=None,
+                output_format=None, tier=None, resume=True, schema=None):
+    """
+    Assess every patient of a file chunk by chunk and stream the results out
+
+    Each output row holds the input row number ('row'), then the columns of
+    HealthAssessmentPipeline.batch_assess() results and 'error': the input
+    errors of a rejected patient, whose results are left empty ('' for
+    assessed patients).
+
+    Args:
+        pipeline: Loaded HealthAssessmentPipeline, or a ParallelAssessor
+        input_path (str): Patient file, one user_data record per row
+        output_path (str): Results file (or directory for Parquet)
+        chunk_size (int): Patients held in memory at a time
+        input_format, output_format (str): Override the extension-based format
+        tier (str): Model tier for every patient, see batch_assess()
+        resume (bool): Continue from the checkpoint of an interrupted run
+        schema (InputSchema): Input validation (default: InputSchema())
+
+    Returns:
+        int: Number of patients assessed or rejected by this run
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    input_format = file_format(input_path, input_format)
+    output_format = file_format(output_path, output_format)
+    checkpoint_path = output_path.rstrip('/\\') + '.checkpoint'
+    schema = schema or InputSchema()
+
+    checkpoint = load_checkpoint(checkpoint_path, input_path) if resume else None
+    done = checkpoint['rows'] if checkpoint else 0
+    if done:
+        print(f"↩️  Resuming after {done:,} patients (checkpoint {checkpoint_path})")
+    writer = ResultWriter(output_path, output_format, checkpoint['position'] if checkpoint else None)
+
+    start_time = time.perf_counter()
+    assessed = rejected = 0
+    try:
+        for chunk in read_chunks(input_path, input_format, chunk_size, skip_rows=done):
+            chunk, errors = schema.validate_frame(chunk)
+            valid = (errors == '').to_numpy()
+            results = pipeline.batch_assess(chunk[valid], tier=tier, reports=False, verbose=False).results
+            if not valid.all():
+                results = results.reindex(chunk.index)
+                rejected += int((~valid).sum())
+            results.insert(0, 'row', range(done, done + len(chunk)))
+            results['error'] = errors.to_numpy()
+            writer.write(results)
+            done += len(chunk)
+            assessed += len(chunk)
+            save_checkpoint(checkpoint_path, input_path, done, writer.position())
+
+            elapsed = time.perf_counter() - start_time
+            print(f"   {done:>12,} patients | {assessed / elapsed:>9,.0f} patients/s | {elapsed:7.1f} s",
+                  flush=True)
+    finally:
+        writer.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start_time
+    print(f"✅ Assessed {assessed - rejected:,} patients in {elapsed:.1f} s -> {output_path}")
+    if rejected:
+        print(f"⚠️  Rejected {rejected:,} patients with invalid inputs (see the 'error' column)")
+    return assessed
+
+
+def main(argv=None):
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(prog='main.py assess',
+                                     description="Assess a file of patients and stream the results to a file")
+    parser.add_argument('--input', required=True, help="Patients as CSV, NDJSON or Parquet")
+    parser.add_argument('--output', required=True, help="Results as CSV, NDJSON or Parquet")
+    parser.add_argument('--input-format', choices=sorted(set(FORMATS.values())))
+    parser.add_argument('--output-format', choices=sorted(set(FORMATS.values())))
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Patients per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--tier', choices=['quick', 'full'],
+                        help="Model tier for every patient (default: routed per patient)")
+    parser.add_argument('--engine', default='flat', help="Inference engine (default: flat)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; 0 for one per CPU (default: 1, this process)")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    pipeline = None
+    try:
+        if args.workers == 1:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pipeline = HealthAssessmentPipeline(engine=args.engine)
+        else:
+            pipeline = ParallelAssessor(workers=args.workers or None, engine=args.engine)
+            print(f"🧵 Assessing on {pipeline.workers} worker processes")
+        bulk_assess(pipeline, args.input, args.output, chunk_size=args.chunk_size,
+                    input_format=args.input_format, output_format=args.output_format,
+                    tier=args.tier, resume=not args.restart)
+    except Exception as e:
+        print(f"\n❌ Bulk assessment failed: {e}")
+        return 1
+    finally:
+        if isinstance(pipeline, ParallelAssessor):
+            pipeline.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
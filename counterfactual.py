@@ -0,0 +1,204 @@
+"""
+Counterfactual "path to a better grade" search
+Finds small changes to modifiable inputs (weight, blood pressure, glucose,
+cholesterol, activity, smoking, alcohol) that lift a user's health grade to a
+target. Beam search over step-wise changes: every search step expands all
+beam states by one step of every action and scores the candidates with one
+vectorized batch_assess() call.
+
+Usage:
+    search = CounterfactualSearch(pipeline)
+    result = search.search(user_data, target_grade='B')
+"""
+import math
+import time
+
+# Grades of HealthScorer.get_health_grade, worst first
+GRADES = ('F', 'D', 'C', 'B', 'A', 'A+')
+
+# Numeric inputs: (change per step, bound, effort per step). Weight is also
+# bounded by a healthy BMI of 18.5 at the user's height
+NUMERIC_ACTIONS = {
+    'weight': (-2, 40, 1.0),
+    'systolic_bp': (-5, 110, 1.0),
+    'diastolic_bp': (-5, 70, 0.8),
+    'glucose': (-10, 85, 1.0),
+    'cholesterol': (-10, 160, 0.8),
+    'physical_activity_frequency': (1, 3, 1.5),
+}
+
+# Categorical inputs: (categories from least to most healthy, effort per step).
+# Once a smoker, "Former" is as far as it goes
+CATEGORY_ACTIONS = {
+    'physical_activity': (('Low', 'Moderate', 'High'), 2.0),
+    'smoking_status': (('Current', 'Former'), 3.0),
+    'alcohol_intake': (('Heavy', 'Moderate', 'None'), 1.5),
+}
+
+HEALTHY_BMI = 18.5
+
+
+def minimal_plans(plans):
+    """Plans that do not contain another plan (fewer or equal steps of every action)"""
+    return [plan for plan in plans
+            if not any(other is not plan and all(a <= b for a, b in zip(other['state'], plan['state']))
+                       for other in plans)]
+
+
+class CounterfactualSearch:
+    """
+    Beam search for the least-effort input changes that reach a health grade
+
+    Only inputs the user provided are changed, so the model tier (and the
+    meaning of every other input) stays the same.
+    """
+
+    def __init__(self, pipeline, beam_width=24, max_steps=30, time_budget_ms=2000,
+                 numeric_actions=None, category_actions=None):
+        """
+        Args:
+            pipeline (HealthAssessmentPipeline): Loaded pipeline
+            beam_width (int): States kept for expansion after every step
+            max_steps (int): Most single-step changes in a plan
+            time_budget_ms (float): Search stops once this much time is spent
+            numeric_actions, category_actions (dict): Override the modifiable
+                inputs, in the format of NUMERIC_ACTIONS / CATEGORY_ACTIONS
+        """
+        self.pipeline = pipeline
+        self.beam_width = beam_width
+        self.max_steps = max_steps
+        self.time_budget_ms = time_budget_ms
+        self.numeric_actions = NUMERIC_ACTIONS if numeric_actions is None else numeric_actions
+        self.category_actions = CATEGORY_ACTIONS if category_actions is None else category_actions
+
+    def _actions(self, user_data):
+        """
+        Applicable actions for a user as (field, values, effort), where
+        values[k] is the field's value after k steps (values[0] is the input)
+        """
+        actions = []
+        for field, (step, bound, effort) in self.numeric_actions.items():
+            start = user_data.get(field)
+            if start is None:
+                continue
+            if field == 'weight' and user_data.get('height'):
+                bound = max(bound, HEALTHY_BMI * (user_data['height'] / 100) ** 2)
+            n_steps = math.ceil((bound - start) / step) if (bound - start) * step > 0 else 0
+            values = [start] + [max(start + k * step, bound) if step < 0 else min(start + k * step, bound)
+                                for k in range(1, n_steps + 1)]
+            if len(values) > 1:
+                actions.append((field, values, effort))
+
+        for field, (categories, effort) in self.category_actions.items():
+            start = user_data.get(field)
+            lowered = [category.lower() for category in categories]
+            if not isinstance(start, str) or start.lower() not in lowered:
+                continue
+            values = [start] + list(categories[lowered.index(start.lower()) + 1:])
+            if len(values) > 1:
+                actions.append((field, values, effort))
+        return actions
+
+    def search(self, user_data, target_grade='B', max_plans=5):
+        """
+        Find the least-effort plans that reach at least target_grade
+
+        Args:
+            user_data (dict): User health information
+            target_grade (str): One of GRADES
+            max_plans (int): Plans to return
+
+        Returns:
+            dict: 'current' (health_score, health_grade), 'target_grade',
+                  'plans' ranked by effort - each with 'changes'
+                  ({field: {'from', 'to'}}), 'effort', 'health_score' and
+                  'health_grade' - plus 'evaluated' candidates, 'batches',
+                  'elapsed_ms', 'stop_reason' and 'complete'. stop_reason is
+                  'at_target' (no change needed), 'effort_bound' (no cheaper
+                  plan is possible), 'no_candidates' (every reachable change
+                  was tried), 'max_steps' or 'time_budget'; complete is False
+                  for the last two, which end the search early
+        """
+        if target_grade not in GRADES:
+            raise ValueError(f"target_grade must be one of {', '.join(GRADES)}, got {target_grade!r}")
+        start_time = time.perf_counter()
+        target = GRADES.index(target_grade)
+        actions = self._actions(user_data)
+
+        def candidate(state):
+            user = dict(user_data)
+            for (field, values, _), steps in zip(actions, state):
+                user[field] = values[steps]
+            return user
+
+        def effort(state):
+            return sum(steps * action_effort for (_, _, action_effort), steps in zip(actions, state))
+
+        base = self.pipeline.batch_assess([user_data], reports=False, verbose=False).results.iloc[0]
+        result = {
+            'current': {'health_score': float(base['health_score']), 'health_grade': base['health_grade']},
+            'target_grade': target_grade,
+            'plans': [],
+            'evaluated': 1,
+            'batches': 1,
+            'complete': True
+        }
+        reached = GRADES.index(base['health_grade']) >= target
+        if reached or not actions:
+            result['stop_reason'] = 'at_target' if reached else 'no_candidates'
+            result['elapsed_ms'] = (time.perf_counter() - start_time) * 1000
+            return result
+
+        min_effort = min(action_effort for _, _, action_effort in actions)
+        beam = [tuple([0] * len(actions))]
+        seen = set(beam)
+        plans = []
+        for n_steps in range(1, self.max_steps + 1):
+            # Every later plan costs at least n_steps * min_effort
+            plans = minimal_plans(plans)
+            if len(plans) >= max_plans and n_steps * min_effort > plans[max_plans - 1]['effort']:
+                result['stop_reason'] = 'effort_bound'
+                break
+            if (time.perf_counter() - start_time) * 1000 > self.time_budget_ms:
+                result['stop_reason'] = 'time_budget'
+                break
+
+            states = []
+            for state in beam:
+                for i, (_, values, _) in enumerate(actions):
+                    if state[i] + 1 < len(values):
+                        child = state[:i] + (state[i] + 1,) + state[i + 1:]
+                        if child not in seen:
+                            seen.add(child)
+                            states.append(child)
+            if not states:
+                result['stop_reason'] = 'no_candidates'
+                break
+
+            scored = self.pipeline.batch_assess([candidate(state) for state in states],
+                                                reports=False, verbose=False).results
+            result['evaluated'] += len(states)
+            result['batches'] += 1
+
+            frontier = []
+            for state, score, grade in zip(states, scored['health_score'].tolist(), scored['health_grade'].tolist()):
+                if GRADES.index(grade) >= target:
+                    plans.append({'state': state, 'effort': effort(state), 'health_score': score,
+                                  'health_grade': grade})
+                else:
+                    # Health score gained per unit of effort
+                    frontier.append(((score - result['current']['health_score']) / effort(state), state))
+            plans.sort(key=lambda plan: (plan['effort'], -plan['health_score']))
+            frontier.sort(key=lambda item: -item[0])
+            beam = [state for _, state in frontier[:self.beam_width]]
+        else:
+            result['stop_reason'] = 'max_steps'
+        result['complete'] = result['stop_reason'] not in ('max_steps', 'time_budget')
+
+        for plan in minimal_plans(plans)[:max_plans]:
+            state = plan.pop('state')
+            plan['changes'] = {field: {'from': values[0], 'to': values[steps]}
+                               for (field, values, _), steps in zip(actions, state) if steps}
+            result['plans'].append(plan)
+        result['elapsed_ms'] = (time.perf_counter() - start_time) * 1000
+        return result
@@ -2,39 +2,452 @@
 Feature Mapper - Maps user inputs to model-specific features
 Handles data preprocessing and feature engineering for all models
 """
+from collections import namedtuple
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from utils.rounding import round_array
+
+
+# A default computed from other inputs: TRANSFORMS key applied to one
+# (source keys, default) pair per argument
+Derived = namedtuple('Derived', ['transform', 'sources'])
+
+BMI_FROM_HEIGHT_WEIGHT = Derived('bmi', ((('height',), 170), (('weight',), 70)))
+PEDIGREE_FROM_FAMILY_HISTORY = Derived('pedigree', ((('family_history_diabetes',), 'no'),))
+
+# Every model feature as (model, column, source keys, default, transform), in
+# each model's column order. The first source key present in user_data gives
+# the value, else the default; the transform (a TRANSFORMS key) is applied to
+# either
+FEATURE_SPEC = (
+    ('diabetes', 'Pregnancies', ('pregnancies',), 0, None),
+    ('diabetes', 'Glucose', ('glucose', 'fasting_glucose'), 100, None),
+    ('diabetes', 'BloodPressure', ('blood_pressure', 'systolic_bp'), 80, None),
+    ('diabetes', 'SkinThickness', ('skin_thickness',), 20, None),
+    ('diabetes', 'Insulin', ('insulin',), 80, None),
+    ('diabetes', 'BMI', ('bmi',), BMI_FROM_HEIGHT_WEIGHT, None),
+    ('diabetes', 'DiabetesPedigreeFunction', ('diabetes_pedigree',), PEDIGREE_FROM_FAMILY_HISTORY, None),
+    ('diabetes', 'Age', ('age',), 30, None),
+
+    ('heart', 'age', ('age',), 30, None),
+    ('heart', 'sex', ('gender',), 'male', 'is_male'),
+    ('heart', 'cp', ('chest_pain_type',), 0, None),                 # 0-3: chest pain type
+    ('heart', 'trestbps', ('systolic_bp', 'resting_bp'), 120, None),
+    ('heart', 'chol', ('cholesterol',), 200, None),
+    ('heart', 'fbs', ('fasting_glucose',), 100, 'above_120'),
+    ('heart', 'restecg', ('resting_ecg',), 0, None),                # 0-2
+    ('heart', 'thalach', ('max_heart_rate',), 150, None),
+    ('heart', 'exang', ('exercise_induced_angina',), 'no', 'is_yes'),
+    ('heart', 'oldpeak', ('st_depression',), 0, None),
+    ('heart', 'slope', ('slope_st_segment',), 1, None),             # 0-2
+    ('heart', 'ca', ('num_major_vessels',), 0, None),               # 0-3
+    ('heart', 'thal', ('thalassemia',), 2, None),                   # 1-3
+
+    ('hypertension', 'Age', ('age',), 30, None),
+    ('hypertension', 'BMI', ('bmi',), BMI_FROM_HEIGHT_WEIGHT, None),
+    ('hypertension', 'Cholesterol', ('cholesterol',), 200, None),
+    ('hypertension', 'Systolic_BP', ('systolic_bp',), 120, None),
+    ('hypertension', 'Diastolic_BP', ('diastolic_bp',), 80, None),
+    ('hypertension', 'Smoking_Status', ('smoking_status',), 'Never', None),
+    ('hypertension', 'Alcohol_Intake', ('alcohol_intake',), 'None', None),
+    ('hypertension', 'Physical_Activity_Level', ('physical_activity',), 'Moderate', None),
+    ('hypertension', 'Family_History', ('family_history_hypertension',), 'No', None),
+    ('hypertension', 'Diabetes', ('has_diabetes',), 'No', None),
+    ('hypertension', 'Stress_Level', ('stress_level',), 'Moderate', None),
+    ('hypertension', 'Salt_Intake', ('salt_intake',), 'Moderate', None),
+    ('hypertension', 'Sleep_Duration', ('sleep_hours',), 7, None),
+    ('hypertension', 'Heart_Rate', ('resting_heart_rate',), 70, None),
+    ('hypertension', 'LDL', ('ldl',), 100, None),
+    ('hypertension', 'HDL', ('hdl',), 50, None),
+    ('hypertension', 'Triglycerides', ('triglycerides',), 150, None),
+    ('hypertension', 'Glucose', ('glucose', 'fasting_glucose'), 100, None),
+    ('hypertension', 'Gender', ('gender',), 'Male', None),
+
+    ('obesity', 'Gender', ('gender',), 'Male', None),
+    ('obesity', 'Age', ('age',), 30, None),
+    ('obesity', 'Height', ('height',), 170, 'cm_to_m'),
+    ('obesity', 'Weight', ('weight',), 70, None),
+    ('obesity', 'family_history_with_overweight', ('family_history_overweight',), 'no', None),
+    ('obesity', 'FAVC', ('frequent_high_caloric_food',), 'no', None),
+    ('obesity', 'FCVC', ('vegetable_consumption_frequency',), 2, None),  # 1-3
+    ('obesity', 'NCP', ('num_main_meals',), 3, None),               # 1-4
+    ('obesity', 'CAEC', ('food_between_meals',), 'Sometimes', None),
+    ('obesity', 'SMOKE', ('smokes',), 'no', None),
+    ('obesity', 'CH2O', ('daily_water_consumption',), 2, None),     # liters
+    ('obesity', 'SCC', ('calorie_monitoring',), 'no', None),
+    ('obesity', 'FAF', ('physical_activity_frequency',), 1, None),  # 0-3
+    ('obesity', 'TUE', ('tech_usage_time',), 1, None),              # hours
+    ('obesity', 'CALC', ('alcohol_consumption',), 'no', None),
+    ('obesity', 'MTRANS', ('transportation_mode',), 'Public_Transportation', None),
+)
+
+# Transforms of scalar values, applied to their arguments in order
+TRANSFORMS = {
+    'bmi': lambda height, weight: round(weight / (height / 100) ** 2, 2),  # Same as FeatureMapper.calculate_bmi
+    'pedigree': lambda history: 0.5 if history.lower() == 'yes' else 0.2,
+    'is_male': lambda gender: 1 if gender.lower() in ('male', 'm', '1') else 0,
+    'is_yes': lambda value: 1 if value.lower() == 'yes' else 0,
+    'above_120': lambda value: 1 if value > 120 else 0,
+    'cm_to_m': lambda value: value / 100,
+}
+
+
+def _lower(values):
+    """Lower-cased text of a column or a scalar"""
+    if isinstance(values, pd.Series):
+        return values.astype(str).str.lower()
+    return str(values).lower()
+
+
+def _is_in(values, options):
+    """Membership test of a column (element-wise) or a scalar"""
+    if isinstance(values, pd.Series):
+        return values.isin(options)
+    return values in options
+
+
+def _choose(condition, if_true, if_false):
+    """One of two values per element of a boolean column, or for a scalar condition"""
+    if isinstance(condition, pd.Series):
+        return pd.Series(np.where(condition, if_true, if_false), index=condition.index)
+    return if_true if condition else if_false
+
+
+def _picker(indexes):
+    """Callable returning the entries at `indexes` of a list, as a tuple"""
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda values: (values[index],)
+    return itemgetter(*indexes)
+
+
+def _get_all(get, keys, defaults):
+    """get() of every key, falling back to its default where the value is missing or None"""
+    values = list(map(get, keys, defaults))
+    if None in values:
+        values = [default if value is None else value for value, default in zip(values, defaults)]
+    return values
+
+
+def round_column(values, digits):
+    """Python's round() over a column (see utils.rounding.round_array) or a scalar"""
+    if not isinstance(values, pd.Series):
+        return round(values, digits)
+    return pd.Series(round_array(values.to_numpy(dtype=float), digits), index=values.index)
+
+
+# TRANSFORMS over whole columns (pd.Series), or scalars where a column is
+# missing, for FeatureMapper.get_all_feature_frames
+COLUMN_TRANSFORMS = {
+    'bmi': lambda height, weight: round_column(weight / (height / 100) ** 2, 2),
+    'pedigree': lambda history: _choose(_lower(history) == 'yes', 0.5, 0.2),
+    'is_male': lambda gender: _choose(_is_in(_lower(gender), ('male', 'm', '1')), 1, 0),
+    'is_yes': lambda values: _choose(_lower(values) == 'yes', 1, 0),
+    'above_120': lambda values: _choose(values > 120, 1, 0),
+    'cm_to_m': lambda values: values / 100,
+}
+
+
+class CompiledFeatureSpec:
+    """
+    FEATURE_SPEC compiled into single-pass extractor closures
+    
+    Every distinct lookup and derived value becomes one step, evaluated once
+    per user and shared by all features that use it (BMI, for example, is
+    computed once for diabetes and hypertension).
+    
+    A key that is absent or None is missing, in user dicts and in the
+    columns of frames(); frames() also takes NaN (pandas' missing marker) as
+    missing. User dicts are expected to hold no NaN: InputSchema drops blank
+    values, NaN included.
+    """
+    
+    def __init__(self, spec=FEATURE_SPEC, transforms=TRANSFORMS):
+        self.spec = spec
+        self.transforms = transforms
+        self.models = list(dict.fromkeys(model for model, *_ in spec))
+        self.columns = {model: [column for name, column, *_ in spec if name == model] for model in self.models}
+        # Every transform returns a number, so only untransformed string
+        # defaults make a model's rows object arrays
+        self.numeric = {model for model in self.models
+                        if all(transform or not isinstance(default, str)
+                               for name, _, _, default, transform in spec if name == model)}
+        
+        # user_data keys each feature is derived from, and each model's features
+        self.feature_keys = {model: {} for model in self.models}
+        for model, column, keys, default, _ in spec:
+            if isinstance(default, Derived):
+                keys += tuple(key for source_keys, _ in default.sources for key in source_keys)
+            self.feature_keys[model][column] = keys
+        self.dependencies = {model: frozenset(key for keys in columns.values() for key in keys)
+                             for model, columns in self.feature_keys.items()}
+        
+        self.lookups, self.steps, self.slots = self._compile(self.models)
+        self._pick = {model: _picker(slots) for model, slots in self.slots.items()}
+        self.extract_model = {model: self._model_extractor(model) for model in self.models}
+    
+    def _compile(self, models):
+        """
+        Closures computing every distinct lookup and derived value of the
+        features of `models`
+        
+        Returns:
+            tuple: (lookups, steps, slots) - lookups are the keys and the
+                   defaults read with a plain get(), the first entries of values;
+                   steps are callables(get, values) returning the next
+                   entries, in dependency order; slots maps each model to the
+                   index in values of each of its columns
+        """
+        lookups = []
+        entries = []
+        refs = {}
+        
+        def add(key, table, entry):
+            """Reference to the value computed by `entry`, added once"""
+            if key not in refs:
+                refs[key] = (table is lookups, len(table))
+                table.append(entry)
+            return refs[key]
+        
+        def lookup(keys, default):
+            """Reference to the value of the first present key, else the default"""
+            if isinstance(default, Derived):
+                arguments = [lookup(source_keys, value) for source_keys, value in default.sources]
+                fallback = add(('derived', default), entries, ('apply', self.transforms[default.transform], arguments))
+                return add((keys, default), entries, ('chain', keys, fallback))
+            if len(keys) == 1:
+                return add((keys, default), lookups, (keys[0], default))
+            return add((keys, default), entries, ('default', keys, default))
+        
+        references = {model: [] for model in models}
+        for model, column, keys, default, transform in self.spec:
+            if model in references:
+                reference = lookup(keys, default)
+                if transform is not None:
+                    reference = add((keys, default, transform), entries, ('apply', self.transforms[transform], [reference]))
+                references[model].append(reference)
+        
+        def index(reference):
+            """Position in values: lookups first, then steps"""
+            is_lookup, position = reference
+            return position if is_lookup else len(lookups) + position
+        
+        def step(kind, first, second):
+            """
+            Closure of one entry: 'apply' a transform to earlier values, or
+            look up a chain of keys falling back to an earlier value ('chain')
+            or to a constant ('default')
+            """
+            if kind == 'apply':
+                arguments = [index(argument) for argument in second]
+                if len(arguments) == 1:
+                    argument = arguments[0]
+                    return lambda get, values: first(values[argument])
+                return lambda get, values: first(*[values[i] for i in arguments])
+            keys = tuple(reversed(first))
+            fallback = index(second) if kind == 'chain' else None
+            
+            def chain(get, values):
+                value = second if fallback is None else values[fallback]
+                for key in keys:
+                    found = get(key)
+                    if found is not None:
+                        value = found
+                return value
+            return chain
+        
+        steps = [step(*entry) for entry in entries]
+        slots = {model: [index(reference) for reference in model_references]
+                 for model, model_references in references.items()}
+        return tuple(zip(*lookups)) or ((), ()), steps, slots
+    
+    def _values(self, user_data):
+        """Every lookup's and step's value for one user"""
+        get = user_data.get
+        values = _get_all(get, *self.lookups)
+        append = values.append
+        for step in self.steps:
+            append(step(get, values))
+        return values
+    
+    def _model_extractor(self, model):
+        """Feature dict of one model, evaluating only the values it needs"""
+        (keys, defaults), steps, slots = self._compile([model])
+        pick, columns = _picker(slots[model]), self.columns[model]
+        
+        def extract(user_data):
+            get = user_data.get
+            values = _get_all(get, keys, defaults)
+            append = values.append
+            for step in steps:
+                append(step(get, values))
+            return dict(zip(columns, pick(values)))
+        return extract
+    
+    def extract(self, user_data):
+        """Feature dicts of every model for one user: {model: {column: value}}"""
+        values = self._values(user_data)
+        return {model: dict(zip(self.columns[model], self._pick[model](values))) for model in self.models}
+    
+    def frames(self, users, column_transforms=COLUMN_TRANSFORMS):
+        """
+        The spec applied column-wise to a batch of users
+        
+        Lookups, defaults and transforms are whole-column operations; as in
+        extract(), each distinct lookup and derived value is computed once.
+        A missing column, None or NaN counts as a missing key.
+        
+        Args:
+            users (pd.DataFrame): One row per user, user_data keys as columns
+            column_transforms (dict): Column versions of the transforms
+        
+        Returns:
+            dict: Model name -> DataFrame of features in the model's column order
+        """
+        values = {}
+        
+        def column(key, default):
+            if key not in users.columns:
+                return default
+            present = users[key]
+            return present.where(present.notna(), default)
+        
+        def lookup(keys, default):
+            if (keys, default) not in values:
+                if isinstance(default, Derived):
+                    arguments = [lookup(source_keys, value) for source_keys, value in default.sources]
+                    fallback = column_transforms[default.transform](*arguments)
+                else:
+                    fallback = default
+                for key in reversed(keys):
+                    fallback = column(key, fallback)
+                values[(keys, default)] = fallback
+            return values[(keys, default)]
+        
+        features = {model: {} for model in self.models}
+        for model, name, keys, default, transform in self.spec:
+            value = lookup(keys, default)
+            if transform is not None:
+                if (keys, default, transform) not in values:
+                    values[(keys, default, transform)] = column_transforms[transform](value)
+                value = values[(keys, default, transform)]
+            features[model][name] = value
+        return {model: pd.DataFrame(columns, index=users.index) for model, columns in features.items()}
+    
+    def empty_rows(self, n_users):
+        """Preallocated per-model feature arrays for fill()"""
+        return {model: np.empty((n_users, len(columns)), dtype=float if model in self.numeric else object)
+                for model, columns in self.columns.items()}
+    
+    def fill(self, users, rows=None):
+        """
+        Write the features of many users straight into per-model arrays
+        
+        Args:
+            users (list): User data dicts
+            rows (dict): Optional preallocated arrays, see empty_rows()
+        
+        Returns:
+            dict: Model name -> array of shape (len(users), n_columns) in the
+                  model's column order; float for all-numeric models, object
+                  otherwise
+        """
+        rows = self.empty_rows(len(users)) if rows is None else rows
+        outputs = [(rows[model], self._pick[model]) for model in self.models]
+        for i, user_data in enumerate(users):
+            values = self._values(user_data)
+            for model_rows, pick in outputs:
+                model_rows[i] = pick(values)
+        return rows
 
 
 class FeatureMapper:
     """
     Maps user-provided health data to features required by each model.
-    Handles missing values with reasonable defaults and performs feature derivation.
+    Handles missing values with reasonable defaults (or an imputer, see use_imputer)
+    and performs feature derivation.
     """
     
     def __init__(self):
-        # Define required features for each model
-        self.diabetes_features = [
-            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-        ]
+        # Single-pass extractor compiled from FEATURE_SPEC
+        self.compiled = CompiledFeatureSpec()
         
-        self.heart_features = [
-            'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs',
-            'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
-        ]
+        # Required features for each model, in the models' column order
+        self.diabetes_features = self.compiled.columns['diabetes']
+        self.heart_features = self.compiled.columns['heart']
+        self.hypertension_features = self.compiled.columns['hypertension']
+        self.obesity_features = self.compiled.columns['obesity']
         
-        self.hypertension_features = [
-            'Age', 'BMI', 'Cholesterol', 'Systolic_BP', 'Diastolic_BP',
-            'Smoking_Status', 'Alcohol_Intake', 'Physical_Activity_Level',
-            'Family_History', 'Diabetes', 'Stress_Level', 'Salt_Intake',
-            'Sleep_Duration', 'Heart_Rate', 'LDL', 'HDL', 'Triglycerides',
-            'Glucose', 'Gender'
+        # Inputs collected by the quick check (plus direct aliases of them)
+        self.quick_fields = [
+            'age', 'gender', 'height', 'weight', 'bmi', 'systolic_bp', 'diastolic_bp',
+            'blood_pressure', 'resting_bp', 'glucose', 'cholesterol'
         ]
         
-        self.obesity_features = [
-            'Gender', 'Age', 'Height', 'Weight', 'family_history_with_overweight',
-            'FAVC', 'FCVC', 'NCP', 'CAEC', 'SMOKE', 'CH2O', 'SCC', 'FAF', 'TUE',
-            'CALC', 'MTRANS'
+        # Every other input the mappers read; any of these calls for the full models
+        self.detailed_fields = [
+            'pregnancies', 'fasting_glucose', 'skin_thickness', 'insulin', 'diabetes_pedigree',
+            'family_history_diabetes', 'chest_pain_type', 'resting_ecg', 'max_heart_rate',
+            'exercise_induced_angina', 'st_depression', 'slope_st_segment', 'num_major_vessels',
+            'thalassemia', 'smoking_status', 'alcohol_intake', 'physical_activity',
+            'family_history_hypertension', 'has_diabetes', 'stress_level', 'salt_intake',
+            'sleep_hours', 'resting_heart_rate', 'ldl', 'hdl', 'triglycerides',
+            'family_history_overweight', 'frequent_high_caloric_food',
+            'vegetable_consumption_frequency', 'num_main_meals', 'food_between_meals', 'smokes',
+            'daily_water_consumption', 'calorie_monitoring', 'physical_activity_frequency',
+            'tech_usage_time', 'alcohol_consumption', 'transportation_mode'
         ]
+        
+        # user_data keys each model's features are derived from
+        self.dependencies = self.compiled.dependencies
+        
+        # Fills features the user did not supply from similar records instead
+        # of the constant defaults, see use_imputer()
+        self.imputer = None
+        self._imputed_keys = {}
+    
+    def use_imputer(self, imputer):
+        """
+        Fill features whose inputs are missing with an imputer
+        
+        Every mapping method then passes the features it returns through the
+        imputer. A feature counts as missing when none of the user_data keys
+        it is derived from has a value (see CompiledFeatureSpec.feature_keys).
+        
+        Args:
+            imputer: models.imputer.NeighborImputer, or None for the constant
+                     defaults
+        """
+        self.imputer = imputer
+        self._imputed_keys = {} if imputer is None else {
+            model: [(column, self.compiled.feature_keys[model][column]) for column in imputer.fill_columns(model)]
+            for model in self.compiled.models if imputer.fill_columns(model)
+        }
+    
+    def _impute(self, model, features, user_data):
+        """Fill a model's feature dict where user_data lacks the inputs"""
+        if model in self._imputed_keys:
+            columns = [column for column, keys in self._imputed_keys[model]
+                       if all(user_data.get(key) in (None, '') for key in keys)]
+            if columns:
+                self.imputer.impute(model, features, columns)
+        return features
+    
+    def dependent_models(self, fields):
+        """
+        Models whose features depend on any of the given user_data keys
+        
+        Args:
+            fields (iterable): Changed user_data keys
+        
+        Returns:
+            list: Model names, in get_all_features() order
+        """
+        fields = set(fields)
+        return [name for name, keys in self.dependencies.items() if keys & fields]
     
     def calculate_bmi(self, height_cm, weight_kg):
         """Calculate BMI from height (cm) and weight (kg)"""
@@ -52,21 +465,7 @@ class FeatureMapper:
         Returns:
             dict: Features formatted for diabetes model
         """
-        features = {
-            'Pregnancies': user_data.get('pregnancies', 0),
-            'Glucose': user_data.get('glucose', user_data.get('fasting_glucose', 100)),
-            'BloodPressure': user_data.get('blood_pressure', 
-                                          user_data.get('systolic_bp', 80)),
-            'SkinThickness': user_data.get('skin_thickness', 20),
-            'Insulin': user_data.get('insulin', 80),
-            'BMI': user_data.get('bmi', 
-                                 self.calculate_bmi(user_data.get('height', 170),
-                                                   user_data.get('weight', 70))),
-            'DiabetesPedigreeFunction': user_data.get('diabetes_pedigree', 
-                                                      0.5 if user_data.get('family_history_diabetes', 'no').lower() == 'yes' else 0.2),
-            'Age': user_data.get('age', 30)
-        }
-        return features
+        return self._impute('diabetes', self.compiled.extract_model['diabetes'](user_data), user_data)
     
     def map_to_heart_features(self, user_data):
         """
@@ -78,25 +477,7 @@ class FeatureMapper:
         Returns:
             dict: Features formatted for heart model
         """
-        # Gender mapping: Male=1, Female=0
-        sex = 1 if user_data.get('gender', 'male').lower() in ['male', 'm', '1'] else 0
-        
-        features = {
-            'age': user_data.get('age', 30),
-            'sex': sex,
-            'cp': user_data.get('chest_pain_type', 0),  # 0-3: chest pain type
-            'trestbps': user_data.get('systolic_bp', user_data.get('resting_bp', 120)),
-            'chol': user_data.get('cholesterol', 200),
-            'fbs': 1 if user_data.get('fasting_glucose', 100) > 120 else 0,
-            'restecg': user_data.get('resting_ecg', 0),  # 0-2
-            'thalach': user_data.get('max_heart_rate', 150),
-            'exang': 1 if user_data.get('exercise_induced_angina', 'no').lower() == 'yes' else 0,
-            'oldpeak': user_data.get('st_depression', 0),
-            'slope': user_data.get('slope_st_segment', 1),  # 0-2
-            'ca': user_data.get('num_major_vessels', 0),  # 0-3
-            'thal': user_data.get('thalassemia', 2)  # 1-3
-        }
-        return features
+        return self._impute('heart', self.compiled.extract_model['heart'](user_data), user_data)
     
     def map_to_hypertension_features(self, user_data):
         """
@@ -108,30 +489,7 @@ class FeatureMapper:
         Returns:
             dict: Features formatted for hypertension model
         """
-        features = {
-            'Age': user_data.get('age', 30),
-            'BMI': user_data.get('bmi',
-                                 self.calculate_bmi(user_data.get('height', 170),
-                                                   user_data.get('weight', 70))),
-            'Cholesterol': user_data.get('cholesterol', 200),
-            'Systolic_BP': user_data.get('systolic_bp', 120),
-            'Diastolic_BP': user_data.get('diastolic_bp', 80),
-            'Smoking_Status': user_data.get('smoking_status', 'Never'),
-            'Alcohol_Intake': user_data.get('alcohol_intake', 'None'),
-            'Physical_Activity_Level': user_data.get('physical_activity', 'Moderate'),
-            'Family_History': user_data.get('family_history_hypertension', 'No'),
-            'Diabetes': user_data.get('has_diabetes', 'No'),
-            'Stress_Level': user_data.get('stress_level', 'Moderate'),
-            'Salt_Intake': user_data.get('salt_intake', 'Moderate'),
-            'Sleep_Duration': user_data.get('sleep_hours', 7),
-            'Heart_Rate': user_data.get('resting_heart_rate', 70),
-            'LDL': user_data.get('ldl', 100),
-            'HDL': user_data.get('hdl', 50),
-            'Triglycerides': user_data.get('triglycerides', 150),
-            'Glucose': user_data.get('glucose', user_data.get('fasting_glucose', 100)),
-            'Gender': user_data.get('gender', 'Male')
-        }
-        return features
+        return self._impute('hypertension', self.compiled.extract_model['hypertension'](user_data), user_data)
     
     def map_to_obesity_features(self, user_data):
         """
@@ -143,25 +501,7 @@ class FeatureMapper:
         Returns:
             dict: Features formatted for obesity model
         """
-        features = {
-            'Gender': user_data.get('gender', 'Male'),
-            'Age': user_data.get('age', 30),
-            'Height': user_data.get('height', 170) / 100,  # Convert cm to meters
-            'Weight': user_data.get('weight', 70),
-            'family_history_with_overweight': user_data.get('family_history_overweight', 'no'),
-            'FAVC': user_data.get('frequent_high_caloric_food', 'no'),
-            'FCVC': user_data.get('vegetable_consumption_frequency', 2),  # 1-3
-            'NCP': user_data.get('num_main_meals', 3),  # 1-4
-            'CAEC': user_data.get('food_between_meals', 'Sometimes'),
-            'SMOKE': user_data.get('smokes', 'no'),
-            'CH2O': user_data.get('daily_water_consumption', 2),  # liters
-            'SCC': user_data.get('calorie_monitoring', 'no'),
-            'FAF': user_data.get('physical_activity_frequency', 1),  # 0-3
-            'TUE': user_data.get('tech_usage_time', 1),  # hours
-            'CALC': user_data.get('alcohol_consumption', 'no'),
-            'MTRANS': user_data.get('transportation_mode', 'Public_Transportation')
-        }
-        return features
+        return self._impute('obesity', self.compiled.extract_model['obesity'](user_data), user_data)
     
     def get_all_features(self, user_data):
         """
@@ -173,12 +513,92 @@ class FeatureMapper:
         Returns:
             dict: Dictionary containing feature sets for all models
         """
-        return {
-            'diabetes': self.map_to_diabetes_features(user_data),
-            'heart': self.map_to_heart_features(user_data),
-            'hypertension': self.map_to_hypertension_features(user_data),
-            'obesity': self.map_to_obesity_features(user_data)
-        }
+        features = self.compiled.extract(user_data)
+        for model in self._imputed_keys:
+            self._impute(model, features[model], user_data)
+        return features
+    
+    def get_all_feature_rows(self, users):
+        """
+        get_all_features() for many users, written into per-model arrays
+        
+        Args:
+            users (list): User data dicts
+        
+        Returns:
+            dict: Model name -> array of shape (len(users), n_columns) in the
+                  model's column order (see CompiledFeatureSpec.fill)
+        """
+        rows = self.compiled.fill(users)
+        for model, feature_keys in self._imputed_keys.items():
+            missing = {column: np.array([all(user_data.get(key) in (None, '') for key in keys) for user_data in users],
+                                        dtype=bool)
+                       for column, keys in feature_keys}
+            self.imputer.impute_rows(model, rows[model], self.compiled.columns[model], missing)
+        return rows
+    
+    def get_all_feature_frames(self, users):
+        """
+        Column-wise get_all_features() for a batch of users
+        
+        Applies the same defaults and derivations as the map_to_* methods to
+        whole columns (see CompiledFeatureSpec.frames). A missing column, None
+        or NaN counts as a missing value, as an absent key or None does in
+        the map_to_* methods.
+        
+        Args:
+            users: pandas DataFrame with one row per user and user_data keys
+                   as columns, or a pyarrow Table (converted with to_pandas())
+        
+        Returns:
+            dict: Model name -> DataFrame of features in the model's column order
+        """
+        if hasattr(users, 'to_pandas'):
+            users = users.to_pandas()
+        frames = self.compiled.frames(users)
+        for model, feature_keys in self._imputed_keys.items():
+            missing = {column: ~self._supplied_mask(users, keys) for column, keys in feature_keys}
+            self.imputer.impute_frame(model, frames[model], missing)
+        return frames
+    
+    @staticmethod
+    def _supplied_mask(users, keys):
+        """Rows of a user frame with a value for any of the keys"""
+        supplied = np.zeros(len(users), dtype=bool)
+        for key in keys:
+            if key in users.columns:
+                values = users[key]
+                supplied |= (values.notna() & (values != '')).to_numpy()
+        return supplied
+    
+    def is_quick_input(self, user_data):
+        """
+        Check whether user data contains only quick-check fields
+        
+        Args:
+            user_data (dict): User health information
+        
+        Returns:
+            bool: True if no input beyond the quick-check fields is provided
+        """
+        return not any(user_data.get(field) not in (None, '') for field in self.detailed_fields)
+    
+    def quick_input_mask(self, users):
+        """
+        Column-wise is_quick_input() for a batch of users
+        
+        Args:
+            users (pd.DataFrame): One row per user, user_data keys as columns
+        
+        Returns:
+            np.ndarray: Boolean array, True for rows with only quick-check fields
+        """
+        quick = np.ones(len(users), dtype=bool)
+        for field in self.detailed_fields:
+            if field in users.columns:
+                values = users[field]
+                quick &= ~(values.notna() & (values != '')).to_numpy()
+        return quick
     
     def get_required_inputs(self):
         """
@@ -1,6 +1,87 @@
 """
 Health Scorer - Combines individual health risk scores into overall health assessment
 """
+import numpy as np
+
+from utils.rounding import round_array
+
+
+# Conditions in report order; also the column order of risk score matrices
+CONDITIONS = ('heart', 'diabetes', 'hypertension', 'obesity')
+
+# Recommendations per condition and risk level, as (headline, advice lines);
+# the headline is formatted with the condition's risk score
+RECOMMENDATIONS = {
+    'heart': {
+        'critical': ("🫀 HEART HEALTH: {score:.1f}% risk - CRITICAL. Seek immediate medical attention.",
+                     ("   - Schedule urgent cardiology appointment",
+                      "   - Monitor blood pressure and cholesterol daily",
+                      "   - Avoid strenuous activities until cleared by doctor")),
+        'high': ("🫀 HEART HEALTH: {score:.1f}% risk - High. Consult a cardiologist soon.",
+                 ("   - Monitor blood pressure and cholesterol regularly",
+                  "   - Engage in 30+ minutes of cardio exercise daily",
+                  "   - Reduce saturated fat and sodium intake")),
+        'moderate': ("🫀 HEART HEALTH: {score:.1f}% risk - Moderate. Take preventive measures.",
+                     ("   - Regular cardiovascular exercise (walking, cycling)",
+                      "   - Maintain healthy weight and cholesterol levels")),
+        'low': ("🫀 HEART HEALTH: {score:.1f}% risk - Low. Keep up the good work!",
+                ("   - Continue healthy lifestyle habits",)),
+    },
+    'diabetes': {
+        'critical': ("🩸 DIABETES: {score:.1f}% risk - CRITICAL. Get tested immediately.",
+                     ("   - Schedule urgent blood glucose test (HbA1c)",
+                      "   - Strictly limit sugar and refined carbs",
+                      "   - Consider consulting an endocrinologist")),
+        'high': ("🩸 DIABETES: {score:.1f}% risk - High. Get blood sugar tested.",
+                 ("   - Monitor glucose levels regularly",
+                  "   - Reduce sugar and refined carbohydrate intake",
+                  "   - Increase fiber-rich foods and whole grains")),
+        'moderate': ("🩸 DIABETES: {score:.1f}% risk - Moderate. Focus on prevention.",
+                     ("   - Maintain healthy weight through diet and exercise",
+                      "   - Limit sugary beverages and processed foods")),
+        'low': ("🩸 DIABETES: {score:.1f}% risk - Low. Excellent!",
+                ("   - Maintain balanced diet with controlled portions",)),
+    },
+    'hypertension': {
+        'critical': ("💊 BLOOD PRESSURE: {score:.1f}% risk - CRITICAL. Check BP now!",
+                     ("   - Measure blood pressure immediately",
+                      "   - Strictly limit sodium (<1500mg/day)",
+                      "   - Avoid stress and seek medical help")),
+        'high': ("💊 BLOOD PRESSURE: {score:.1f}% risk - High. Monitor BP regularly.",
+                 ("   - Reduce sodium intake (< 2000mg/day)",
+                  "   - Practice stress management techniques",
+                  "   - Avoid excessive alcohol and caffeine")),
+        'moderate': ("💊 BLOOD PRESSURE: {score:.1f}% risk - Moderate. Take preventive steps.",
+                     ("   - Maintain regular sleep schedule (7-8 hours)",
+                      "   - Engage in regular physical activity")),
+        'low': ("💊 BLOOD PRESSURE: {score:.1f}% risk - Low. Great!",
+                ("   - Continue healthy habits and regular exercise",)),
+    },
+    'obesity': {
+        'critical': ("⚖️ WEIGHT MANAGEMENT: {score:.1f}% risk - CRITICAL. Urgent action needed.",
+                     ("   - Consult healthcare provider for weight management plan",
+                      "   - Consider supervised weight loss program",
+                      "   - Address underlying health conditions")),
+        'high': ("⚖️ WEIGHT MANAGEMENT: {score:.1f}% risk - High. Action needed.",
+                 ("   - Consult a nutritionist for personalized diet plan",
+                  "   - Aim for gradual weight loss (1-2 lbs/week)",
+                  "   - Combine cardio and strength training exercises")),
+        'moderate': ("⚖️ WEIGHT MANAGEMENT: {score:.1f}% risk - Moderate. Room for improvement.",
+                     ("   - Maintain calorie balance and portion control",
+                      "   - Increase daily physical activity")),
+        'low': ("⚖️ WEIGHT MANAGEMENT: {score:.1f}% risk - Low. Healthy weight!",
+                ("   - Maintain current healthy eating patterns",)),
+    },
+}
+for _levels in RECOMMENDATIONS.values():
+    _levels['very high'] = _levels['critical']
+
+# Added when every risk is low
+ALL_LOW_RECOMMENDATIONS = (
+    "✅ EXCELLENT OVERALL HEALTH STATUS!",
+    "   - Continue maintaining healthy lifestyle habits",
+    "   - Regular health checkups for prevention",
+)
 
 
 class HealthScorer:
@@ -21,6 +102,17 @@ class HealthScorer:
             'high': 70,
             'critical': 85
         }
+        # Levels below each threshold above, then at or above the last one
+        self.risk_levels = ('low', 'moderate', 'high', 'very high', 'critical')
+        
+        # Lowest health score of each grade; anything below the last is an F
+        self.grade_thresholds = {
+            'A+': 90,
+            'A': 80,
+            'B': 70,
+            'C': 60,
+            'D': 50
+        }
     
     def calculate_composite_risk(self, risk_scores):
         """
@@ -88,18 +180,10 @@ class HealthScorer:
         Returns:
             str: Letter grade (A+ to F)
         """
-        if health_score >= 90:
-            return 'A+'
-        elif health_score >= 80:
-            return 'A'
-        elif health_score >= 70:
-            return 'B'
-        elif health_score >= 60:
-            return 'C'
-        elif health_score >= 50:
-            return 'D'
-        else:
-            return 'F'
+        for grade, threshold in self.grade_thresholds.items():
+            if health_score >= threshold:
+                return grade
+        return 'F'
     
     def generate_recommendations(self, risk_scores):
         """
@@ -113,94 +197,15 @@ class HealthScorer:
             list: List of recommendation strings
         """
         recommendations = []
-        
-        # Get risk levels for each condition
-        heart_level = self.get_risk_level(risk_scores['heart'])
-        diabetes_level = self.get_risk_level(risk_scores['diabetes'])
-        hypertension_level = self.get_risk_level(risk_scores['hypertension'])
-        obesity_level = self.get_risk_level(risk_scores['obesity'])
-        
-        # Heart disease recommendations - based on actual risk level
-        if heart_level in ['critical', 'very high']:
-            recommendations.append(f"🫀 HEART HEALTH: {risk_scores['heart']:.1f}% risk - CRITICAL. Seek immediate medical attention.")
-            recommendations.append("   - Schedule urgent cardiology appointment")
-            recommendations.append("   - Monitor blood pressure and cholesterol daily")
-            recommendations.append("   - Avoid strenuous activities until cleared by doctor")
-        elif heart_level == 'high':
-            recommendations.append(f"🫀 HEART HEALTH: {risk_scores['heart']:.1f}% risk - High. Consult a cardiologist soon.")
-            recommendations.append("   - Monitor blood pressure and cholesterol regularly")
-            recommendations.append("   - Engage in 30+ minutes of cardio exercise daily")
-            recommendations.append("   - Reduce saturated fat and sodium intake")
-        elif heart_level == 'moderate':
-            recommendations.append(f"🫀 HEART HEALTH: {risk_scores['heart']:.1f}% risk - Moderate. Take preventive measures.")
-            recommendations.append("   - Regular cardiovascular exercise (walking, cycling)")
-            recommendations.append("   - Maintain healthy weight and cholesterol levels")
-        elif heart_level == 'low':
-            recommendations.append(f"🫀 HEART HEALTH: {risk_scores['heart']:.1f}% risk - Low. Keep up the good work!")
-            recommendations.append("   - Continue healthy lifestyle habits")
-        
-        # Diabetes recommendations - based on actual risk level
-        if diabetes_level in ['critical', 'very high']:
-            recommendations.append(f"🩸 DIABETES: {risk_scores['diabetes']:.1f}% risk - CRITICAL. Get tested immediately.")
-            recommendations.append("   - Schedule urgent blood glucose test (HbA1c)")
-            recommendations.append("   - Strictly limit sugar and refined carbs")
-            recommendations.append("   - Consider consulting an endocrinologist")
-        elif diabetes_level == 'high':
-            recommendations.append(f"🩸 DIABETES: {risk_scores['diabetes']:.1f}% risk - High. Get blood sugar tested.")
-            recommendations.append("   - Monitor glucose levels regularly")
-            recommendations.append("   - Reduce sugar and refined carbohydrate intake")
-            recommendations.append("   - Increase fiber-rich foods and whole grains")
-        elif diabetes_level == 'moderate':
-            recommendations.append(f"🩸 DIABETES: {risk_scores['diabetes']:.1f}% risk - Moderate. Focus on prevention.")
-            recommendations.append("   - Maintain healthy weight through diet and exercise")
-            recommendations.append("   - Limit sugary beverages and processed foods")
-        elif diabetes_level == 'low':
-            recommendations.append(f"🩸 DIABETES: {risk_scores['diabetes']:.1f}% risk - Low. Excellent!")
-            recommendations.append("   - Maintain balanced diet with controlled portions")
-        
-        # Hypertension recommendations - based on actual risk level
-        if hypertension_level in ['critical', 'very high']:
-            recommendations.append(f"💊 BLOOD PRESSURE: {risk_scores['hypertension']:.1f}% risk - CRITICAL. Check BP now!")
-            recommendations.append("   - Measure blood pressure immediately")
-            recommendations.append("   - Strictly limit sodium (<1500mg/day)")
-            recommendations.append("   - Avoid stress and seek medical help")
-        elif hypertension_level == 'high':
-            recommendations.append(f"💊 BLOOD PRESSURE: {risk_scores['hypertension']:.1f}% risk - High. Monitor BP regularly.")
-            recommendations.append("   - Reduce sodium intake (< 2000mg/day)")
-            recommendations.append("   - Practice stress management techniques")
-            recommendations.append("   - Avoid excessive alcohol and caffeine")
-        elif hypertension_level == 'moderate':
-            recommendations.append(f"💊 BLOOD PRESSURE: {risk_scores['hypertension']:.1f}% risk - Moderate. Take preventive steps.")
-            recommendations.append("   - Maintain regular sleep schedule (7-8 hours)")
-            recommendations.append("   - Engage in regular physical activity")
-        elif hypertension_level == 'low':
-            recommendations.append(f"💊 BLOOD PRESSURE: {risk_scores['hypertension']:.1f}% risk - Low. Great!")
-            recommendations.append("   - Continue healthy habits and regular exercise")
-        
-        # Obesity recommendations - based on actual risk level
-        if obesity_level in ['critical', 'very high']:
-            recommendations.append(f"⚖️ WEIGHT MANAGEMENT: {risk_scores['obesity']:.1f}% risk - CRITICAL. Urgent action needed.")
-            recommendations.append("   - Consult healthcare provider for weight management plan")
-            recommendations.append("   - Consider supervised weight loss program")
-            recommendations.append("   - Address underlying health conditions")
-        elif obesity_level == 'high':
-            recommendations.append(f"⚖️ WEIGHT MANAGEMENT: {risk_scores['obesity']:.1f}% risk - High. Action needed.")
-            recommendations.append("   - Consult a nutritionist for personalized diet plan")
-            recommendations.append("   - Aim for gradual weight loss (1-2 lbs/week)")
-            recommendations.append("   - Combine cardio and strength training exercises")
-        elif obesity_level == 'moderate':
-            recommendations.append(f"⚖️ WEIGHT MANAGEMENT: {risk_scores['obesity']:.1f}% risk - Moderate. Room for improvement.")
-            recommendations.append("   - Maintain calorie balance and portion control")
-            recommendations.append("   - Increase daily physical activity")
-        elif obesity_level == 'low':
-            recommendations.append(f"⚖️ WEIGHT MANAGEMENT: {risk_scores['obesity']:.1f}% risk - Low. Healthy weight!")
-            recommendations.append("   - Maintain current healthy eating patterns")
+        levels = {name: self.get_risk_level(risk_scores[name]) for name in CONDITIONS}
+        for name, level in levels.items():
+            headline, advice = RECOMMENDATIONS[name][level]
+            recommendations.append(headline.format(score=risk_scores[name]))
+            recommendations.extend(advice)
         
         # General recommendations only if ALL risks are low
-        if all(level == 'low' for level in [heart_level, diabetes_level, hypertension_level, obesity_level]):
-            recommendations.append("✅ EXCELLENT OVERALL HEALTH STATUS!")
-            recommendations.append("   - Continue maintaining healthy lifestyle habits")
-            recommendations.append("   - Regular health checkups for prevention")
+        if all(level == 'low' for level in levels.values()):
+            recommendations.extend(ALL_LOW_RECOMMENDATIONS)
         
         return recommendations
     
@@ -249,6 +254,117 @@ class HealthScorer:
         
         return report
     
+    def risk_matrix(self, risk_scores):
+        """
+        Risk scores of many users as one float matrix
+        
+        Args:
+            risk_scores: Mapping (dict or DataFrame) with keys heart, diabetes,
+                         hypertension, obesity and arrays of risk percentages
+                         as values, or an array of shape (n_users, 4) with
+                         columns in CONDITIONS order
+        
+        Returns:
+            np.ndarray: Shape (n_users, 4), columns in CONDITIONS order
+        """
+        if hasattr(risk_scores, 'keys'):
+            return np.column_stack([np.asarray(risk_scores[name], dtype=float) for name in CONDITIONS])
+        matrix = np.asarray(risk_scores, dtype=float)
+        if matrix.ndim != 2 or matrix.shape[1] != len(CONDITIONS):
+            raise ValueError(f"Expected risk scores of shape (n_users, {len(CONDITIONS)}), got {matrix.shape}")
+        return matrix
+    
+    def calculate_composite_risks(self, risk_scores):
+        """
+        Array version of calculate_composite_risk(): one weighted matrix product
+        
+        The product may sum in another order than calculate_composite_risk();
+        that only shows near a rounding tie, so those rows are summed again
+        the scalar way.
+        """
+        scores = self.risk_matrix(risk_scores)
+        weights = np.array([self.weights[name] for name in CONDITIONS])
+        return round_array(scores @ weights, 2,
+                           lambda i: self.calculate_composite_risk(dict(zip(CONDITIONS, scores[i].tolist()))))
+    
+    def calculate_health_scores(self, risk_scores):
+        """Array version of calculate_health_score()"""
+        return np.round(100 - self.calculate_composite_risks(risk_scores), 2)
+    
+    def score_batch(self, risk_scores, recommendations=False):
+        """
+        Columnar generate_health_report() for many users at once
+        
+        Composite risks are one matrix product; levels and grades are binary
+        searches over the threshold tables. Results match
+        generate_health_report() per user.
+        
+        Args:
+            risk_scores: Risk percentages (0-100) of every user, see risk_matrix()
+            recommendations (bool): Also build each user's recommendation list
+                                    (the only part that loops over users)
+        
+        Returns:
+            dict: Arrays 'composite_risk', 'health_score', 'risk_level',
+                  'health_grade', and '<condition>_risk' (rounded to 2
+                  decimals) and '<condition>_level' per condition; plus
+                  'recommendations', a list of lists, if requested
+        """
+        scores = self.risk_matrix(risk_scores)
+        composite_risk = self.calculate_composite_risks(scores)
+        health_score = np.round(100 - composite_risk, 2)
+        level_codes = self.risk_level_codes(scores)
+        
+        levels = np.array(self.risk_levels, dtype=object)
+        batch = {
+            'composite_risk': composite_risk,
+            'health_score': health_score,
+            'risk_level': self.get_risk_levels(composite_risk),
+            'health_grade': self.get_health_grades(health_score)
+        }
+        for j, name in enumerate(CONDITIONS):
+            batch[f'{name}_risk'] = round_array(scores[:, j], 2)
+            batch[f'{name}_level'] = levels[level_codes[:, j]]
+        if recommendations:
+            batch['recommendations'] = self._recommendation_lists(scores, level_codes)
+        return batch
+    
+    def _recommendation_lists(self, scores, level_codes):
+        """generate_recommendations() of every row of a risk matrix, from its level codes"""
+        columns = []
+        for j, name in enumerate(CONDITIONS):
+            blocks = [RECOMMENDATIONS[name][level] for level in self.risk_levels]
+            codes = level_codes[:, j].tolist()
+            headlines = [blocks[code][0].format(score=score) for code, score in zip(codes, scores[:, j].tolist())]
+            columns.append((headlines, [blocks[code][1] for code in codes]))
+        all_low = (level_codes == 0).all(axis=1).tolist()
+        
+        lists = []
+        for i, low in enumerate(all_low):
+            recommendations = []
+            for headlines, advice in columns:
+                recommendations.append(headlines[i])
+                recommendations.extend(advice[i])
+            if low:
+                recommendations.extend(ALL_LOW_RECOMMENDATIONS)
+            lists.append(recommendations)
+        return lists
+    
+    def risk_level_codes(self, risk_scores):
+        """Index into risk_levels of every risk score (any array shape)"""
+        edges = [self.risk_thresholds[key] for key in ('low', 'moderate', 'high', 'critical')]
+        return np.searchsorted(edges, risk_scores, side='right')
+    
+    def get_risk_levels(self, risk_scores):
+        """Array version of get_risk_level()"""
+        return np.array(self.risk_levels, dtype=object)[self.risk_level_codes(risk_scores)]
+    
+    def get_health_grades(self, health_scores):
+        """Array version of get_health_grade()"""
+        thresholds = sorted(self.grade_thresholds.items(), key=lambda item: item[1])
+        grades = np.array(['F'] + [grade for grade, _ in thresholds], dtype=object)
+        return grades[np.searchsorted([threshold for _, threshold in thresholds], health_scores, side='right')]
+    
     def print_health_report(self, report):
         """
         Print formatted health report to console
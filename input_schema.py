@@ -0,0 +1,278 @@
+"""
+Input Schema - Validates and coerces raw user inputs at the edge
+One schema for the web API, the CLI and batch jobs: every input FeatureMapper
+reads (described by FeatureMapper.get_required_inputs) with its type and valid
+range, compiled into one coercer per field. Unparseable or out-of-range values
+are rejected with field-level errors before any model work.
+
+Usage:
+    schema = InputSchema()
+    user_data = schema.validate(form_data)          # raises InputValidationError
+    users, errors = schema.validate_frame(chunk)    # errors is '' for valid rows
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from feature_mapper import FeatureMapper
+
+
+# A compiled field: kind ('number', 'integer' or 'choice'), the inclusive
+# range of numbers and, for choices, the canonical values
+FieldRule = namedtuple('FieldRule', ['kind', 'low', 'high', 'choices'])
+
+# Numeric inputs as (kind, min, max). Ranges are the wider of the web form's
+# and the CLI's limits; integers are category codes and counts
+NUMERIC_RANGES = {
+    'age': ('number', 1, 120),
+    'height': ('number', 50, 250),
+    'weight': ('number', 20, 300),
+    'bmi': ('number', 10, 100),
+    'systolic_bp': ('number', 60, 250),
+    'diastolic_bp': ('number', 30, 150),
+    'blood_pressure': ('number', 30, 250),
+    'resting_bp': ('number', 60, 250),
+    'resting_heart_rate': ('number', 30, 200),
+    'max_heart_rate': ('number', 60, 250),
+    'glucose': ('number', 30, 500),
+    'fasting_glucose': ('number', 30, 500),
+    'cholesterol': ('number', 50, 600),
+    'ldl': ('number', 20, 400),
+    'hdl': ('number', 10, 150),
+    'triglycerides': ('number', 30, 1000),
+    'insulin': ('number', 0, 900),
+    'skin_thickness': ('number', 0, 100),
+    'diabetes_pedigree': ('number', 0, 3),
+    'pregnancies': ('integer', 0, 20),
+    'st_depression': ('number', 0, 10),
+    'chest_pain_type': ('integer', 0, 3),
+    'resting_ecg': ('integer', 0, 2),
+    'slope_st_segment': ('integer', 0, 2),
+    'num_major_vessels': ('integer', 0, 4),
+    'thalassemia': ('integer', 0, 3),
+    'sleep_hours': ('number', 0, 24),
+    'vegetable_consumption_frequency': ('number', 1, 3),
+    'num_main_meals': ('number', 1, 6),
+    'daily_water_consumption': ('number', 0, 10),
+    'physical_activity_frequency': ('number', 0, 7),
+    'tech_usage_time': ('number', 0, 24),
+}
+
+# Categorical inputs, spelled as the models' encoders were trained on them
+CHOICES = {
+    'gender': ('Male', 'Female'),
+    'smoking_status': ('Never', 'Former', 'Current'),
+    'alcohol_intake': ('None', 'Moderate', 'Heavy'),
+    'physical_activity': ('Low', 'Moderate', 'High'),
+    'stress_level': ('Low', 'Moderate', 'High'),
+    'salt_intake': ('Low', 'Moderate', 'High'),
+    'family_history_hypertension': ('Yes', 'No'),
+    'has_diabetes': ('Yes', 'No'),
+    'family_history_diabetes': ('yes', 'no'),
+    'family_history_overweight': ('yes', 'no'),
+    'exercise_induced_angina': ('yes', 'no'),
+    'frequent_high_caloric_food': ('yes', 'no'),
+    'smokes': ('yes', 'no'),
+    'calorie_monitoring': ('yes', 'no'),
+    'food_between_meals': ('no', 'Sometimes', 'Frequently', 'Always'),
+    'alcohol_consumption': ('no', 'Sometimes', 'Frequently', 'Always'),
+    'transportation_mode': ('Public_Transportation', 'Walking', 'Automobile', 'Bike', 'Motorbike'),
+}
+
+# Other accepted spellings per categorical input (all choices also match in
+# any case), e.g. the levels of the web form's selects
+CHOICE_ALIASES = {
+    'gender': {'m': 'Male', 'f': 'Female'},
+    'stress_level': {'veryhigh': 'High', 'very high': 'High'},
+    'food_between_meals': {'never': 'no'},
+    'alcohol_consumption': {'none': 'no', 'never': 'no', 'low': 'Sometimes', 'moderate': 'Frequently',
+                            'high': 'Always'},
+    'transportation_mode': {'public transportation': 'Public_Transportation'},
+}
+
+# Yes/no inputs also take booleans (JSON true/false) and y/n
+YES_NO_ALIASES = {'true': 'yes', 'false': 'no', 'y': 'yes', 'n': 'no'}
+
+
+def is_blank(value):
+    """None, NaN and empty strings count as a missing input"""
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class InputValidationError(ValueError):
+    """Raised for inputs that break the schema; `errors` maps field -> message"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f"{field}: {message}" for field, message in errors.items()))
+
+
+class InputSchema:
+    """
+    The inputs FeatureMapper reads with their types and ranges, compiled
+
+    Every field gets one coercer closure built up front, so validating a
+    user is a dict lookup and a call per input. Fields outside the schema
+    (e.g. a WhatsApp number) pass through untouched; blank values are
+    dropped so the models fall back to their defaults.
+    """
+
+    def __init__(self, feature_mapper=None, ranges=NUMERIC_RANGES, choices=CHOICES, aliases=CHOICE_ALIASES):
+        """
+        Args:
+            feature_mapper (FeatureMapper): Mapper whose inputs are validated
+            ranges, choices, aliases (dict): Override the rules, in the format
+                of NUMERIC_RANGES / CHOICES / CHOICE_ALIASES
+        """
+        mapper = feature_mapper or FeatureMapper()
+        self.descriptions = {field: description for group in mapper.get_required_inputs().values()
+                             for field, description in group.items()}
+        inputs = set().union(*mapper.dependencies.values())
+        fields = list(self.descriptions) + sorted(inputs - set(self.descriptions))
+
+        self.rules = {}
+        self._lookups = {}
+        for field in fields:
+            if field in ranges:
+                self.rules[field] = FieldRule(*ranges[field], None)
+            elif field in choices:
+                self.rules[field] = FieldRule('choice', None, None, tuple(choices[field]))
+                lookup = {choice.lower(): choice for choice in choices[field]}
+                if set(lookup) == {'yes', 'no'}:
+                    lookup.update({alias: lookup[value] for alias, value in YES_NO_ALIASES.items()})
+                lookup.update(aliases.get(field, {}))
+                self._lookups[field] = lookup
+            else:
+                raise ValueError(f"No type or range for input '{field}' - add it to NUMERIC_RANGES or CHOICES")
+        self._coercers = {field: self._compile(field, rule) for field, rule in self.rules.items()}
+
+    def _compile(self, field, rule):
+        """Coercer of one field: raw value -> canonical value, or ValueError"""
+        if rule.kind == 'choice':
+            lookup = self._lookups[field]
+            message = f"must be one of {', '.join(rule.choices)}"
+
+            def coerce(value):
+                canonical = lookup.get(str(value).strip().lower())
+                if canonical is None:
+                    raise ValueError(message)
+                return canonical
+            return coerce
+
+        low, high, integer = rule.low, rule.high, rule.kind == 'integer'
+        range_message = f"must be between {low} and {high}"
+
+        def coerce(value):
+            if isinstance(value, bool):
+                raise ValueError("must be a number")
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("must be a number")
+            if not low <= number <= high:
+                raise ValueError(range_message)
+            if integer:
+                if not number.is_integer():
+                    raise ValueError("must be a whole number")
+                return int(number)
+            return number
+        return coerce
+
+    def coerce(self, field, value):
+        """
+        Canonical value of one input
+
+        Raises:
+            ValueError: With the field-level message if the value is invalid
+        """
+        coerce = self._coercers.get(field)
+        return value if coerce is None else coerce(value)
+
+    def validate(self, raw, required=()):
+        """
+        Validate and coerce one user's raw inputs
+
+        Args:
+            raw (dict): Inputs as received (form strings, JSON values, ...)
+            required (iterable): Fields that must be present
+
+        Returns:
+            dict: Inputs with numbers as int/float and canonical categories;
+                  blank values dropped, unknown fields passed through
+
+        Raises:
+            InputValidationError: With every invalid or missing field
+        """
+        clean, errors = {}, {}
+        coercers = self._coercers
+        for field, value in raw.items():
+            if is_blank(value):
+                continue
+            coerce = coercers.get(field)
+            if coerce is None:
+                clean[field] = value
+                continue
+            try:
+                clean[field] = coerce(value)
+            except ValueError as e:
+                errors[field] = str(e)
+        for field in required:
+            if field not in clean and field not in errors:
+                errors[field] = "is required"
+        if errors:
+            raise InputValidationError(errors)
+        return clean
+
+    def validate_frame(self, users):
+        """
+        Columnar validate() for batch jobs: one vectorized pass per column
+
+        Args:
+            users (pd.DataFrame): One row per user
+
+        Returns:
+            tuple: (DataFrame with coerced columns - numbers as floats, blank
+                   or invalid values as NaN - and a Series of per-row error
+                   messages, '' for valid rows)
+        """
+        clean = users.copy()
+        errors = pd.Series('', index=users.index, dtype=object)
+        for field in users.columns:
+            rule = self.rules.get(field)
+            if rule is None:
+                continue
+            column = users[field]
+
+            if rule.kind == 'choice':
+                # Categories repeat: look up each distinct value once
+                codes, uniques = pd.factorize(column)
+                lookup = self._lookups[field]
+                texts = [str(value).strip().lower() for value in uniques]
+                canonical = np.array([lookup.get(text) for text in texts] + [None], dtype=object)[codes]
+                missing = np.array([not text for text in texts] + [True])[codes]
+                problems = [(~missing & pd.isna(canonical), f"must be one of {', '.join(rule.choices)}")]
+                clean[field] = pd.Series(canonical, index=users.index).where(~missing)
+            else:
+                missing = column.isna()
+                if not pd.api.types.is_numeric_dtype(column):
+                    missing |= column.astype(str).str.strip() == ''
+                missing = missing.to_numpy()
+                values = pd.to_numeric(column, errors='coerce').astype(float)
+                numbers = values.to_numpy()
+                unparsed = ~missing & values.isna().to_numpy()
+                out_of_range = ~missing & ~unparsed & ((numbers < rule.low) | (numbers > rule.high))
+                problems = [(unparsed, "must be a number"),
+                            (out_of_range, f"must be between {rule.low} and {rule.high}")]
+                if rule.kind == 'integer':
+                    problems.append((~missing & ~unparsed & ~out_of_range & (numbers % 1 != 0),
+                                     "must be a whole number"))
+                clean[field] = values
+
+            for mask, message in problems:
+                if mask.any():
+                    errors[mask] = errors[mask] + f"{field}: {message}; "
+        return clean, errors.str.rstrip('; ')
@@ -1,6 +1,10 @@
 """
 Main Application - Integrated Health Assessment System
 Entry point for the complete health assessment pipeline
+
+Usage:
+    python main.py                                               # interactive menu
+    python main.py assess --input patients.csv --output results.ndjson   # bulk mode, see bulk_assess.py
 """
 import sys
 from pipeline import HealthAssessmentPipeline
@@ -188,7 +192,7 @@ def main():
                 user_data = ui.quick_collect()
                 
                 if user_data:
-                    report = pipeline.assess_and_report(user_data)
+                    report = pipeline.assess_and_report(user_data, tier='quick')
                     
                     export = input("\n💾 Export report to file? (yes/no): ").strip().lower()
                     if export in ['yes', 'y']:
@@ -263,6 +267,10 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'assess':
+        from bulk_assess import main as bulk_main
+        sys.exit(bulk_main(sys.argv[2:]))
+    
     try:
         main()
     except Exception as e:
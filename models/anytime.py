@@ -0,0 +1,151 @@
+"""
+Early-exit (anytime) forest evaluation
+Accumulates tree votes block by block and stops for each row as soon as the
+final risk score is known to fall inside one HealthScorer risk band. Rows far
+from a band edge are decided after a fraction of the trees.
+
+After k of n trees the final class probabilities are bounded by
+    (votes so far + sum of the smallest leaf values of the remaining trees) / n
+    (votes so far + sum of the largest leaf values of the remaining trees) / n
+so with confidence=1 (the default) the returned level is always the level of
+the full forest. With confidence < 1 the bounds are tightened with Serfling's
+inequality for sampling trees without replacement, which decides far sooner
+at the cost of a small chance that the level differs.
+"""
+from collections import namedtuple
+import math
+
+import numpy as np
+
+try:
+    from .forest_engine import FlatForest
+except ImportError:
+    from forest_engine import FlatForest
+
+
+AnytimeRisk = namedtuple('AnytimeRisk', ['level', 'score', 'low', 'high', 'trees'])
+
+
+def risk_band_edges(risk_thresholds):
+    """Upper edges of the low, moderate, high and very high bands (HealthScorer.risk_thresholds)"""
+    return np.array([risk_thresholds[key] for key in ('low', 'moderate', 'high', 'critical')], dtype=float)
+
+
+class AnytimeForest:
+    """
+    Block-wise evaluation of a random forest with per-row early exit
+
+    Works on a fitted sklearn RandomForestClassifier (trees are evaluated one
+    sklearn tree at a time, so skipped trees are skipped work even for a
+    single row) or on a compiled FlatForest / CompactForest (cheapest for
+    batches: only rows that are still undecided enter the next block).
+    """
+
+    def __init__(self, source):
+        self.source = source
+        if isinstance(source, FlatForest):
+            self.n_trees = source.n_trees
+            self.classes = source.classes
+            tree_min, tree_max = self._compiled_leaf_ranges(source)
+        else:
+            self.n_trees = len(source.estimators_)
+            self.classes = source.classes_
+            n_classes = source.n_classes_
+            leaf_values = [
+                estimator.tree_.value[estimator.tree_.children_left == -1, 0, :n_classes]
+                for estimator in source.estimators_
+            ]
+            tree_min = np.array([values.min(axis=0) for values in leaf_values])
+            tree_max = np.array([values.max(axis=0) for values in leaf_values])
+
+        # Sum of the extreme leaf values of trees k.. n-1, for every k
+        zeros = np.zeros((1, len(self.classes)))
+        self.remaining_min = np.concatenate([np.cumsum(tree_min[::-1], axis=0)[::-1], zeros])
+        self.remaining_max = np.concatenate([np.cumsum(tree_max[::-1], axis=0)[::-1], zeros])
+
+    @staticmethod
+    def _compiled_leaf_ranges(forest):
+        """Per-tree minimum and maximum leaf value of every class"""
+        nodes = np.arange(len(forest.feature))
+        is_leaf = (forest.left == nodes)[:, None]
+        values = forest._node_values(nodes)
+        tree_min = np.minimum.reduceat(np.where(is_leaf, values, np.inf), forest.roots, axis=0)
+        tree_max = np.maximum.reduceat(np.where(is_leaf, values, -np.inf), forest.roots, axis=0)
+        return tree_min, tree_max
+
+    def tree_values(self, X, start, stop):
+        """Leaf values of trees start..stop-1, in order: one (n_rows, n_classes) array per tree"""
+        if isinstance(self.source, FlatForest):
+            leaves = self.source.apply(X, self.source.roots[start:stop])
+            values = self.source._node_values(leaves)
+            return [values[:, i] for i in range(stop - start)]
+        n_classes = len(self.classes)
+        return [estimator.tree_.predict(X)[:, :n_classes] for estimator in self.source.estimators_[start:stop]]
+
+    def evaluate(self, feature_array, risk_bounds, risk_thresholds, risk_levels, confidence=1.0, block=10):
+        """
+        Evaluate trees in blocks until each row's risk level is decided
+
+        Args:
+            feature_array: 2-D array of encoded features
+            risk_bounds: callable(rows, low, high) mapping per-class probability
+                bounds of the given row indices to (lowest, highest) risk scores
+            risk_thresholds (dict): Band thresholds, HealthScorer.risk_thresholds
+            risk_levels (tuple): Level of each band, HealthScorer.risk_levels
+            confidence (float): 1 for exact levels, < 1 for statistical early exit
+            block (int): Trees evaluated between two checks
+
+        Returns:
+            AnytimeRisk: arrays per row - level, score estimate, lowest and
+            highest possible final score, and number of trees evaluated
+        """
+        if not 0 < confidence <= 1:
+            raise ValueError(f"confidence must be in (0, 1], got {confidence}")
+        edges = risk_band_edges(risk_thresholds)
+        X = np.ascontiguousarray(feature_array, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_rows, n_classes, n = X.shape[0], len(self.classes), self.n_trees
+        total = np.zeros((n_rows, n_classes))
+        low = np.zeros(n_rows)
+        high = np.zeros(n_rows)
+        trees = np.full(n_rows, n)
+        active = np.arange(n_rows)
+        X_active = X
+        # Union bound over classes and over every check
+        log_term = math.log(2 * n_classes * math.ceil(n / block) / (1 - confidence)) if confidence < 1 else None
+
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            # Add tree by tree, in order, so a full evaluation sums like sklearn
+            votes = total[active]
+            for values in self.tree_values(X_active, start, stop):
+                votes += values
+            total[active] = votes
+
+            prob_low = (votes + self.remaining_min[stop]) / n
+            prob_high = (votes + self.remaining_max[stop]) / n
+            if log_term is not None and stop < n:
+                # Serfling: deviation of the mean of `stop` trees drawn without replacement
+                epsilon = math.sqrt((1 - (stop - 1) / n) * log_term / (2 * stop))
+                mean = votes / stop
+                prob_low = np.maximum(prob_low, mean - epsilon)
+                prob_high = np.minimum(prob_high, mean + epsilon)
+
+            score_low, score_high = risk_bounds(active, prob_low, prob_high)
+            low[active], high[active] = score_low, score_high
+            decided = np.searchsorted(edges, score_low, side='right') == np.searchsorted(edges, score_high, side='right')
+            trees[active[decided]] = stop
+            if decided.all():
+                break
+            active = active[~decided]
+            X_active = X[active]
+
+        # Score from the mean vote of the trees each row evaluated, kept within its bounds
+        mean = total / trees[:, None]
+        estimate, _ = risk_bounds(np.arange(n_rows), mean, mean)
+        score = np.clip(estimate, low, high)
+        bands = np.searchsorted(edges, score, side='right')
+        level = np.array(risk_levels, dtype=object)[bands]
+        return AnytimeRisk(level, score, low, high, trees)
@@ -0,0 +1,141 @@
+"""
+Memory-mappable model bundle
+Stores the compiled forests of all models, with their encoders and metadata,
+in one file that is loaded with np.memmap. Arrays are read straight from the
+OS page cache, so loading is near-instant and every worker process serving
+the same bundle shares one physical copy of the model pages.
+
+File layout:
+    8 bytes   magic b'HABUNDLE'
+    8 bytes   header length (little-endian uint64)
+    n bytes   JSON header: format version and, per model, the forest class and
+              its scalar parameters, metadata and, for each array, its dtype,
+              shape and absolute file offset
+    ...       raw array data, each array aligned to 64 bytes
+"""
+import json
+import os
+
+import numpy as np
+
+try:
+    from .forest_engine import FlatForest, FOREST_TYPES
+except ImportError:
+    from forest_engine import FlatForest, FOREST_TYPES
+
+
+MAGIC = b'HABUNDLE'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    """Round offset up to the next ALIGNMENT boundary"""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_bundle(path, models):
+    """
+    Write compiled models to a bundle file
+
+    Args:
+        path (str): Output file
+        models (dict): Model name -> (FlatForest or CompactForest, metadata dict).
+                       Metadata must be JSON-serializable (feature names, encoder, ...)
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    header = {'format_version': FORMAT_VERSION, 'models': {}}
+    arrays = []
+
+    for name, (forest, metadata) in models.items():
+        entry = {
+            'forest_type': type(forest).__name__,
+            'params': forest.params(),
+            'metadata': metadata,
+            'arrays': {}
+        }
+        for array_name in FlatForest.ARRAYS:
+            array = np.ascontiguousarray(getattr(forest, array_name))
+            if array.dtype.hasobject:
+                raise ValueError(f"Cannot store object array {name}.{array_name} in a bundle")
+            entry['arrays'][array_name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': None
+            }
+            arrays.append((entry['arrays'][array_name], array))
+        header['models'][name] = entry
+
+    # Offsets depend on the header size and the header contains the offsets,
+    # so lay the data out after a header padded with room to spare
+    header_size = len(json.dumps(header).encode('utf-8')) + 32 * len(arrays)
+    offset = _aligned(len(MAGIC) + 8 + header_size)
+    for spec, array in arrays:
+        spec['offset'] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(header_bytes) > header_size:
+        raise ValueError("Bundle header larger than reserved space")
+    header_bytes = header_bytes.ljust(header_size)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for spec, array in arrays:
+            f.seek(spec['offset'])
+            f.write(array.tobytes())
+        f.truncate(offset)
+    # Replace atomically so running workers keep their mapping of the old file
+    os.replace(tmp_path, path)
+
+    return offset
+
+
+def read_header(path):
+    """Read and validate the JSON header of a bundle"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        header_size = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_size).decode('utf-8'))
+
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version: {header.get('format_version')}")
+    return header
+
+
+def load_bundle(path, mmap=True):
+    """
+    Load every model stored in a bundle
+
+    Args:
+        path (str): Bundle file written by save_bundle()
+        mmap (bool): Map the file read-only (default). If False, the file is
+                     read into private memory instead
+
+    Returns:
+        dict: Model name -> (FlatForest, metadata dict)
+    """
+    header = read_header(path)
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    models = {}
+    for name, entry in header['models'].items():
+        arrays = {
+            array_name: np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']),
+                                   buffer=buffer, offset=spec['offset'])
+            for array_name, spec in entry['arrays'].items()
+        }
+        forest = FOREST_TYPES[entry['forest_type']](**entry['params'], **arrays)
+        models[name] = (forest, entry['metadata'])
+
+    return models
@@ -10,13 +10,30 @@ from sklearn.metrics import accuracy_score
 import pickle
 import os
 
+try:
+    from .inference import ForestModel, feature_matrix
+except ImportError:
+    from inference import ForestModel, feature_matrix
 
-class DiabetesModel:
-    def __init__(self, model_path='saved_models/diabetes_model.pkl'):
+
+class DiabetesModel(ForestModel):
+    label = 'Diabetes'
+    
+    def __init__(self, model_path='saved_models/diabetes_model.pkl', engine='sklearn',
+                 features=None, forest_params=None):
         self.model = None
         self.model_path = model_path
+        self.engine = engine    # 'sklearn', 'flat' or 'compact' (see forest_engine.compile_forest)
+        self.compiled = None
+        self.anytime = None     # AnytimeForest over the served forest (built on first use)
         self.feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
                               'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+        # Optional feature subset, e.g. the quick-check tier (see models.quick_models)
+        if features is not None:
+            self.feature_names = list(features)
+        self.forest_params = forest_params or {'n_estimators': 100}
+        # Fill values for missing features (everything else defaults to 0)
+        self.feature_defaults = {'DiabetesPedigreeFunction': 0.5}
         
     def train(self, data_path):
         """Train the diabetes prediction model"""
@@ -24,7 +41,7 @@ class DiabetesModel:
         df = pd.read_csv(data_path)
         
         # Define features and target
-        X = df.drop('Outcome', axis=1)
+        X = df[self.feature_names]
         y = df['Outcome']
         
         # Split data
@@ -33,8 +50,9 @@ class DiabetesModel:
         )
         
         # Train model
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.model = RandomForestClassifier(random_state=42, **self.forest_params)
         self.model.fit(X_train, y_train)
+        self.compiled = None
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -59,6 +77,7 @@ class DiabetesModel:
         if os.path.exists(self.model_path):
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
+            self.compiled = None
             print("Diabetes model loaded successfully")
             return True
         else:
@@ -79,32 +98,44 @@ class DiabetesModel:
                 - prediction: 0 (no risk) or 1 (at risk)
                 - probability: risk probability (0-1)
         """
-        if self.model is None:
-            if not self.load_model():
-                raise Exception("Model not trained or loaded")
+        self._require_model()
         
         # Create feature array in correct order
-        feature_array = np.array([[
-            features.get('Pregnancies', 0),
-            features.get('Glucose', 0),
-            features.get('BloodPressure', 0),
-            features.get('SkinThickness', 0),
-            features.get('Insulin', 0),
-            features.get('BMI', 0),
-            features.get('DiabetesPedigreeFunction', 0.5),
-            features.get('Age', 0)
-        ]])
+        feature_array = feature_matrix(features, self.feature_names, self.feature_defaults)
         
         # Predict
-        prediction = self.model.predict(feature_array)[0]
-        probability = self.model.predict_proba(feature_array)[0][1]
+        result = self._forest_predict(feature_array)
+        prediction = result.classes[0]
+        probability = result.probabilities[0][1]
         
         return prediction, probability
     
+    def predict_batch(self, rows):
+        """
+        Predict diabetes risk for many rows with a single forest pass
+        
+        Args:
+            rows: list of feature dicts, 2-D array in feature_names order, or DataFrame
+        
+        Returns:
+            tuple: (predictions, probabilities)
+                - predictions: array of 0 (no risk) / 1 (at risk)
+                - probabilities: array of risk probabilities (0-1)
+        """
+        result = self.predict_forest(rows)
+        predictions, probabilities = result.classes, result.probabilities
+        
+        return predictions, probabilities[:, 1]
+    
     def get_risk_score(self, features):
         """Get risk score as percentage (0-100)"""
         _, probability = self.predict(features)
         return probability * 100
+    
+    def get_risk_scores(self, rows):
+        """Get risk scores as percentages (0-100) for a batch of rows"""
+        _, probabilities = self.predict_batch(rows)
+        return probabilities * 100
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+"""
+Categorical encoder for the hypertension and obesity models
+Fitted once at training time and saved with the model, so training and serving
+share one encoding and inference needs no pandas.
+"""
+import numpy as np
+
+
+class CategoricalEncoder:
+    """
+    One-hot encoder reproducing pd.get_dummies(X, drop_first=True) on training data
+
+    Numeric columns pass through; each categorical column expands to one 0/1
+    column per category except the first. The first category, unseen values
+    and missing values all encode as zeros, just like in training.
+    """
+
+    def __init__(self):
+        self.input_columns = []     # Raw columns in training order
+        self.numeric_columns = []
+        self.categories = {}        # Categorical column -> categories in dummy order
+        self.encoded_columns = []
+        self._build_index()
+
+    def fit(self, X):
+        """
+        Learn numeric columns and categories from the training features
+
+        Args:
+            X (pd.DataFrame): Raw training features
+
+        Returns:
+            CategoricalEncoder: self
+        """
+        import pandas as pd
+
+        self.input_columns = list(X.columns)
+        self.numeric_columns = []
+        self.categories = {}
+
+        for col in self.input_columns:
+            dtype = X[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                self.categories[col] = list(dtype.categories)
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                self.categories[col] = sorted(X[col].dropna().unique().tolist())
+            else:
+                self.numeric_columns.append(col)
+
+        # Same layout as get_dummies: numeric columns first, then dummies per column
+        self.encoded_columns = list(self.numeric_columns)
+        for col, cats in self.categories.items():
+            self.encoded_columns.extend(f"{col}_{cat}" for cat in cats[1:])
+
+        self._build_index()
+        return self
+
+    @classmethod
+    def from_encoded_columns(cls, encoded_columns, input_columns):
+        """
+        Rebuild an encoder from a model saved before encoders were persisted
+
+        Args:
+            encoded_columns (list): Column names the model was trained on
+            input_columns (list): Raw feature names used to split dummy columns
+
+        Returns:
+            CategoricalEncoder: Encoder producing the same columns
+        """
+        encoder = cls()
+        encoder.encoded_columns = list(encoded_columns)
+
+        for col in encoded_columns:
+            prefix = next((raw for raw in input_columns
+                           if raw not in encoded_columns and col.startswith(f"{raw}_")), None)
+            if prefix is None:
+                encoder.numeric_columns.append(col)
+            else:
+                # The dropped first category is unknown but always encodes as zeros
+                encoder.categories.setdefault(prefix, [None]).append(col[len(prefix) + 1:])
+
+        encoder.input_columns = encoder.numeric_columns + list(encoder.categories)
+        encoder._build_index()
+        return encoder
+
+    def to_dict(self):
+        """Plain-Python representation for saving alongside the model"""
+        return {
+            'input_columns': list(self.input_columns),
+            'numeric_columns': list(self.numeric_columns),
+            'categories': {col: list(cats) for col, cats in self.categories.items()},
+            'encoded_columns': list(self.encoded_columns)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an encoder saved with to_dict()"""
+        encoder = cls()
+        encoder.input_columns = list(data['input_columns'])
+        encoder.numeric_columns = list(data['numeric_columns'])
+        encoder.categories = {col: list(cats) for col, cats in data['categories'].items()}
+        encoder.encoded_columns = list(data['encoded_columns'])
+        encoder._build_index()
+        return encoder
+
+    def _build_index(self):
+        """Precompute output positions for numeric columns and category values"""
+        position = {col: j for j, col in enumerate(self.encoded_columns)}
+        self._numeric_index = [(col, position[col]) for col in self.numeric_columns]
+        self._category_index = [
+            (col, [(cat, position[f"{col}_{cat}"]) for cat in cats[1:]])
+            for col, cats in self.categories.items()
+        ]
+        # Encoded column -> input column, for summing per-column values back up
+        self._grouping = np.zeros((len(self.encoded_columns), len(self.input_columns)))
+        for col, j in self._numeric_index:
+            self._grouping[j, self.input_columns.index(col)] = 1
+        for col, targets in self._category_index:
+            for _, j in targets:
+                self._grouping[j, self.input_columns.index(col)] = 1
+
+    def transform(self, rows):
+        """
+        Encode raw feature rows into a preallocated float matrix
+
+        Args:
+            rows: dict, list of dicts, or DataFrame of raw feature values
+
+        Returns:
+            np.ndarray: Array of shape (n_rows, len(encoded_columns))
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+
+        is_frame = hasattr(rows, 'columns')
+        n_rows = len(rows)
+        encoded = np.zeros((n_rows, len(self.encoded_columns)))
+
+        for col, j in self._numeric_index:
+            if is_frame:
+                if col not in rows.columns:
+                    continue
+                values = rows[col].to_numpy(dtype=float, na_value=np.nan)
+            else:
+                values = np.array([row.get(col) for row in rows], dtype=float)
+            encoded[:, j] = np.where(np.isnan(values), 0, values)
+
+        for col, targets in self._category_index:
+            if is_frame:
+                if col not in rows.columns:
+                    continue
+                values = rows[col].to_numpy(dtype=object)
+            else:
+                values = np.array([row.get(col) for row in rows], dtype=object)
+            for cat, j in targets:
+                encoded[:, j] = values == cat
+
+        return encoded
+
+    def group_encoded(self, values):
+        """
+        Sum values of the encoded columns (last axis) onto their input columns
+
+        Args:
+            values (np.ndarray): Array of shape (..., len(encoded_columns)),
+                                 e.g. per-feature attributions
+
+        Returns:
+            np.ndarray: Array of shape (..., len(input_columns))
+        """
+        return np.asarray(values) @ self._grouping
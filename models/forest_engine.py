@@ -0,0 +1,398 @@
+"""
+Flat-array random forest engine for serving
+Exports a fitted RandomForestClassifier into plain NumPy arrays and evaluates
+rows with a vectorized level-by-level traversal, bypassing sklearn's input
+validation and joblib dispatch on every request. CompactForest stores the
+same forest in narrow dtypes to cut resident memory.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+# Result of a single pass over a forest
+ForestPrediction = namedtuple('ForestPrediction', ['classes', 'probabilities', 'spread'])
+
+# Prediction plus the Saabas path attributions of a weighted class score, from
+# the same pass (see FlatForest.explain)
+ForestExplanation = namedtuple('ForestExplanation', ['prediction', 'bias', 'contributions'])
+
+
+class FlatForest:
+    """
+    All trees of a forest stored back to back in flat node arrays
+
+    Node i splits on `feature[i]` at `threshold[i]` and continues at
+    `children[2*i]` (left) or `children[2*i + 1]` (right), as absolute indices.
+    Leaves point to themselves, so every row can take up to `max_depth` steps
+    without per-step leaf checks. `value[i]` holds the class distribution of
+    node i (internal nodes included).
+
+    The arrays are used read-only, so they can be views into a memory-mapped
+    model bundle (see models.bundle).
+    """
+
+    engine = 'flat'
+    # Levels between two passes that drop finished cursors in apply()
+    DROP_LEAVES_EVERY = 4
+    # Node arrays in the order they are stored in a bundle
+    ARRAYS = ('feature', 'threshold', 'children', 'value', 'missing_left', 'roots', 'classes')
+
+    def __init__(self, feature, threshold, children, value, missing_left,
+                 roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        # Interleaved (left, right) pairs so a step is a single gather
+        self.children = children
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        # Per-leaf path attributions by score weights, see path_table()
+        self._path_tables = {}
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Export a fitted RandomForestClassifier
+
+        Args:
+            model: Fitted sklearn RandomForestClassifier
+
+        Returns:
+            FlatForest: Engine producing the same probabilities as model.predict_proba
+        """
+        n_classes = model.n_classes_
+        features, thresholds, children, values, missing, roots = [], [], [], [], [], []
+        offset = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            left = np.where(is_leaf, node_ids, tree.children_left)
+            right = np.where(is_leaf, node_ids, tree.children_right)
+            children.append(np.stack([left, right], axis=1).ravel() + offset)
+            values.append(tree.value[:, 0, :n_classes])
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(n_nodes, dtype=np.uint8)))
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            missing_left=np.concatenate(missing).astype(bool),
+            roots=np.array(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_)
+        )
+
+    def params(self):
+        """Scalar constructor arguments besides the node arrays (stored in bundle headers)"""
+        return {'max_depth': self.max_depth}
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def nbytes(self):
+        """Memory used by the node arrays"""
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def apply(self, feature_array, roots=None):
+        """
+        Find the leaf reached in every tree for every row
+
+        Args:
+            feature_array: 2-D array of encoded features
+            roots (np.ndarray): Root nodes of the trees to evaluate (default: all)
+
+        Returns:
+            np.ndarray: Absolute leaf indices of shape (n_rows, n_trees)
+        """
+        if roots is None:
+            roots = self.roots
+        # sklearn evaluates trees on float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(feature_array, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        has_missing = bool(np.isnan(X).any())
+
+        # One (row, tree) cursor per entry, addressing X as a flat buffer
+        X_flat = X.ravel()
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, len(roots))
+        nodes = np.tile(roots, n_rows)
+
+        # Most leaves sit far above max_depth: every few levels, cursors that
+        # reached a leaf are written back and dropped from the remaining steps
+        position = np.arange(len(nodes))
+        cursor = nodes
+        for depth in range(1, self.max_depth + 1):
+            x = X_flat[row_base + self.feature[cursor]]
+            go_right = ~(x <= self.threshold[cursor])
+            if has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[cursor])
+            cursor = self._child(cursor, go_right)
+            if depth % self.DROP_LEAVES_EVERY == 0 and depth < self.max_depth:
+                nodes[position] = cursor
+                inner = self._child(cursor, False) != cursor
+                position, cursor, row_base = position[inner], cursor[inner], row_base[inner]
+        nodes[position] = cursor
+
+        return nodes.reshape(n_rows, len(roots))
+
+    def _child(self, nodes, go_right):
+        """Next node for each cursor"""
+        return self.children[2 * nodes + go_right]
+
+    def _node_values(self, nodes):
+        """Class distributions of the given nodes as floats"""
+        return self.value[nodes]
+
+    def predict(self, feature_array):
+        """
+        Evaluate the forest on a batch of rows
+
+        Args:
+            feature_array: 2-D array of encoded features
+
+        Returns:
+            ForestPrediction: (classes, probabilities, spread), identical to
+            models.inference.forest_predict on the source model
+        """
+        return self._predict_leaves(self.apply(feature_array))
+
+    def _predict_leaves(self, leaves):
+        """ForestPrediction from the leaves found by apply()"""
+        leaf_values = self._node_values(leaves)  # (n_rows, n_trees, n_classes)
+
+        # Summed over trees in order, matching sklearn's accumulation
+        probabilities = leaf_values.sum(axis=1) / self.n_trees
+        mean_sq = (leaf_values * leaf_values).sum(axis=1) / self.n_trees
+        spread = np.sqrt(np.maximum(mean_sq - probabilities ** 2, 0))
+        classes = self.classes.take(np.argmax(probabilities, axis=1))
+
+        return ForestPrediction(classes, probabilities, spread)
+
+    def predict_proba(self, feature_array):
+        """Class probabilities, same as sklearn's predict_proba"""
+        return self.predict(feature_array).probabilities
+
+    def path_table(self, weights):
+        """
+        Saabas path attributions of every leaf, built on first use
+
+        The score of a node is its class distribution weighted by `weights`.
+        Every split on the way from the root to a leaf changes the score from
+        the parent's to the child's, and the change is credited to the feature
+        split on; a leaf's row holds these changes summed per feature.
+
+        Args:
+            weights: Weight per class, e.g. (0, 100) for the positive class
+                     probability in percent
+
+        Returns:
+            tuple: (leaf_rows, table, bias)
+                - leaf_rows: (n_nodes,) row of each leaf in table (-1 for
+                  internal nodes)
+                - table: (n_leaves, max feature id + 1) float32 attributions,
+                  divided by the number of trees
+                - bias: mean root score over the trees
+        """
+        key = tuple(weights)
+        if key not in self._path_tables:
+            nodes = np.arange(len(self.feature))
+            left, right = self.left, self.right
+            score = self._node_values(nodes) @ np.array(key)
+
+            # Root to leaves one level at a time; children inherit the parent's path
+            paths = np.zeros((len(nodes), int(self.feature.max()) + 1))
+            parents = self.roots.astype(np.int64)
+            while len(parents):
+                parents = parents[left[parents] != parents]
+                for children in (left[parents], right[parents]):
+                    paths[children] = paths[parents]
+                    paths[children, self.feature[parents]] += score[children] - score[parents]
+                parents = np.concatenate([left[parents], right[parents]])
+
+            is_leaf = left == nodes
+            leaf_rows = np.full(len(nodes), -1, dtype=np.int32)
+            leaf_rows[is_leaf] = np.arange(is_leaf.sum())
+            bias = float(score[self.roots].mean())
+            table = (paths[is_leaf] / self.n_trees).astype(np.float32)
+            self._path_tables[key] = (leaf_rows, table, bias)
+        return self._path_tables[key]
+
+    def explain(self, feature_array, weights):
+        """
+        Evaluate the forest and attribute every score to the features
+
+        The leaves found for the prediction look up their precomputed path
+        attributions (see path_table()), so explaining adds no traversal.
+
+        Args:
+            feature_array: 2-D array of encoded features
+            weights: Weight per class of the explained score
+
+        Returns:
+            ForestExplanation: (prediction, bias, contributions)
+                - prediction: ForestPrediction, same as predict()
+                - bias: mean score of the forest at its roots
+                - contributions: (n_rows, n_features) score change credited
+                  to each feature; bias + contributions.sum(axis=1) equals
+                  prediction.probabilities @ weights up to float32 rounding
+        """
+        leaves = self.apply(feature_array)
+        leaf_rows, table, bias = self.path_table(weights)
+        rows = leaf_rows[leaves]
+        n_rows, n_trees = rows.shape
+
+        width = table.shape[1]
+        if rows.size * width <= 1 << 20:
+            contributions = np.add.reduce(table.take(rows, axis=0), axis=1, dtype=np.float64)
+        else:
+            # Tree by tree to bound the gathered block on large batches
+            contributions = np.zeros((n_rows, width))
+            for tree in range(n_trees):
+                contributions += table[rows[:, tree]]
+
+        # Features after the last one split on get nothing
+        n_features = np.shape(feature_array)[-1]
+        if width < n_features:
+            contributions = np.pad(contributions, ((0, 0), (0, n_features - width)))
+
+        return ForestExplanation(self._predict_leaves(leaves), bias, contributions)
+
+
+def _smallest_int(max_value, signed=True):
+    """Smallest integer dtype holding values up to max_value"""
+    candidates = (np.int8, np.int16, np.int32, np.int64) if signed else (np.uint8, np.uint16, np.uint32)
+    return next(dtype for dtype in candidates if max_value <= np.iinfo(dtype).max)
+
+
+class CompactForest(FlatForest):
+    """
+    Memory-compact FlatForest with quantized leaf probabilities
+
+    - thresholds are float32, rounded down to the nearest float32 so that for
+      float32 inputs every split goes exactly the same way as in sklearn
+    - children are stored as forward offsets from the parent node, which fit
+      int16 as long as each tree has fewer than 32768 nodes
+    - feature ids use the smallest unsigned type (uint8 for < 256 features)
+    - class distributions are integers in [0, value_scale] (8 or 16 bits)
+
+    Routing is exact; probabilities deviate from the original forest by at
+    most 0.5 / value_scale per class.
+    """
+
+    def __init__(self, feature, threshold, children, value, missing_left,
+                 roots, classes, max_depth, value_scale):
+        super().__init__(feature, threshold, children, value, missing_left,
+                         roots, classes, max_depth)
+        self.value_scale = int(value_scale)
+
+    @classmethod
+    def from_flat(cls, forest, leaf_bits=16):
+        """
+        Compact an exported FlatForest
+
+        Args:
+            forest (FlatForest): Forest to compact
+            leaf_bits (int): 8 or 16 bits per class probability
+
+        Returns:
+            CompactForest: Compacted forest
+        """
+        if leaf_bits not in (8, 16):
+            raise ValueError(f"leaf_bits must be 8 or 16, got {leaf_bits}")
+        value_scale = (1 << leaf_bits) - 1
+
+        # Largest float32 <= each threshold: x <= t32 exactly when x <= t64
+        threshold = forest.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > forest.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        parents = np.repeat(np.arange(len(forest.feature), dtype=np.int64), 2)
+        offsets = forest.children.astype(np.int64) - parents
+
+        return cls(
+            feature=forest.feature.astype(_smallest_int(forest.feature.max(), signed=False)),
+            threshold=threshold,
+            children=offsets.astype(_smallest_int(offsets.max())),
+            value=np.rint(forest.value * value_scale).astype(np.uint8 if leaf_bits == 8 else np.uint16),
+            missing_left=forest.missing_left,
+            roots=forest.roots,
+            classes=forest.classes,
+            max_depth=forest.max_depth,
+            value_scale=value_scale
+        )
+
+    @classmethod
+    def from_sklearn(cls, model, leaf_bits=16):
+        """Export and compact a fitted RandomForestClassifier"""
+        return cls.from_flat(FlatForest.from_sklearn(model), leaf_bits)
+
+    @property
+    def engine(self):
+        return 'compact8' if self.value_scale == 255 else 'compact'
+
+    def params(self):
+        return {'max_depth': self.max_depth, 'value_scale': self.value_scale}
+
+    @property
+    def left(self):
+        return np.arange(len(self.feature)) + self.children[0::2]
+
+    @property
+    def right(self):
+        return np.arange(len(self.feature)) + self.children[1::2]
+
+    def _child(self, nodes, go_right):
+        return nodes + self.children[2 * nodes + go_right]
+
+    def _node_values(self, nodes):
+        return self.value[nodes] / self.value_scale
+
+
+# Serving engines that evaluate a compiled copy of the forest
+COMPILED_ENGINES = {
+    'flat': lambda model: FlatForest.from_sklearn(model),
+    'compact': lambda model: CompactForest.from_sklearn(model, leaf_bits=16),
+    'compact8': lambda model: CompactForest.from_sklearn(model, leaf_bits=8),
+}
+
+# Forest classes by name, for restoring forests from a bundle
+FOREST_TYPES = {cls.__name__: cls for cls in (FlatForest, CompactForest)}
+
+
+def compile_forest(model, engine='flat'):
+    """
+    Compile a fitted RandomForestClassifier for a serving engine
+
+    Args:
+        model: Fitted sklearn RandomForestClassifier
+        engine (str): 'flat', 'compact' (16-bit leaves) or 'compact8' (8-bit leaves)
+
+    Returns:
+        FlatForest: Compiled forest (a CompactForest for the compact engines)
+    """
+    if engine not in COMPILED_ENGINES:
+        raise ValueError(f"Unknown inference engine: {engine}")
+    return COMPILED_ENGINES[engine](model)
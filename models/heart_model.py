@@ -10,13 +10,104 @@ from sklearn.metrics import accuracy_score
 import pickle
 import os
 
+from utils.rounding import round_array
 
-class HeartModel:
-    def __init__(self, model_path='saved_models/heart_model.pkl'):
+try:
+    from .inference import ForestModel, feature_matrix, feature_column
+except ImportError:
+    from inference import ForestModel, feature_matrix, feature_column
+
+
+# Features scored by the clinical rules
+CLINICAL_FEATURES = ('age', 'trestbps', 'chol', 'thalach', 'fbs', 'cp')
+
+
+def clinical_risk_factors(age, trestbps, chol, thalach, fbs, cp, hr_age=None):
+    """
+    Clinical risk points per feature used by HeartModel.get_risk_scores, from
+    general health data: a more reliable baseline than the forest when the
+    specialized cardiac features are unavailable
+    
+    Args:
+        age, trestbps, chol, thalach, fbs, cp (np.ndarray): Per-row inputs.
+            A cp value below 0 means chest pain type was not provided.
+        hr_age (np.ndarray): Age used for the expected max heart rate
+            (defaults to `age`)
+    
+    Returns:
+        tuple: (points, max_factors) - risk points per CLINICAL_FEATURES name
+               and the most points each row can get
+    """
+    if hr_age is None:
+        hr_age = age
+    
+    points = {}
+    
+    # Age, blood pressure and cholesterol bands (major factors)
+    points['age'] = np.select([age >= 65, age >= 55, age >= 45, age >= 35], [20, 15, 10, 5], 0)
+    points['trestbps'] = np.select(
+        [trestbps >= 180, trestbps >= 160, trestbps >= 140, trestbps >= 130, trestbps >= 120],
+        [20, 15, 10, 5, 2], 0
+    )
+    points['chol'] = np.select(
+        [chol >= 280, chol >= 240, chol >= 220, chol >= 200, chol >= 180],
+        [20, 15, 10, 5, 2], 0
+    )
+    
+    # Max heart rate relative to the age-expected maximum
+    expected_max_hr = 220 - hr_age
+    points['thalach'] = np.select(
+        [thalach < expected_max_hr * 0.65, thalach < expected_max_hr * 0.75,
+         thalach < expected_max_hr * 0.85, thalach < expected_max_hr * 0.90],
+        [15, 10, 5, 2], 0
+    )
+    
+    # Fasting blood sugar
+    points['fbs'] = np.where(fbs == 1, 10, 0)
+    max_factors = np.full(len(points['fbs']), 85)
+    
+    # Chest pain type only counts when explicitly provided
+    cp_provided = cp >= 0
+    # 0: typical angina, 1: atypical angina, 2: non-anginal pain
+    points['cp'] = np.select([cp == 0, cp == 1, cp == 2], [15, 10, 5], 0)
+    max_factors = max_factors + np.where(cp_provided, 15, 0)
+    
+    return points, max_factors
+
+
+def clinical_risk_percentages(points, max_factors):
+    """
+    Clinical risk percentages (0-100) used by HeartModel.get_risk_scores
+    
+    Args:
+        points, max_factors: Risk points per feature and most points per
+            row, from clinical_risk_factors()
+    
+    Returns:
+        np.ndarray: Share of the possible points each row gets, in percent
+    """
+    risk_factors = sum(points[name] for name in CLINICAL_FEATURES)
+    return risk_factors / max_factors * 100
+
+
+class HeartModel(ForestModel):
+    label = 'Heart'
+    
+    def __init__(self, model_path='saved_models/heart_model.pkl', engine='sklearn',
+                 features=None, forest_params=None):
         self.model = None
         self.model_path = model_path
+        self.engine = engine    # 'sklearn', 'flat' or 'compact' (see forest_engine.compile_forest)
+        self.compiled = None
+        self.anytime = None     # AnytimeForest over the served forest (built on first use)
         self.feature_names = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 
                               'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+        # Optional feature subset, e.g. the quick-check tier (see models.quick_models)
+        if features is not None:
+            self.feature_names = list(features)
+        self.forest_params = forest_params or {'n_estimators': 100}
+        # Fill values for missing features (everything else defaults to 0)
+        self.feature_defaults = {}
         
     def train(self, data_path):
         """Train the heart disease prediction model"""
@@ -24,7 +115,7 @@ class HeartModel:
         df = pd.read_csv(data_path)
         
         # Define features and target
-        X = df.drop('target', axis=1)
+        X = df[self.feature_names]
         y = df['target']
         
         # Split data
@@ -33,8 +124,9 @@ class HeartModel:
         )
         
         # Train model
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.model = RandomForestClassifier(random_state=42, **self.forest_params)
         self.model.fit(X_train, y_train)
+        self.compiled = None
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -59,6 +151,7 @@ class HeartModel:
         if os.path.exists(self.model_path):
             with open(self.model_path, 'rb') as f:
                 self.model = pickle.load(f)
+            self.compiled = None
             print("Heart model loaded successfully")
             return True
         else:
@@ -79,130 +172,125 @@ class HeartModel:
                 - prediction: 0 (no risk) or 1 (at risk)
                 - probability: risk probability (0-1)
         """
-        if self.model is None:
-            if not self.load_model():
-                raise Exception("Model not trained or loaded")
+        self._require_model()
         
         # Create feature array in correct order
-        feature_array = np.array([[
-            features.get('age', 0),
-            features.get('sex', 0),
-            features.get('cp', 0),
-            features.get('trestbps', 0),
-            features.get('chol', 0),
-            features.get('fbs', 0),
-            features.get('restecg', 0),
-            features.get('thalach', 0),
-            features.get('exang', 0),
-            features.get('oldpeak', 0),
-            features.get('slope', 0),
-            features.get('ca', 0),
-            features.get('thal', 0)
-        ]])
+        feature_array = feature_matrix(features, self.feature_names, self.feature_defaults)
         
         # Predict
-        prediction = self.model.predict(feature_array)[0]
-        probability = self.model.predict_proba(feature_array)[0][1]
+        result = self._forest_predict(feature_array)
+        prediction = result.classes[0]
+        probability = result.probabilities[0][1]
         
         return prediction, probability
     
     def get_risk_score(self, features):
         """
         Get risk score as percentage (0-100)
-        Uses a hybrid approach: ML model + clinical risk factors
+        Uses a hybrid approach: ML model + clinical risk factors (see get_risk_scores)
+        """
+        return self.get_risk_scores([features])[0]
+    
+    def _clinical_points(self, rows):
+        """
+        Clinical risk points of a batch of rows, see clinical_risk_factors();
+        the rules use their own fallbacks for missing values
+        """
+        def column(name, default):
+            return feature_column(rows, self.feature_names, name, default)
+        
+        return clinical_risk_factors(
+            age=column('age', 0),
+            trestbps=column('trestbps', 120),
+            chol=column('chol', 200),
+            thalach=column('thalach', 150),
+            fbs=column('fbs', 0),
+            cp=column('cp', -1),
+            hr_age=column('age', 30)
+        )
+    
+    def predict_batch(self, rows):
         """
-        # Get ML model prediction
-        _, probability = self.predict(features)
-        ml_risk = probability * 100
-        
-        # Calculate clinical risk score based on available general health data
-        # This provides a more reliable baseline when specialized cardiac features are unavailable
-        risk_factors = 0
-        max_factors = 0
-        
-        # Age risk (major factor)
-        age = features.get('age', 0)
-        max_factors += 20
-        if age >= 65:
-            risk_factors += 20
-        elif age >= 55:
-            risk_factors += 15
-        elif age >= 45:
-            risk_factors += 10
-        elif age >= 35:
-            risk_factors += 5
-        # Ages under 35 add 0 risk
-        
-        # Blood pressure risk (major factor)
-        bp = features.get('trestbps', 120)
-        max_factors += 20
-        if bp >= 180:
-            risk_factors += 20
-        elif bp >= 160:
-            risk_factors += 15
-        elif bp >= 140:
-            risk_factors += 10
-        elif bp >= 130:
-            risk_factors += 5
-        elif bp >= 120:
-            risk_factors += 2
-        # BP under 120 adds 0 risk
-        
-        # Cholesterol risk (major factor)
-        chol = features.get('chol', 200)
-        max_factors += 20
-        if chol >= 280:
-            risk_factors += 20
-        elif chol >= 240:
-            risk_factors += 15
-        elif chol >= 220:
-            risk_factors += 10
-        elif chol >= 200:
-            risk_factors += 5
-        elif chol >= 180:
-            risk_factors += 2
-        # Cholesterol under 180 adds 0 risk
-        
-        # Max heart rate (inverse - lower is worse for given age)
-        max_hr = features.get('thalach', 150)
-        age = features.get('age', 30)
-        expected_max_hr = 220 - age
-        max_factors += 15
-        if max_hr < expected_max_hr * 0.65:  # Very low exercise capacity
-            risk_factors += 15
-        elif max_hr < expected_max_hr * 0.75:
-            risk_factors += 10
-        elif max_hr < expected_max_hr * 0.85:
-            risk_factors += 5
-        elif max_hr < expected_max_hr * 0.90:
-            risk_factors += 2
-        # Max HR >= 90% of expected adds 0 risk
-        
-        # Fasting blood sugar
-        max_factors += 10
-        if features.get('fbs', 0) == 1:  # Glucose > 120
-            risk_factors += 10
-        
-        # Chest pain type (if available and not default)
-        cp = features.get('cp', -1)
-        if cp >= 0:  # Only count if explicitly provided
-            max_factors += 15
-            if cp == 0:  # Typical angina
-                risk_factors += 15
-            elif cp == 1:  # Atypical angina
-                risk_factors += 10
-            elif cp == 2:  # Non-anginal pain
-                risk_factors += 5
-        
-        # Calculate clinical risk percentage
-        clinical_risk = (risk_factors / max_factors * 100) if max_factors > 0 else 50
-        
-        # Weighted average: 30% ML model, 70% clinical factors
-        # Clinical factors weighted more heavily because ML model is unreliable
-        # without specialized cardiac test features
-        final_risk = (ml_risk * 0.30) + (clinical_risk * 0.70)
-        
-        return round(final_risk, 2)
+        Predict heart disease risk for many rows with a single forest pass
+        
+        Args:
+            rows: list of feature dicts, 2-D array in feature_names order, or DataFrame
+        
+        Returns:
+            tuple: (predictions, probabilities)
+                - predictions: array of 0 (no risk) / 1 (at risk)
+                - probabilities: array of risk probabilities (0-1)
+        """
+        result = self.predict_forest(rows)
+        predictions, probabilities = result.classes, result.probabilities
+        
+        return predictions, probabilities[:, 1]
+    
+    def get_risk_scores(self, rows):
+        """
+        Get risk scores as percentages (0-100) for a batch of rows
+        Hybrid of the ML model and the clinical risk factors, see _blend_risks
+        """
+        _, probabilities = self.predict_batch(rows)
+        clinical_risk = clinical_risk_percentages(*self._clinical_points(rows))
+        return self._blend_risks(probabilities * 100, clinical_risk)
+    
+    @staticmethod
+    def _blend_risks(ml_risk, clinical_risk):
+        """
+        Weighted average: 30% ML model, 70% clinical factors, rounded as round() does
+        Clinical factors weighted more heavily because ML model is unreliable
+        without specialized cardiac test features
+        """
+        return round_array((ml_risk * 0.30) + (clinical_risk * 0.70), 2)
+    
+    @property
+    def driver_names(self):
+        """Names of the columns of explain_risk_scores() contributions"""
+        return self.feature_names + [name for name in CLINICAL_FEATURES if name not in self.feature_names]
+    
+    def explain_risk_scores(self, rows):
+        """
+        Risk scores and the risk each feature adds, from one forest pass
+        
+        Both parts of the hybrid score are additive: the forest part through
+        its path attributions, the clinical part through the points of each
+        rule. A feature's contribution is the sum of both, weighted as in the
+        score.
+        
+        Args:
+            rows: list of feature dicts, 2-D array in feature_names order, or DataFrame
+        
+        Returns:
+            tuple: (risk scores, contributions)
+                - risk scores: same as get_risk_scores
+                - contributions: (n_rows, len(driver_names)) risk percentage
+                  points; with 30% of the forest's average risk they sum to
+                  the unrounded score
+        """
+        explanation = self.predict_contributions(rows, (0, 100 * 0.30))
+        ml_risk = explanation.prediction.probabilities[:, 1] * 100
+        
+        points, max_factors = self._clinical_points(rows)
+        clinical_risk = clinical_risk_percentages(points, max_factors)
+        final_risk = self._blend_risks(ml_risk, clinical_risk)
+        
+        names = self.driver_names
+        contributions = np.zeros((len(ml_risk), len(names)))
+        contributions[:, :len(self.feature_names)] = explanation.contributions
+        for name in CLINICAL_FEATURES:
+            contributions[:, names.index(name)] += points[name] / max_factors * 100 * 0.70
+        return final_risk, contributions
+    
+    def _risk_bounds(self, rows):
+        """Early-exit bounds with the same ML / clinical blend as get_risk_score"""
+        clinical_risk = clinical_risk_percentages(*self._clinical_points(rows))
+        
+        # The clinical part does not depend on the trees
+        def risk_bounds(active, low, high):
+            return tuple(self._blend_risks(probability[:, 1] * 100, clinical_risk[active])
+                         for probability in (low, high))
+        return risk_bounds
 
 
 if __name__ == "__main__":
@@ -12,13 +12,39 @@ from sklearn.metrics import accuracy_score
 import pickle
 import os
 
+try:
+    from .inference import ForestModel, feature_matrix
+    from .encoders import CategoricalEncoder
+except ImportError:
+    from inference import ForestModel, feature_matrix
+    from encoders import CategoricalEncoder
 
-class HypertensionModel:
-    def __init__(self, model_path='saved_models/hypertension_model.pkl'):
+
+class HypertensionModel(ForestModel):
+    label = 'Hypertension'
+    
+    def __init__(self, model_path='saved_models/hypertension_model.pkl', engine='sklearn',
+                 features=None, forest_params=None):
         self.model = None
         self.model_path = model_path
+        self.engine = engine    # 'sklearn', 'flat' or 'compact' (see forest_engine.compile_forest)
+        self.compiled = None
+        self.anytime = None     # AnytimeForest over the served forest (built on first use)
         self.encoded_columns = None  # Store column names after encoding
-        self.feature_names = None
+        self.encoder = None          # CategoricalEncoder fitted at training time
+        # Raw input features (replaced by the training columns once trained)
+        self.feature_names = [
+            'Age', 'BMI', 'Cholesterol', 'Systolic_BP', 'Diastolic_BP',
+            'Smoking_Status', 'Alcohol_Intake', 'Physical_Activity_Level',
+            'Family_History', 'Diabetes', 'Stress_Level', 'Salt_Intake',
+            'Sleep_Duration', 'Heart_Rate', 'LDL', 'HDL', 'Triglycerides',
+            'Glucose', 'Gender'
+        ]
+        # Optional feature subset, e.g. the quick-check tier (see models.quick_models)
+        if features is not None:
+            self.feature_names = list(features)
+        self.features = features
+        self.forest_params = forest_params or {'n_estimators': 100}
         
     def train(self, data_path):
         """Train the hypertension prediction model"""
@@ -27,14 +53,18 @@ class HypertensionModel:
         
         # Define features and target
         X = df.drop('Hypertension', axis=1)
+        if self.features is not None:
+            X = X[self.features]
         y = df['Hypertension']
         
-        # Encode categorical features
-        X = pd.get_dummies(X, drop_first=True)
+        # Encode categorical features with an encoder that is saved with the model
+        self.encoder = CategoricalEncoder().fit(X)
+        self.feature_names = self.encoder.input_columns
+        X = self.encoder.transform(X)
         y = y.astype('category').cat.codes
         
         # Store encoded column names
-        self.encoded_columns = X.columns.tolist()
+        self.encoded_columns = self.encoder.encoded_columns
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
@@ -42,8 +72,9 @@ class HypertensionModel:
         )
         
         # Train model
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.model = RandomForestClassifier(random_state=42, **self.forest_params)
         self.model.fit(X_train, y_train)
+        self.compiled = None
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -61,7 +92,8 @@ class HypertensionModel:
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         model_data = {
             'model': self.model,
-            'encoded_columns': self.encoded_columns
+            'encoded_columns': self.encoded_columns,
+            'encoder': self.encoder.to_dict()
         }
         with open(self.model_path, 'wb') as f:
             pickle.dump(model_data, f)
@@ -74,12 +106,35 @@ class HypertensionModel:
                 model_data = pickle.load(f)
                 self.model = model_data['model']
                 self.encoded_columns = model_data['encoded_columns']
+            if 'encoder' in model_data:
+                self.encoder = CategoricalEncoder.from_dict(model_data['encoder'])
+            else:
+                # Models saved before the encoder was persisted
+                self.encoder = CategoricalEncoder.from_encoded_columns(
+                    self.encoded_columns, self.feature_names
+                )
+            self.feature_names = self.encoder.input_columns
+            self.compiled = None
             print("Hypertension model loaded successfully")
             return True
         else:
             print(f"No saved model found at {self.model_path}")
             return False
     
+    def _bundle_metadata(self):
+        """Metadata stored next to the forest in a model bundle"""
+        return {
+            'feature_names': self.feature_names,
+            'encoded_columns': self.encoded_columns,
+            'encoder': self.encoder.to_dict()
+        }
+    
+    def _load_metadata(self, metadata):
+        """Restore the encoder saved by _bundle_metadata()"""
+        self.encoded_columns = metadata['encoded_columns']
+        self.encoder = CategoricalEncoder.from_dict(metadata['encoder'])
+        self.feature_names = self.encoder.input_columns
+    
     def predict(self, features):
         """
         Predict hypertension risk
@@ -97,34 +152,63 @@ class HypertensionModel:
                 - prediction: 0 (no risk) or 1 (at risk)
                 - probability: risk probability (0-1)
         """
-        if self.model is None:
-            if not self.load_model():
-                raise Exception("Model not trained or loaded")
+        self._require_model()
         
-        # Create DataFrame from features
-        feature_df = pd.DataFrame([features])
+        # Encode straight into the training column layout
+        feature_array = self.encoder.transform(features)
         
-        # Encode categorical features
-        feature_df = pd.get_dummies(feature_df, drop_first=True)
+        # Predict
+        result = self._forest_predict(feature_array)
+        prediction = result.classes[0]
+        probability = result.probabilities[0][1]
         
-        # Align columns with training data
-        for col in self.encoded_columns:
-            if col not in feature_df.columns:
-                feature_df[col] = 0
+        return prediction, probability
+    
+    def _encode_batch(self, rows):
+        """
+        Encode a batch of raw feature rows into the training column layout
         
-        # Keep only columns that were in training
-        feature_df = feature_df[self.encoded_columns]
+        Args:
+            rows: dict, list of dicts or DataFrame of raw values, or a 2-D
+                  array that is already encoded in encoded_columns order
         
-        # Predict
-        prediction = self.model.predict(feature_df)[0]
-        probability = self.model.predict_proba(feature_df)[0][1]
+        Returns:
+            np.ndarray: Array of shape (n_rows, len(encoded_columns))
+        """
+        if isinstance(rows, np.ndarray):
+            return feature_matrix(rows, self.encoded_columns)
+        return self.encoder.transform(rows)
+    
+    def predict_batch(self, rows):
+        """
+        Predict hypertension risk for many rows with a single forest pass
         
-        return prediction, probability
+        Args:
+            rows: list of feature dicts, DataFrame, or already-encoded 2-D array
+        
+        Returns:
+            tuple: (predictions, probabilities)
+                - predictions: array of 0 (no risk) / 1 (at risk)
+                - probabilities: array of risk probabilities (0-1)
+        """
+        result = self.predict_forest(rows)
+        predictions, probabilities = result.classes, result.probabilities
+        
+        return predictions, probabilities[:, 1]
     
     def get_risk_score(self, features):
         """Get risk score as percentage (0-100)"""
         _, probability = self.predict(features)
         return probability * 100
+    
+    def get_risk_scores(self, rows):
+        """Get risk scores as percentages (0-100) for a batch of rows"""
+        _, probabilities = self.predict_batch(rows)
+        return probabilities * 100
+    
+    def _group_contributions(self, contributions):
+        """Path attributions over encoded_columns, the one-hot columns of a categorical feature summed up"""
+        return self.encoder.group_encoded(contributions)
 
 
 if __name__ == "__main__":
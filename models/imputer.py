@@ -0,0 +1,364 @@
+"""
+Nearest-neighbour imputation of missing model inputs
+A KD-tree per model over the training records' quick-check features
+(QUICK_FEATURES). Features a user did not supply are filled from the k nearest
+real records instead of FeatureMapper's constant defaults: the mean of numeric
+features, the most common value of categories and integer codes. Built offline
+by build_imputer.py and stored as .npz next to the models.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+try:
+    from .quick_models import QUICK_FEATURES, dataset_path
+except ImportError:
+    from quick_models import QUICK_FEATURES, dataset_path
+
+
+# Features filled from the neighbours per model, as column -> 'mean' (numeric)
+# or 'mode' (categories and integer codes). Pregnancies keeps its default: the
+# diabetes records are all women
+IMPUTED_FEATURES = {
+    'diabetes': {'SkinThickness': 'mean', 'Insulin': 'mean', 'DiabetesPedigreeFunction': 'mean'},
+    'heart': {'cp': 'mode', 'restecg': 'mode', 'thalach': 'mean', 'exang': 'mode',
+              'oldpeak': 'mean', 'slope': 'mode', 'ca': 'mode', 'thal': 'mode'},
+    'hypertension': {'Smoking_Status': 'mode', 'Alcohol_Intake': 'mode', 'Physical_Activity_Level': 'mode',
+                     'Family_History': 'mode', 'Diabetes': 'mode', 'Stress_Level': 'mode',
+                     'Salt_Intake': 'mode', 'Sleep_Duration': 'mean', 'Heart_Rate': 'mean',
+                     'LDL': 'mean', 'HDL': 'mean', 'Triglycerides': 'mean'},
+    'obesity': {'family_history_with_overweight': 'mode', 'FAVC': 'mode', 'FCVC': 'mean', 'NCP': 'mean',
+                'CAEC': 'mode', 'SMOKE': 'mode', 'CH2O': 'mean', 'SCC': 'mode', 'FAF': 'mean',
+                'TUE': 'mean', 'CALC': 'mode', 'MTRANS': 'mode'},
+}
+
+# Columns where the dataset records an unmeasured value as 0
+MISSING_ZEROS = {'diabetes': ('Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI')}
+
+DEFAULT_NEIGHBORS = 10
+
+DEFAULT_IMPUTER_PATH = 'saved_models/imputer.npz'
+
+
+def load_records(name, dataset_dir='dataset'):
+    """
+    Distinct training records of a model, with unmeasured values as NaN
+
+    Category strings are kept as written ('None' is an alcohol intake, not a
+    missing value).
+    """
+    records = pd.read_csv(dataset_path(name, dataset_dir), keep_default_na=False, na_values=[''])
+    for column in MISSING_ZEROS.get(name, ()):
+        records[column] = records[column].replace(0, np.nan)
+    return records.drop_duplicates().reset_index(drop=True)
+
+
+def build_table(records, query, fill):
+    """
+    Search points and fill values of one model
+
+    Args:
+        records (pd.DataFrame): Training records, see load_records()
+        query (list): Columns the neighbours are searched by
+        fill (dict): Imputed column -> 'mean' or 'mode'
+
+    Returns:
+        dict: 'query', 'fill', 'query_categories' and 'categories' (category
+              lists of string query columns and mode columns), 'center' and
+              'scale' of the query columns, standardized 'points', 'means'
+              (records x mean columns, NaN where unmeasured) and 'codes'
+              (records x mode columns, category index or -1)
+    """
+    records = records.dropna(subset=query)
+    query_categories, columns = {}, []
+    for column in query:
+        values = records[column]
+        if pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+            query_categories[column] = sorted(values.unique().tolist())
+            values = values.map({category: i for i, category in enumerate(query_categories[column])})
+        columns.append(values.to_numpy(dtype=float))
+    raw = np.column_stack(columns)
+    center = raw.mean(axis=0)
+    scale = raw.std(axis=0)
+    scale[scale == 0] = 1
+
+    means, codes, categories = [], [], {}
+    for column, kind in fill.items():
+        values = records[column]
+        if kind == 'mean':
+            means.append(values.to_numpy(dtype=float))
+            continue
+        categories[column] = sorted(values.dropna().unique().tolist())
+        index = {category: i for i, category in enumerate(categories[column])}
+        codes.append(values.map(index).fillna(-1).to_numpy(dtype=np.int16))
+
+    n_records = len(records)
+    return {
+        'query': list(query),
+        'fill': dict(fill),
+        'query_categories': query_categories,
+        'categories': categories,
+        'center': center,
+        'scale': scale,
+        'points': (raw - center) / scale,
+        'means': np.column_stack(means) if means else np.empty((n_records, 0)),
+        'codes': np.column_stack(codes) if codes else np.empty((n_records, 0), dtype=np.int16),
+    }
+
+
+class NeighborImputer:
+    """
+    Per-model KD-trees over training records with vectorized neighbour fills
+
+    `tables` maps model name -> build_table() output. The trees are rebuilt
+    from the stored points on load (about a millisecond per model).
+    """
+
+    def __init__(self, tables, meta=None):
+        self.tables = tables
+        self.meta = meta or {}
+        self.k = self.meta.get('k', DEFAULT_NEIGHBORS)
+        self._trees = {name: cKDTree(table['points']) for name, table in tables.items()}
+        self._query_codes = {name: {column: {category: i for i, category in enumerate(categories)}
+                                    for column, categories in table['query_categories'].items()}
+                             for name, table in tables.items()}
+        # Imputed column -> (kind, index into the means or codes columns)
+        self._slots = {}
+        # Category values of each mode column, indexed by code
+        self._mode_values = {}
+        for name, table in tables.items():
+            slots, counters = {}, {'mean': 0, 'mode': 0}
+            for column, kind in table['fill'].items():
+                slots[column] = (kind, counters[kind])
+                counters[kind] += 1
+            self._slots[name] = slots
+            self._mode_values[name] = [np.array(table['categories'][column])
+                                       for column, kind in table['fill'].items() if kind == 'mode']
+
+    @property
+    def nbytes(self):
+        return sum(table[key].nbytes for table in self.tables.values() for key in ('points', 'means', 'codes'))
+
+    def fill_columns(self, name):
+        """Columns of a model the imputer can fill (none for models it was not built for)"""
+        return list(self.tables[name]['fill']) if name in self.tables else []
+
+    def _points(self, name, query_values):
+        """Standardized search points from one sequence of values per query column"""
+        table = self.tables[name]
+        columns = []
+        for column, values in zip(table['query'], query_values):
+            codes = self._query_codes[name].get(column)
+            if codes is not None:
+                values = [codes.get(value, np.nan) for value in values]
+            columns.append(np.asarray(values, dtype=float))
+        raw = np.column_stack(columns)
+        # Unknown categories sit at the center of their axis
+        raw = np.where(np.isnan(raw), table['center'], raw)
+        return (raw - table['center']) / table['scale']
+
+    def neighbor_values(self, name, points):
+        """
+        Fill values from the k nearest records of each point
+
+        Args:
+            name (str): Model name
+            points (np.ndarray): Standardized points, shape (n, query columns)
+
+        Returns:
+            tuple: (means, modes, found): mean of every mean column over the
+                   measured neighbours (NaN if none was measured), code of the
+                   most common category of every mode column (lowest code on
+                   ties) and whether any neighbour had one
+        """
+        table = self.tables[name]
+        k = min(self.k, len(table['points']))
+        _, index = self._trees[name].query(points, k=k)
+        index = index.reshape(len(points), k)
+
+        values = table['means'][index]
+        measured = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            means = np.where(measured, values, 0).sum(axis=1) / measured.sum(axis=1)
+
+        if not self._mode_values[name]:
+            none = np.empty((len(points), 0), dtype=int)
+            return means, none, none.astype(bool)
+        codes = table['codes'][index]
+        n_categories = max(len(values) for values in self._mode_values[name])
+        counts = (codes[..., None] == np.arange(n_categories)).sum(axis=1)
+        return means, counts.argmax(axis=-1), counts.max(axis=-1) > 0
+
+    def impute(self, name, features, columns):
+        """
+        Fill columns of one feature dict from the nearest records
+
+        Args:
+            name (str): Model name
+            features (dict): The model's features (modified in place)
+            columns (list): Imputed columns to fill, see fill_columns()
+
+        Returns:
+            dict: features
+        """
+        points = self._points(name, [[features[column]] for column in self.tables[name]['query']])
+        means, modes, found = self.neighbor_values(name, points)
+        for column in columns:
+            kind, j = self._slots[name][column]
+            if kind == 'mean':
+                if not np.isnan(means[0, j]):
+                    features[column] = float(means[0, j])
+            elif found[0, j]:
+                features[column] = self._mode_values[name][j][modes[0, j]].item()
+        return features
+
+    def impute_columns(self, name, query, missing):
+        """
+        Fill values of many rows at once
+
+        Args:
+            name (str): Model name
+            query (dict): Query column -> array of every row's values
+            missing (dict): Imputed column -> boolean array, True where the
+                            row's value was not supplied
+
+        Returns:
+            dict: Column -> (row indices, values) of the rows to fill
+        """
+        if not missing:
+            return {}
+        rows = np.flatnonzero(np.logical_or.reduce(list(missing.values())))
+        if len(rows) == 0:
+            return {}
+        points = self._points(name, [np.asarray(query[column])[rows] for column in self.tables[name]['query']])
+        means, modes, found = self.neighbor_values(name, points)
+
+        filled = {}
+        for column, column_missing in missing.items():
+            kind, j = self._slots[name][column]
+            if kind == 'mean':
+                values = means[:, j]
+                target = column_missing[rows] & ~np.isnan(values)
+            else:
+                values = self._mode_values[name][j][modes[:, j]]
+                target = column_missing[rows] & found[:, j]
+            if target.any():
+                filled[column] = (rows[target], values[target])
+        return filled
+
+    def impute_frame(self, name, frame, missing):
+        """
+        impute() over a feature DataFrame
+
+        Args:
+            name (str): Model name
+            frame (pd.DataFrame): The model's features, one row per user
+                                  (modified in place)
+            missing (dict): Imputed column -> boolean array, see impute_columns()
+
+        Returns:
+            pd.DataFrame: frame
+        """
+        query = {column: frame[column].to_numpy() for column in self.tables[name]['query']}
+        for column, (rows, values) in self.impute_columns(name, query, missing).items():
+            if self._slots[name][column][0] == 'mean':
+                frame[column] = frame[column].astype(float)
+            frame.iloc[rows, frame.columns.get_loc(column)] = values
+        return frame
+
+    def impute_rows(self, name, rows, columns, missing):
+        """
+        impute() over a feature array
+
+        Args:
+            name (str): Model name
+            rows (np.ndarray): The model's features, one row per user in
+                               `columns` order (modified in place)
+            columns (list): Feature names of the array's columns
+            missing (dict): Imputed column -> boolean array, see impute_columns()
+
+        Returns:
+            np.ndarray: rows
+        """
+        position = {column: i for i, column in enumerate(columns)}
+        query = {column: rows[:, position[column]] for column in self.tables[name]['query']}
+        for column, (indices, values) in self.impute_columns(name, query, missing).items():
+            rows[indices, position[column]] = values
+        return rows
+
+    def save(self, path):
+        """Write the imputer to an .npz file"""
+        meta = dict(self.meta, k=self.k, tables={
+            name: {key: table[key] for key in ('query', 'fill', 'query_categories', 'categories')}
+            for name, table in self.tables.items()
+        })
+        arrays = {'meta': np.array(json.dumps(meta))}
+        for name, table in self.tables.items():
+            for key in ('center', 'scale', 'points', 'means', 'codes'):
+                arrays[f'{name}.{key}'] = table[key]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an imputer written by save()"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            tables = {}
+            for name, layout in meta.pop('tables').items():
+                tables[name] = dict(layout, **{key: data[f'{name}.{key}']
+                                               for key in ('center', 'scale', 'points', 'means', 'codes')})
+        return cls(tables, meta)
+
+
+def load_imputer(path):
+    """
+    Load an imputer unless it is missing or older than the datasets it was built from
+
+    Returns:
+        NeighborImputer or None
+    """
+    if not os.path.exists(path):
+        return None
+    imputer = NeighborImputer.load(path)
+    imputer_mtime = os.path.getmtime(path)
+    for data_path in imputer.meta.get('dataset_paths', []):
+        if os.path.exists(data_path) and os.path.getmtime(data_path) > imputer_mtime:
+            print(f"⚠️  Imputer {path} is older than {data_path} - rebuild it with build_imputer.py")
+            return None
+    return imputer
+
+
+def build_imputer(dataset_dir='dataset', k=DEFAULT_NEIGHBORS, records=None):
+    """
+    Build the imputer from the training datasets
+
+    Args:
+        dataset_dir (str): Directory of the training datasets
+        k (int): Neighbours each fill is taken from
+        records (dict): Optional model name -> records to build from instead of
+                        the datasets (see load_records)
+
+    Returns:
+        NeighborImputer: Imputer for every model whose dataset exists
+    """
+    tables, dataset_paths = {}, []
+    for name, fill in IMPUTED_FEATURES.items():
+        if records is not None:
+            if name not in records:
+                continue
+            model_records = records[name]
+        else:
+            path = dataset_path(name, dataset_dir)
+            if not os.path.exists(path):
+                print(f"⚠️  {path} not found - {name} features keep their defaults")
+                continue
+            model_records = load_records(name, dataset_dir)
+            dataset_paths.append(path)
+        tables[name] = build_table(model_records, QUICK_FEATURES[name], fill)
+    return NeighborImputer(tables, {'k': k, 'dataset_paths': dataset_paths})
@@ -0,0 +1,422 @@
+"""
+Shared inference helpers for the model wrappers
+Turns batches of feature rows (dicts, arrays or DataFrames) into model-ready
+arrays, and holds the forest plumbing every wrapper shares (ForestModel)
+"""
+import numpy as np
+
+# ForestPrediction and ForestExplanation live with the engine and are re-exported here
+try:
+    from .forest_engine import ForestExplanation, ForestPrediction, compile_forest
+    from .anytime import AnytimeForest, AnytimeRisk
+except ImportError:
+    from forest_engine import ForestExplanation, ForestPrediction, compile_forest
+    from anytime import AnytimeForest, AnytimeRisk
+
+
+def _is_frame(rows):
+    """True for pandas DataFrames (checked by duck typing to avoid importing pandas)"""
+    return hasattr(rows, 'columns') and hasattr(rows, 'to_numpy')
+
+
+def feature_matrix(rows, columns, defaults=None):
+    """
+    Build a 2-D float array from a batch of feature rows
+
+    Args:
+        rows: One of
+            - dict or list of dicts keyed by feature name
+            - 2-D array already in `columns` order
+            - pandas DataFrame with (a subset of) `columns`
+        columns (list): Feature names in the order the model was trained on
+        defaults (dict): Fill value per feature when it is missing (0 if not listed)
+
+    Returns:
+        np.ndarray: Array of shape (n_rows, len(columns))
+    """
+    defaults = defaults or {}
+
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    if isinstance(rows, np.ndarray):
+        feature_array = np.asarray(rows, dtype=float)
+        if feature_array.ndim == 1:
+            feature_array = feature_array.reshape(1, -1)
+        if feature_array.shape[1] != len(columns):
+            raise ValueError(
+                f"Expected {len(columns)} feature columns, got {feature_array.shape[1]}"
+            )
+        return feature_array
+
+    if _is_frame(rows):
+        feature_array = np.empty((len(rows), len(columns)))
+        for j, col in enumerate(columns):
+            if col in rows.columns:
+                feature_array[:, j] = rows[col].to_numpy(dtype=float)
+            else:
+                feature_array[:, j] = defaults.get(col, 0)
+        return feature_array
+
+    return np.array(
+        [[row.get(col, defaults.get(col, 0)) for col in columns] for row in rows],
+        dtype=float
+    ).reshape(len(rows), len(columns))
+
+
+def feature_column(rows, columns, name, default=0):
+    """
+    Extract a single feature from a batch of rows as a float array
+
+    Unlike feature_matrix, the default here is applied per call so callers can
+    use a different fallback than the model input (e.g. clinical rules).
+
+    Args:
+        rows: Same formats accepted by feature_matrix
+        columns (list): Column order used when rows is a 2-D array
+        name (str): Feature to extract
+        default: Value used where the feature is missing
+
+    Returns:
+        np.ndarray: Array of shape (n_rows,)
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    if isinstance(rows, np.ndarray):
+        feature_array = np.asarray(rows, dtype=float)
+        if feature_array.ndim == 1:
+            feature_array = feature_array.reshape(1, -1)
+        if name not in columns:
+            return np.full(len(feature_array), default, dtype=float)
+        return feature_array[:, list(columns).index(name)]
+
+    if _is_frame(rows):
+        if name in rows.columns:
+            return rows[name].to_numpy(dtype=float)
+        return np.full(len(rows), default, dtype=float)
+
+    return np.array([row.get(name, default) for row in rows], dtype=float)
+
+
+def forest_predict(model, feature_array):
+    """
+    Evaluate every tree of a fitted random forest exactly once
+
+    sklearn's predict() and predict_proba() each walk the whole forest and
+    re-validate the input. Here the input is converted once and each tree is
+    queried directly, which yields the class, the averaged probabilities and
+    the spread of the individual tree votes from a single traversal.
+
+    Args:
+        model: Fitted RandomForestClassifier
+        feature_array: 2-D array or DataFrame of encoded features
+
+    Returns:
+        ForestPrediction: (classes, probabilities, spread)
+            - classes: predicted class per row (same as model.predict)
+            - probabilities: (n_rows, n_classes), same as model.predict_proba
+            - spread: (n_rows, n_classes) std-dev of the per-tree probabilities
+    """
+    X = np.ascontiguousarray(feature_array, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+
+    n_classes = model.n_classes_
+    total = np.zeros((X.shape[0], n_classes))
+    total_sq = np.zeros((X.shape[0], n_classes))
+
+    # Accumulate in estimator order, matching sklearn's summation
+    for estimator in model.estimators_:
+        tree_proba = estimator.tree_.predict(X)[:, :n_classes]
+        total += tree_proba
+        total_sq += tree_proba * tree_proba
+
+    n_trees = len(model.estimators_)
+    probabilities = total / n_trees
+    spread = np.sqrt(np.maximum(total_sq / n_trees - probabilities ** 2, 0))
+    classes = model.classes_.take(np.argmax(probabilities, axis=1))
+
+    return ForestPrediction(classes, probabilities, spread)
+
+
+def forest_explain(model, feature_array, weights):
+    """
+    Evaluate a fitted random forest and attribute every score to the features
+
+    Same Saabas path attributions as FlatForest.explain(), computed tree by
+    tree from each estimator's `tree_` arrays. Nothing is cached: a tree's
+    per-node attributions (n_nodes x n_features) are built, read with the
+    leaves reached by the prediction and dropped before the next tree, so the
+    sklearn engine keeps no compiled copy of the forest.
+
+    Args:
+        model: Fitted RandomForestClassifier
+        feature_array: 2-D array or DataFrame of encoded features
+        weights: Weight per class of the explained score
+
+    Returns:
+        ForestExplanation: (prediction, bias, contributions), see
+        FlatForest.explain()
+    """
+    X = np.ascontiguousarray(feature_array, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+
+    n_classes = model.n_classes_
+    weights = np.asarray(weights, dtype=float)
+    total = np.zeros((X.shape[0], n_classes))
+    total_sq = np.zeros((X.shape[0], n_classes))
+    contributions = np.zeros(X.shape)
+    bias = 0.0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :n_classes]
+        score = value @ weights
+        left, right, feature = tree.children_left, tree.children_right, tree.feature
+
+        # Root to leaves one level at a time; children inherit the parent's path
+        paths = np.zeros((tree.node_count, X.shape[1]))
+        parents = np.array([0])
+        while len(parents):
+            parents = parents[left[parents] >= 0]
+            for children in (left[parents], right[parents]):
+                paths[children] = paths[parents]
+                paths[children, feature[parents]] += score[children] - score[parents]
+            parents = np.concatenate([left[parents], right[parents]])
+
+        leaves = tree.apply(X)
+        tree_proba = value[leaves]
+        total += tree_proba
+        total_sq += tree_proba * tree_proba
+        contributions += paths[leaves]
+        bias += score[0]
+
+    n_trees = len(model.estimators_)
+    probabilities = total / n_trees
+    spread = np.sqrt(np.maximum(total_sq / n_trees - probabilities ** 2, 0))
+    classes = model.classes_.take(np.argmax(probabilities, axis=1))
+
+    return ForestExplanation(ForestPrediction(classes, probabilities, spread),
+                             bias / n_trees, contributions / n_trees)
+
+
+def top_drivers(contributions, names, limit=5):
+    """
+    Largest risk contributions of one prediction, for reports
+
+    Args:
+        contributions: Risk points per feature (1-D, aligned with names)
+        names (list): Feature names
+        limit (int): Most drivers returned
+
+    Returns:
+        list: [{'feature', 'contribution'}] by decreasing absolute
+              contribution, leaving out contributions that round to 0
+    """
+    # A handful of values: plain Python beats NumPy's per-call overhead
+    values = np.asarray(contributions, dtype=float).tolist()
+    order = sorted(range(len(values)), key=lambda i: abs(values[i]), reverse=True)
+    drivers = []
+    for i in order[:limit]:
+        contribution = round(values[i], 2)
+        if contribution != 0:
+            drivers.append({'feature': names[i], 'contribution': contribution})
+    return drivers
+
+
+class ForestModel:
+    """
+    Forest serving shared by the model wrappers: engines, bundles, batched
+    prediction, risk drivers and early-exit evaluation
+
+    Wrappers set `model`, `compiled`, `engine`, `anytime` and `feature_names`
+    (plus `feature_defaults` unless they override _encode_batch), implement
+    load_model(), and name the model in `label`. The hooks below cover what
+    differs between them: extra bundle metadata, how rows are encoded, how
+    path attributions map onto driver_names and how the risk score follows
+    from the class probabilities during early exit.
+    """
+
+    label = 'Forest'
+
+    def _require_model(self):
+        """Load the saved model unless a model or a compiled forest is served"""
+        if self.model is None and self.compiled is None:
+            if not self.load_model():
+                raise Exception("Model not trained or loaded")
+
+    def _bundle_metadata(self):
+        """Metadata stored next to the forest in a model bundle"""
+        return {'feature_names': self.feature_names}
+
+    def _load_metadata(self, metadata):
+        """Restore the state saved by _bundle_metadata() (nothing by default)"""
+
+    def bundle_entry(self, engine='flat'):
+        """
+        Compiled forest and metadata for storing this model in a model bundle
+
+        Args:
+            engine (str): Compiled engine, see models.forest_engine.compile_forest
+
+        Returns:
+            tuple: (FlatForest, metadata dict), see models.bundle.save_bundle
+        """
+        if self.model is None:
+            if not self.load_model():
+                raise Exception("Model not trained or loaded")
+        return compile_forest(self.model, engine), self._bundle_metadata()
+
+    def load_compiled(self, compiled, metadata):
+        """
+        Serve from a precompiled forest (e.g. a memory-mapped model bundle)
+        instead of the sklearn model, which is released
+
+        Args:
+            compiled (FlatForest): Forest from models.bundle.load_bundle or
+                                   bundle_entry()
+            metadata (dict): Metadata saved by bundle_entry()
+        """
+        self._load_metadata(metadata)
+        self.model = None
+        self.compiled = compiled
+        self.engine = compiled.engine
+        print(f"{self.label} model loaded ({compiled.engine} engine)")
+
+    def _encode_batch(self, rows):
+        """
+        Forest input of a batch of feature rows
+
+        Args:
+            rows: list of feature dicts, 2-D array in feature_names order, or DataFrame
+
+        Returns:
+            np.ndarray: Array of shape (n_rows, n_features)
+        """
+        return feature_matrix(rows, self.feature_names, self.feature_defaults)
+
+    def _forest_predict(self, feature_array):
+        """Run the forest once with the selected engine"""
+        if self.engine != 'sklearn':
+            if self.compiled is None:
+                self.compiled = compile_forest(self.model, self.engine)
+            return self.compiled.predict(feature_array)
+        return forest_predict(self.model, feature_array)
+
+    def predict_forest(self, rows):
+        """
+        Single forest traversal returning classes, probabilities and vote spread
+
+        Args:
+            rows: Feature rows, see _encode_batch()
+
+        Returns:
+            ForestPrediction: (classes, probabilities, spread) arrays, see
+            forest_predict()
+        """
+        self._require_model()
+        return self._forest_predict(self._encode_batch(rows))
+
+    def predict_contributions(self, rows, weights):
+        """
+        Single forest traversal returning the prediction and the per-feature
+        path attributions of a weighted class score (see
+        models.forest_engine.FlatForest.explain)
+
+        Args:
+            rows: Feature rows, see _encode_batch()
+            weights: Weight per class of the explained score
+
+        Returns:
+            ForestExplanation: (prediction, bias, contributions), contributions
+            over the forest's input columns
+        """
+        self._require_model()
+        feature_array = self._encode_batch(rows)
+        if self.engine == 'sklearn':
+            return forest_explain(self.model, feature_array, weights)
+        if self.compiled is None:
+            self.compiled = compile_forest(self.model, self.engine)
+        return self.compiled.explain(feature_array, weights)
+
+    @property
+    def driver_names(self):
+        """Names of the columns of explain_risk_scores() contributions"""
+        return self.feature_names
+
+    def _group_contributions(self, contributions):
+        """Path attributions over the forest's input columns -> over driver_names"""
+        return contributions
+
+    def explain_risk_scores(self, rows):
+        """
+        Risk scores and the risk each feature adds, from one forest pass
+
+        Args:
+            rows: Feature rows, see _encode_batch()
+
+        Returns:
+            tuple: (risk scores, contributions)
+                - risk scores: same as get_risk_scores
+                - contributions: (n_rows, len(driver_names)) risk percentage
+                  points added to the forest's average risk
+        """
+        explanation = self.predict_contributions(rows, (0, 100))
+        contributions = self._group_contributions(explanation.contributions)
+        return explanation.prediction.probabilities[:, 1] * 100, contributions
+
+    def explain_risk_score(self, features):
+        """Risk score of one feature dict with its top drivers, see explain_risk_scores()"""
+        risk_scores, contributions = self.explain_risk_scores([features])
+        return risk_scores[0], top_drivers(contributions[0], self.driver_names)
+
+    def _anytime_forest(self):
+        """AnytimeForest over the forest served by the selected engine"""
+        self._require_model()
+        if self.engine != 'sklearn' and self.compiled is None:
+            self.compiled = compile_forest(self.model, self.engine)
+        forest = self.model if self.engine == 'sklearn' else self.compiled
+        if self.anytime is None or self.anytime.source is not forest:
+            self.anytime = AnytimeForest(forest)
+        return self.anytime
+
+    def _risk_bounds(self, rows):
+        """
+        Risk score bounds of early-exit evaluation, see AnytimeForest.evaluate
+
+        Returns:
+            callable(active, low, high): lowest and highest risk score of the
+            rows `active` given per-class probability bounds; by default the
+            probability of the positive class in percent
+        """
+        def risk_bounds(_, low, high):
+            return low[:, 1] * 100, high[:, 1] * 100
+        return risk_bounds
+
+    def anytime_risks(self, rows, risk_thresholds, risk_levels, confidence=1.0, block=10):
+        """
+        Risk levels with early exit: trees are evaluated in blocks and a row
+        stops as soon as its risk level is decided (see models.anytime)
+
+        Args:
+            rows: Feature rows, see _encode_batch()
+            risk_thresholds (dict): Risk band thresholds, HealthScorer.risk_thresholds
+            risk_levels (tuple): Level of each band, HealthScorer.risk_levels
+            confidence (float): 1 for exact levels, < 1 for earlier statistical exit
+            block (int): Trees evaluated between two checks
+
+        Returns:
+            AnytimeRisk: arrays of level, score estimate, lowest and highest
+            possible final score, and trees evaluated per row
+        """
+        forest = self._anytime_forest()
+        feature_array = self._encode_batch(rows)
+        return forest.evaluate(feature_array, self._risk_bounds(rows), risk_thresholds, risk_levels,
+                               confidence, block)
+
+    def anytime_risk(self, features, risk_thresholds, risk_levels, **kwargs):
+        """Early-exit risk level of a single feature dict, see anytime_risks()"""
+        result = self.anytime_risks([features], risk_thresholds, risk_levels, **kwargs)
+        return AnytimeRisk(*(values[0] for values in result))
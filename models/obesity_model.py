@@ -11,13 +11,74 @@ from sklearn.metrics import accuracy_score
 import pickle
 import os
 
+from utils.rounding import round_array
 
-class ObesityModel:
-    def __init__(self, model_path='saved_models/obesity_model.pkl'):
+try:
+    from .inference import ForestModel, feature_matrix, feature_column
+    from .encoders import CategoricalEncoder
+except ImportError:
+    from inference import ForestModel, feature_matrix, feature_column
+    from encoders import CategoricalEncoder
+
+
+# Risk (0-100) for each model class, indexed by class code
+CLASS_RISK_MAPPING = np.array([
+    25,  # Insufficient weight (health concern)
+    5,   # Normal weight (low risk)
+    35,  # Overweight Level I
+    50,  # Overweight Level II
+    70,  # Obesity Type I
+    85,  # Obesity Type II
+    95   # Obesity Type III
+])
+
+
+def bmi_risk_scores(bmi):
+    """
+    WHO BMI bands used by ObesityModel.get_risk_scores; they keep risk scores
+    accurate regardless of model uncertainty
+    
+    Args:
+        bmi (np.ndarray): Body mass index per row
+    
+    Returns:
+        np.ndarray: BMI-based risk (0-100)
+    """
+    return np.select(
+        [bmi < 18.5,    # Underweight: health risk but not obesity-related
+         bmi < 25,      # Normal weight
+         bmi < 27,      # Overweight Level I
+         bmi < 30,      # Overweight Level II
+         bmi < 35,      # Obesity Type I
+         bmi < 40],     # Obesity Type II
+        [25, 5, 35, 50, 70, 85],
+        95              # Obesity Type III (morbid obesity)
+    )
+
+
+class ObesityModel(ForestModel):
+    label = 'Obesity'
+    
+    def __init__(self, model_path='saved_models/obesity_model.pkl', engine='sklearn',
+                 features=None, forest_params=None):
         self.model = None
         self.model_path = model_path
+        self.engine = engine    # 'sklearn', 'flat' or 'compact' (see forest_engine.compile_forest)
+        self.compiled = None
+        self.anytime = None     # AnytimeForest over the served forest (built on first use)
         self.encoded_columns = None  # Store column names after encoding
-        self.feature_names = None
+        self.encoder = None          # CategoricalEncoder fitted at training time
+        # Raw input features (replaced by the training columns once trained)
+        self.feature_names = [
+            'Gender', 'Age', 'Height', 'Weight', 'family_history_with_overweight',
+            'FAVC', 'FCVC', 'NCP', 'CAEC', 'SMOKE', 'CH2O', 'SCC', 'FAF', 'TUE',
+            'CALC', 'MTRANS'
+        ]
+        # Optional feature subset, e.g. the quick-check tier (see models.quick_models)
+        if features is not None:
+            self.feature_names = list(features)
+        self.features = features
+        self.forest_params = forest_params or {'n_estimators': 100}
         
     def train(self, data_path):
         """Train the obesity classification model"""
@@ -26,14 +87,18 @@ class ObesityModel:
         
         # Define features and target
         X = df.drop('NObeyesdad', axis=1)
+        if self.features is not None:
+            X = X[self.features]
         y = df['NObeyesdad']
         
-        # Encode categorical features
-        X = pd.get_dummies(X, drop_first=True)
+        # Encode categorical features with an encoder that is saved with the model
+        self.encoder = CategoricalEncoder().fit(X)
+        self.feature_names = self.encoder.input_columns
+        X = self.encoder.transform(X)
         y = y.astype('category').cat.codes
         
         # Store encoded column names
-        self.encoded_columns = X.columns.tolist()
+        self.encoded_columns = self.encoder.encoded_columns
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
@@ -41,8 +106,9 @@ class ObesityModel:
         )
         
         # Train model
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.model = RandomForestClassifier(random_state=42, **self.forest_params)
         self.model.fit(X_train, y_train)
+        self.compiled = None
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -60,7 +126,8 @@ class ObesityModel:
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         model_data = {
             'model': self.model,
-            'encoded_columns': self.encoded_columns
+            'encoded_columns': self.encoded_columns,
+            'encoder': self.encoder.to_dict()
         }
         with open(self.model_path, 'wb') as f:
             pickle.dump(model_data, f)
@@ -73,12 +140,35 @@ class ObesityModel:
                 model_data = pickle.load(f)
                 self.model = model_data['model']
                 self.encoded_columns = model_data['encoded_columns']
+            if 'encoder' in model_data:
+                self.encoder = CategoricalEncoder.from_dict(model_data['encoder'])
+            else:
+                # Models saved before the encoder was persisted
+                self.encoder = CategoricalEncoder.from_encoded_columns(
+                    self.encoded_columns, self.feature_names
+                )
+            self.feature_names = self.encoder.input_columns
+            self.compiled = None
             print("Obesity model loaded successfully")
             return True
         else:
             print(f"No saved model found at {self.model_path}")
             return False
     
+    def _bundle_metadata(self):
+        """Metadata stored next to the forest in a model bundle"""
+        return {
+            'feature_names': self.feature_names,
+            'encoded_columns': self.encoded_columns,
+            'encoder': self.encoder.to_dict()
+        }
+    
+    def _load_metadata(self, metadata):
+        """Restore the encoder saved by _bundle_metadata()"""
+        self.encoded_columns = metadata['encoded_columns']
+        self.encoder = CategoricalEncoder.from_dict(metadata['encoder'])
+        self.feature_names = self.encoder.input_columns
+    
     def predict(self, features):
         """
         Predict obesity classification
@@ -93,85 +183,136 @@ class ObesityModel:
                 - prediction: obesity class (0-6)
                 - probability: max class probability (0-1)
         """
-        if self.model is None:
-            if not self.load_model():
-                raise Exception("Model not trained or loaded")
-        
-        # Create DataFrame from features
-        feature_df = pd.DataFrame([features])
-        
-        # Encode categorical features
-        feature_df = pd.get_dummies(feature_df, drop_first=True)
+        self._require_model()
         
-        # Align columns with training data
-        for col in self.encoded_columns:
-            if col not in feature_df.columns:
-                feature_df[col] = 0
-        
-        # Keep only columns that were in training
-        feature_df = feature_df[self.encoded_columns]
+        # Encode straight into the training column layout
+        feature_array = self.encoder.transform(features)
         
         # Predict
-        prediction = self.model.predict(feature_df)[0]
-        probabilities = self.model.predict_proba(feature_df)[0]
+        result = self._forest_predict(feature_array)
+        prediction = result.classes[0]
+        probabilities = result.probabilities[0]
         max_probability = probabilities[prediction]
         
         return prediction, max_probability
     
+    def _encode_batch(self, rows):
+        """
+        Encode a batch of raw feature rows into the training column layout
+        
+        Args:
+            rows: dict, list of dicts or DataFrame of raw values, or a 2-D
+                  array that is already encoded in encoded_columns order
+        
+        Returns:
+            np.ndarray: Array of shape (n_rows, len(encoded_columns))
+        """
+        if isinstance(rows, np.ndarray):
+            return feature_matrix(rows, self.encoded_columns)
+        return self.encoder.transform(rows)
+    
     def get_risk_score(self, features):
         """
         Get obesity risk score as percentage (0-100)
         Uses BMI calculation as primary indicator with model as secondary signal
+        (see get_risk_scores)
         """
-        # Calculate BMI from features (Height is in meters, Weight in kg)
-        height = features.get('Height', 1.7)  # meters
-        weight = features.get('Weight', 70)   # kg
-        bmi = weight / (height ** 2)
-        
-        # BMI-based risk classification (WHO standards)
-        # This ensures accurate risk scores regardless of model uncertainty
-        if bmi < 18.5:
-            # Underweight
-            bmi_risk = 25  # Health risk but not obesity-related
-        elif bmi < 25:
-            # Normal weight
-            bmi_risk = 5  # Very low obesity risk
-        elif bmi < 27:
-            # Overweight Level I
-            bmi_risk = 35
-        elif bmi < 30:
-            # Overweight Level II
-            bmi_risk = 50
-        elif bmi < 35:
-            # Obesity Type I (Class I)
-            bmi_risk = 70
-        elif bmi < 40:
-            # Obesity Type II (Class II)
-            bmi_risk = 85
-        else:
-            # Obesity Type III (Class III) - Morbid obesity
-            bmi_risk = 95
-        
-        # Get model prediction for additional context
-        prediction, probability = self.predict(features)
-        
-        # Model-based risk mapping
-        class_risk_mapping = {
-            0: 25,  # Insufficient weight (health concern)
-            1: 5,   # Normal weight (low risk)
-            2: 35,  # Overweight Level I
-            3: 50,  # Overweight Level II
-            4: 70,  # Obesity Type I
-            5: 85,  # Obesity Type II
-            6: 95   # Obesity Type III
-        }
-        model_risk = class_risk_mapping.get(prediction, 50)
+        return self.get_risk_scores([features])[0]
+    
+    def predict_batch(self, rows):
+        """
+        Predict obesity classification for many rows with a single forest pass
         
-        # Use weighted average: 80% BMI (objective), 20% model (lifestyle factors)
-        # BMI is the primary indicator, model provides lifestyle context
-        final_risk = (bmi_risk * 0.80) + (model_risk * 0.20)
+        Args:
+            rows: list of feature dicts, DataFrame, or already-encoded 2-D array
+        
+        Returns:
+            tuple: (predictions, probabilities)
+                - predictions: array of obesity classes (0-6)
+                - probabilities: array of max class probabilities (0-1)
+        """
+        result = self.predict_forest(rows)
+        predictions, probabilities = result.classes, result.probabilities
+        max_probabilities = probabilities.max(axis=1)
+        
+        return predictions, max_probabilities
+    
+    def get_risk_scores(self, rows):
+        """
+        Get obesity risk scores as percentages (0-100) for a batch of rows
+        Blend of the BMI band risk and the risk of the predicted class, see _blend_risks
+        """
+        predictions, _ = self.predict_batch(rows)
+        return self._blend_risks(self._bmi_risks(rows), CLASS_RISK_MAPPING[predictions])
+    
+    def _bmi_risks(self, rows):
+        """BMI band risk of a batch of rows, see bmi_risk_scores()"""
+        height = feature_column(rows, self.encoded_columns, 'Height', 1.7)  # meters
+        weight = feature_column(rows, self.encoded_columns, 'Weight', 70)   # kg
+        return bmi_risk_scores(weight / (height ** 2))
+    
+    @staticmethod
+    def _blend_risks(bmi_risk, model_risk):
+        """
+        Weighted average: 80% BMI (objective), 20% model (lifestyle factors),
+        rounded as round() does
+        BMI is the primary indicator, model provides lifestyle context
+        """
+        return round_array((bmi_risk * 0.80) + (model_risk * 0.20), 2)
+    
+    @property
+    def driver_names(self):
+        """Names of the columns of explain_risk_scores() contributions"""
+        return self.feature_names + ['BMI']
+    
+    def _group_contributions(self, contributions):
+        """Path attributions over encoded_columns, the one-hot columns of a categorical feature summed up"""
+        return self.encoder.group_encoded(contributions)
+    
+    def explain_risk_scores(self, rows):
+        """
+        Risk scores and the risk each input feature adds, from one forest pass
+        
+        The model part of the score comes from the predicted class, which is
+        not additive, so the forest attributions are taken on the expected
+        class risk (class probabilities times CLASS_RISK_MAPPING) instead. The
+        BMI band part of the score is credited to 'BMI' in full.
+        
+        Args:
+            rows: list of feature dicts, DataFrame, or already-encoded 2-D array
+        
+        Returns:
+            tuple: (risk scores, contributions)
+                - risk scores: same as get_risk_scores
+                - contributions: (n_rows, len(driver_names)) risk percentage points
+        """
+        self._require_model()
+        classes = self.model.classes_ if self.compiled is None else self.compiled.classes
+        explanation = self.predict_contributions(rows, CLASS_RISK_MAPPING[classes] * 0.20)
+        model_risk = CLASS_RISK_MAPPING[explanation.prediction.classes]
+        
+        bmi_risk = self._bmi_risks(rows)
+        final_risk = self._blend_risks(bmi_risk, model_risk)
+        
+        contributions = self._group_contributions(explanation.contributions)
+        return final_risk, np.column_stack([contributions, bmi_risk * 0.80])
+    
+    def _risk_bounds(self, rows):
+        """
+        Early-exit bounds with the same blend as get_risk_scores. The model
+        part depends on the predicted class, so the bounds cover every class
+        that can still end up on top
+        """
+        bmi_risk = self._bmi_risks(rows)
+        class_risk = CLASS_RISK_MAPPING[self._anytime_forest().classes]
         
-        return round(final_risk, 2)
+        def risk_bounds(active, low, high):
+            possible = high >= low.max(axis=1, keepdims=True)
+            model_low = np.where(possible, class_risk, np.inf).min(axis=1)
+            model_high = np.where(possible, class_risk, -np.inf).max(axis=1)
+            return tuple(self._blend_risks(bmi_risk[active], model_risk)
+                         for model_risk in (model_low, model_high))
+        return risk_bounds
 
 
 if __name__ == "__main__":
@@ -0,0 +1,303 @@
+"""
+Forest pruning toolkit
+Shrinks a fitted RandomForestClassifier after training: optionally caps tree
+depth, then greedily picks the smallest subset of trees whose held-out
+accuracy or AUC stays within a tolerance of the full forest. Fewer, shallower
+trees mean proportionally less work per prediction.
+"""
+import copy
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+try:
+    from .inference import forest_predict
+    from .forest_engine import compile_forest
+except ImportError:
+    from inference import forest_predict
+    from forest_engine import compile_forest
+
+
+# Training data of each model: (dataset file, target column)
+DATASETS = {
+    'diabetes': ('diabetes.csv', 'Outcome'),
+    'heart': ('heart.csv', 'target'),
+    'hypertension': ('hypertension_dataset.csv', 'Hypertension'),
+    'obesity': ('obesity.csv', 'NObeyesdad'),
+}
+
+METRICS = ('accuracy', 'auc')
+
+
+def load_holdout(name, wrapper, dataset_dir='dataset'):
+    """
+    Rebuild the held-out test split a model wrapper was evaluated on in train()
+
+    Args:
+        name (str): 'diabetes', 'heart', 'hypertension' or 'obesity'
+        wrapper: Loaded model wrapper (used for feature order / encoding)
+        dataset_dir (str): Directory holding the dataset CSVs
+
+    Returns:
+        tuple: (X_test, y_test) as encoded feature matrix and label array
+    """
+    filename, target = DATASETS[name]
+    df = pd.read_csv(os.path.join(dataset_dir, filename))
+    X = df.drop(target, axis=1)
+    y = df[target]
+
+    if getattr(wrapper, 'encoder', None) is not None:
+        X = wrapper.encoder.transform(X)
+        y = y.astype('category').cat.codes
+    else:
+        X = X[wrapper.feature_names].to_numpy(dtype=float)
+
+    # Same split as the wrappers' train()
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return X_test, np.asarray(y_test)
+
+
+def truncate_tree(estimator, max_depth):
+    """
+    Copy of a fitted decision tree with every branch cut at max_depth
+
+    Nodes at the cap become leaves predicting their training class
+    distribution; nodes below them are dropped.
+    """
+    state = estimator.tree_.__getstate__()
+    nodes, values = state['nodes'], state['values']
+    if state['max_depth'] <= max_depth:
+        return estimator
+
+    # Walk the tree breadth-first, keeping nodes down to the cap
+    kept, depth = [0], {0: 0}
+    for node in kept:
+        left, right = nodes['left_child'][node], nodes['right_child'][node]
+        if left != -1 and depth[node] < max_depth:
+            for child in (left, right):
+                depth[child] = depth[node] + 1
+                kept.append(child)
+
+    new_index = np.full(len(nodes), -1, dtype=np.intp)
+    new_index[kept] = np.arange(len(kept))
+    new_nodes = nodes[kept].copy()
+
+    cut = np.array([depth[node] >= max_depth for node in kept]) & (new_nodes['left_child'] != -1)
+    internal = new_nodes['left_child'] != -1
+    new_nodes['left_child'][internal] = new_index[new_nodes['left_child'][internal]]
+    new_nodes['right_child'][internal] = new_index[new_nodes['right_child'][internal]]
+    for field, leaf_value in (('left_child', -1), ('right_child', -1), ('feature', -2), ('threshold', -2)):
+        new_nodes[field][cut] = leaf_value
+
+    truncated = copy.deepcopy(estimator)
+    truncated.tree_.__setstate__({
+        **state,
+        'max_depth': max_depth,
+        'node_count': len(kept),
+        'nodes': new_nodes,
+        'values': np.ascontiguousarray(values[kept])
+    })
+    return truncated
+
+
+def score_probabilities(metric, y, probabilities, classes):
+    """Accuracy or (one-vs-rest) ROC AUC of averaged class probabilities"""
+    if metric == 'accuracy':
+        return accuracy_score(y, classes.take(np.argmax(probabilities, axis=1)))
+    if metric == 'auc':
+        if len(classes) == 2:
+            return roc_auc_score(y, probabilities[:, 1])
+        return roc_auc_score(y, probabilities, multi_class='ovr', labels=classes)
+    raise ValueError(f"Unknown metric: {metric}. Choose from: {', '.join(METRICS)}")
+
+
+def greedy_tree_order(tree_probabilities, y, classes, metric='accuracy', node_counts=None):
+    """
+    Greedy forward ordering of trees by ensemble score
+
+    Each step adds the tree that maximizes the score of the averaged
+    probabilities, preferring smaller trees on ties.
+
+    Args:
+        tree_probabilities (np.ndarray): (n_trees, n_rows, n_classes) per-tree predictions
+        y (np.ndarray): Labels
+        classes (np.ndarray): Class labels in probability column order
+        metric (str): 'accuracy' or 'auc'
+        node_counts (np.ndarray): Optional tree sizes used to break ties
+
+    Returns:
+        tuple: (tree indices in selection order, score after each addition)
+    """
+    n_trees = len(tree_probabilities)
+    if node_counts is None:
+        node_counts = np.zeros(n_trees)
+
+    order, scores = [], []
+    remaining = list(range(n_trees))
+    total = np.zeros_like(tree_probabilities[0])
+
+    while remaining:
+        candidates = (total[None] + tree_probabilities[remaining]) / (len(order) + 1)
+        if metric == 'accuracy':
+            predictions = classes.take(np.argmax(candidates, axis=2))
+            candidate_scores = (predictions == y[None]).mean(axis=1)
+        else:
+            candidate_scores = np.array([score_probabilities(metric, y, p, classes) for p in candidates])
+
+        ties = np.flatnonzero(candidate_scores == candidate_scores.max())
+        best = remaining[ties[np.argmin(node_counts[np.array(remaining)[ties]])]]
+
+        order.append(best)
+        scores.append(float(candidate_scores.max()))
+        remaining.remove(best)
+        total += tree_probabilities[best]
+
+    return order, np.array(scores)
+
+
+def prefix_scores(tree_probabilities, order, y, classes, metric='accuracy'):
+    """Score of the ensemble of the first k trees of order, for every k"""
+    running = np.cumsum(tree_probabilities[order], axis=0)
+    running /= np.arange(1, len(order) + 1)[:, None, None]
+    return np.array([score_probabilities(metric, y, p, classes) for p in running])
+
+
+def prune_forest(model, X_val, y_val, tolerance=0.01, max_depth=None, metric='accuracy'):
+    """
+    Smallest greedy subset of (optionally depth-capped) trees within tolerance
+
+    The held-out data is split in half: trees are ordered greedily on one half
+    and the subset must stay within tolerance of the full forest on both, so
+    the selection cannot simply overfit the rows it was picked on.
+
+    Args:
+        model: Fitted sklearn RandomForestClassifier
+        X_val, y_val: Held-out data
+        tolerance (float): Allowed drop of the held-out metric vs the full forest
+        max_depth (int): Optional depth cap applied to every tree first
+        metric (str): 'accuracy' or 'auc'
+
+    Returns:
+        tuple: (pruned RandomForestClassifier, info dict with 'baseline' and
+                'score' on the full held-out set, 'trees' and 'within_tolerance')
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Choose from: {', '.join(METRICS)}")
+
+    classes = model.classes_
+    X_val = np.ascontiguousarray(X_val, dtype=np.float32)
+    y_val = np.asarray(y_val)
+
+    estimators = model.estimators_
+    if max_depth is not None:
+        estimators = [truncate_tree(estimator, max_depth) for estimator in estimators]
+
+    tree_probabilities = np.stack([
+        estimator.tree_.predict(X_val)[:, :model.n_classes_] for estimator in estimators
+    ])
+    node_counts = np.array([estimator.tree_.node_count for estimator in estimators])
+    full_probabilities = forest_predict(model, X_val).probabilities
+
+    _, counts = np.unique(y_val, return_counts=True)
+    select_rows, check_rows = train_test_split(
+        np.arange(len(y_val)), test_size=0.5, random_state=42,
+        stratify=y_val if counts.min() >= 2 else None
+    )
+
+    order, select_scores = greedy_tree_order(tree_probabilities[:, select_rows], y_val[select_rows],
+                                             classes, metric, node_counts)
+    check_scores = prefix_scores(tree_probabilities[:, check_rows], order, y_val[check_rows],
+                                 classes, metric)
+
+    acceptable = np.ones(len(order), dtype=bool)
+    for rows, scores in ((select_rows, select_scores), (check_rows, check_scores)):
+        baseline = score_probabilities(metric, y_val[rows], full_probabilities[rows], classes)
+        acceptable &= scores >= baseline - tolerance
+
+    within_tolerance = bool(acceptable.any())
+    n_kept = int(np.argmax(acceptable)) + 1 if within_tolerance else len(order)
+
+    pruned = copy.copy(model)
+    pruned.estimators_ = [estimators[i] for i in order[:n_kept]]
+    pruned.n_estimators = n_kept
+    if max_depth is not None:
+        pruned.max_depth = max_depth
+
+    pruned_probabilities = tree_probabilities[order[:n_kept]].mean(axis=0)
+    info = {
+        'baseline': float(score_probabilities(metric, y_val, full_probabilities, classes)),
+        'score': float(score_probabilities(metric, y_val, pruned_probabilities, classes)),
+        'trees': n_kept,
+        'within_tolerance': within_tolerance
+    }
+    return pruned, info
+
+
+def latency_percentiles(model, X, engine='flat', max_rows=200):
+    """
+    Single-row prediction latency over held-out rows
+
+    Args:
+        model: Fitted sklearn RandomForestClassifier
+        X: Encoded feature matrix
+        engine (str): 'sklearn' (fused traversal) or a compiled engine
+        max_rows (int): Number of rows to time
+
+    Returns:
+        tuple: (p50, p99) latency in microseconds
+    """
+    if engine == 'sklearn':
+        predict = lambda row: forest_predict(model, row)
+    else:
+        predict = compile_forest(model, engine).predict
+
+    rows = np.asarray(X, dtype=float)[:max_rows]
+    predict(rows[:1])  # warm-up
+    timings = []
+    for i in range(len(rows)):
+        start = time.perf_counter()
+        predict(rows[i:i + 1])
+        timings.append(time.perf_counter() - start)
+
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+    return float(p50), float(p99)
+
+
+def pruning_report(model, pruned, X_val, y_val, info, metric='accuracy', engine='flat'):
+    """
+    Summary of a pruning run: trees kept, depth, held-out quality and latency
+
+    Returns:
+        dict: JSON-serializable report
+    """
+    classes = model.classes_
+    X_val = np.ascontiguousarray(X_val, dtype=np.float32)
+    full_proba = forest_predict(model, X_val).probabilities
+    pruned_proba = forest_predict(pruned, X_val).probabilities
+    full_accuracy = score_probabilities('accuracy', y_val, full_proba, classes)
+    pruned_accuracy = score_probabilities('accuracy', y_val, pruned_proba, classes)
+    full_p50, full_p99 = latency_percentiles(model, X_val, engine)
+    pruned_p50, pruned_p99 = latency_percentiles(pruned, X_val, engine)
+
+    return {
+        'metric': metric,
+        'trees_total': len(model.estimators_),
+        'trees_kept': len(pruned.estimators_),
+        'max_depth_before': max(e.tree_.max_depth for e in model.estimators_),
+        'max_depth_after': max(e.tree_.max_depth for e in pruned.estimators_),
+        'nodes_before': int(sum(e.tree_.node_count for e in model.estimators_)),
+        'nodes_after': int(sum(e.tree_.node_count for e in pruned.estimators_)),
+        f'{metric}_before': info['baseline'],
+        f'{metric}_after': info['score'],
+        'accuracy_before': float(full_accuracy),
+        'accuracy_after': float(pruned_accuracy),
+        'accuracy_delta': float(pruned_accuracy - full_accuracy),
+        'within_tolerance': bool(info['within_tolerance']),
+        'engine': engine,
+        'latency_p50_us': [full_p50, pruned_p50],
+        'latency_p99_us': [full_p99, pruned_p99],
+    }
@@ -0,0 +1,69 @@
+"""
+Quick-check model tier
+Small, shallow forests trained only on the features the quick assessment
+actually collects (age, gender, height, weight, blood pressure, glucose,
+cholesterol), so quick checks do not run the full models on mostly default
+inputs.
+"""
+import os
+
+try:
+    from .diabetes_model import DiabetesModel
+    from .heart_model import HeartModel
+    from .hypertension_model import HypertensionModel
+    from .obesity_model import ObesityModel
+except ImportError:
+    from diabetes_model import DiabetesModel
+    from heart_model import HeartModel
+    from hypertension_model import HypertensionModel
+    from obesity_model import ObesityModel
+
+
+# Model features derived by FeatureMapper from the quick-check fields only
+QUICK_FEATURES = {
+    'diabetes': ['Glucose', 'BloodPressure', 'BMI', 'Age'],
+    'heart': ['age', 'sex', 'trestbps', 'chol'],
+    'hypertension': ['Age', 'BMI', 'Cholesterol', 'Systolic_BP', 'Diastolic_BP', 'Glucose', 'Gender'],
+    'obesity': ['Gender', 'Age', 'Height', 'Weight'],
+}
+
+# Few, shallow trees: a fraction of the full models' size and latency
+QUICK_FOREST_PARAMS = {'n_estimators': 25, 'max_depth': 6, 'min_samples_leaf': 5}
+
+QUICK_MODEL_DIR = 'saved_models/quick'
+
+# Wrapper class and training dataset of each model
+QUICK_MODELS = {
+    'diabetes': (DiabetesModel, 'diabetes.csv'),
+    'heart': (HeartModel, 'heart.csv'),
+    'hypertension': (HypertensionModel, 'hypertension_dataset.csv'),
+    'obesity': (ObesityModel, 'obesity.csv'),
+}
+
+
+def create_quick_models(engines=None, model_dir=QUICK_MODEL_DIR):
+    """
+    Instantiate the quick-tier wrappers (not yet loaded)
+
+    Args:
+        engines (dict): Inference engine per model name (default: sklearn)
+        model_dir (str): Directory of the quick-tier pickles
+
+    Returns:
+        dict: Model name -> wrapper trained on QUICK_FEATURES
+    """
+    engines = engines or {}
+    return {
+        name: model_class(
+            model_path=os.path.join(model_dir, f'{name}_model.pkl'),
+            engine=engines.get(name, 'sklearn'),
+            features=QUICK_FEATURES[name],
+            forest_params=QUICK_FOREST_PARAMS
+        )
+        for name, (model_class, _) in QUICK_MODELS.items()
+    }
+
+
+def dataset_path(name, dataset_dir='dataset'):
+    """Training dataset of a quick-tier model"""
+    return os.path.join(dataset_dir, QUICK_MODELS[name][1])
@@ -0,0 +1,264 @@
+"""
+Precomputed quick-check risk grid
+Risk scores of every condition evaluated offline over a quantized grid of the
+quick-check inputs and stored as compact N-d arrays (one per condition, over
+only the inputs that condition depends on). Serving reads them back with
+multilinear interpolation: a few array reads per condition, no model call.
+"""
+import bisect
+import itertools
+import json
+import os
+
+import numpy as np
+
+
+GENDERS = ('Male', 'Female')
+
+# Inputs each condition depends on for quick-check data (see FeatureMapper),
+# as (field, first node, last node, step). Lookups outside a range are clamped
+GRID_AXES = {
+    'diabetes': [('age', 20, 85, 5), ('bmi', 15, 60, 2.5), ('systolic_bp', 60, 125, 5),
+                 ('glucose', 40, 200, 10)],
+    'heart': [('age', 25, 80, 5), ('systolic_bp', 90, 200, 5), ('cholesterol', 120, 360, 10)],
+    'hypertension': [('age', 18, 84, 6), ('bmi', 12, 42, 3), ('cholesterol', 140, 315, 25),
+                     ('systolic_bp', 95, 185, 10), ('diastolic_bp', 60, 120, 10),
+                     ('glucose', 70, 196, 18)],
+    'obesity': [('age', 14, 62, 4), ('height', 140, 200, 5), ('obesity_bmi', 13, 55, 1)],
+}
+
+# Conditions whose models also take gender (a leading axis, not interpolated)
+GENDERED = ('heart', 'hypertension', 'obesity')
+
+# Values where clinical rules jump. Each rule switches at the value itself, so
+# a node just below it keeps interpolation from smearing the step
+BREAKPOINTS = {
+    # Age, blood pressure and cholesterol bands; the age-expected max heart
+    # rate bands at the default max heart rate of 150
+    'heart': {
+        'age': (20, 35, 220 - 150 / 0.85, 45, 220 - 150 / 0.90, 55, 65),
+        'systolic_bp': (120, 130, 140, 160, 180),
+        'cholesterol': (180, 200, 220, 240, 280),
+    },
+    # WHO BMI bands
+    'obesity': {'obesity_bmi': (18.5, 25, 27, 30, 35, 40)},
+}
+BREAKPOINT_GAP = 1e-3
+
+# Risks are stored as uint16 hundredths of a percent
+VALUE_SCALE = 100
+
+
+def grid_axis(start, stop, step, breakpoints=()):
+    """Sorted node values of one axis, with a node pair at every breakpoint"""
+    nodes = set(np.round(np.arange(start, stop + step / 2, step), 6).tolist())
+    for value in breakpoints:
+        if start < value <= stop:
+            nodes.update((value - BREAKPOINT_GAP, value))
+    return np.array(sorted(nodes))
+
+
+def quick_inputs(user_data):
+    """
+    Grid input values of a quick-check user, derived as FeatureMapper does
+
+    Args:
+        user_data (dict): age, gender, height (cm), weight (kg), systolic_bp,
+                          diastolic_bp, glucose and cholesterol
+
+    Returns:
+        dict: Values of every grid field
+    """
+    height, weight = user_data['height'], user_data['weight']
+    inputs = {field: user_data[field] for field in
+              ('age', 'systolic_bp', 'diastolic_bp', 'glucose', 'cholesterol', 'height')}
+    # Diabetes and hypertension use FeatureMapper.calculate_bmi (2 decimals);
+    # ObesityModel computes BMI from height and weight itself
+    inputs['bmi'] = user_data.get('bmi') or round(weight / (height / 100) ** 2, 2)
+    inputs['obesity_bmi'] = weight / (height / 100) ** 2
+    return inputs
+
+
+def grid_users(name, axes, gender):
+    """Quick-check user dicts for every node of a condition's grid, in C order"""
+    fields = [field for field, *_ in GRID_AXES[name]]
+    for point in itertools.product(*axes):
+        user = dict(zip(fields, point))
+        if gender is not None:
+            user['gender'] = gender
+        if 'obesity_bmi' in user:
+            height_m = user['height'] / 100
+            bmi = user.pop('obesity_bmi')
+            weight = bmi * height_m ** 2
+            # Land on the breakpoint side the node stands for
+            if weight / height_m ** 2 < bmi:
+                weight = np.nextafter(weight, np.inf)
+            user['weight'] = weight
+        yield user
+
+
+class RiskGrid:
+    """
+    Per-condition risk arrays with multilinear interpolation
+
+    `tables` maps condition -> {'fields', 'axes', 'values'}. values has one
+    dimension per axis, preceded by a gender dimension for GENDERED
+    conditions.
+    """
+
+    def __init__(self, tables, meta=None):
+        self.tables = tables
+        self.meta = meta or {}
+        # Plain lists: bisect on a list beats searchsorted for single lookups
+        self._axes = {name: [list(map(float, axis)) for axis in table['axes']]
+                      for name, table in tables.items()}
+
+    @property
+    def tier(self):
+        return self.meta.get('tier')
+
+    @property
+    def nbytes(self):
+        return sum(table['values'].nbytes for table in self.tables.values())
+
+    def _interpolate(self, name, point, gender):
+        """Multilinear interpolation of one condition at a point (clamped to the grid)"""
+        values = self.tables[name]['values']
+        if name in GENDERED:
+            if gender not in GENDERS:
+                raise ValueError(f"gender must be one of {', '.join(GENDERS)}, got {gender!r}")
+            values = values[GENDERS.index(gender)]
+
+        index, weights = [], []
+        for axis, x in zip(self._axes[name], point):
+            x = min(max(x, axis[0]), axis[-1])
+            i = min(bisect.bisect_right(axis, x) - 1, len(axis) - 2)
+            index.append(slice(i, i + 2))
+            weights.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+        # Collapse the 2 x 2 x ... corner block one axis at a time
+        block = values[tuple(index)].astype(np.float64)
+        for t in weights:
+            block = block[0] + (block[1] - block[0]) * t
+        return float(block) / VALUE_SCALE
+
+    def margin(self, name):
+        """Max interpolation error of a condition measured by the builder (0 if not measured)"""
+        conditions = self.meta.get('error', {}).get('conditions', {})
+        return conditions.get(name, {}).get('max_abs_error', 0.0)
+
+    def lookup(self, user_data, risk_thresholds=None):
+        """
+        Interpolated risk scores of a quick-check user
+
+        Args:
+            user_data (dict): Quick-check inputs, see quick_inputs()
+            risk_thresholds: Risk level edges (e.g. HealthScorer.risk_thresholds
+                             values). When given, scores closer to an edge than
+                             their condition's margin() may have the wrong
+                             level, and None is returned so the caller can
+                             assess the user live instead
+
+        Returns:
+            dict: Risk percentage per condition (heart, diabetes, hypertension,
+                  obesity), as expected by HealthScorer.generate_health_report,
+                  or None (see risk_thresholds)
+        """
+        inputs = quick_inputs(user_data)
+        gender = user_data.get('gender')
+        scores = {
+            name: round(self._interpolate(name, [inputs[field] for field in table['fields']], gender), 2)
+            for name, table in self.tables.items()
+        }
+        if risk_thresholds is not None:
+            for name, score in scores.items():
+                margin = self.margin(name)
+                if any(abs(score - edge) <= margin for edge in risk_thresholds):
+                    return None
+        return scores
+
+    def save(self, path):
+        """Write the grid to an .npz file"""
+        arrays = {'meta': np.array(json.dumps(self.meta))}
+        for name, table in self.tables.items():
+            arrays[f'{name}.values'] = table['values']
+            for field, axis in zip(table['fields'], table['axes']):
+                arrays[f'{name}.axis.{field}'] = axis
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a grid written by save()"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            tables = {}
+            for name, fields in meta['fields'].items():
+                tables[name] = {
+                    'fields': fields,
+                    'axes': [data[f'{name}.axis.{field}'] for field in fields],
+                    'values': data[f'{name}.values']
+                }
+        return cls(tables, meta)
+
+
+def load_risk_grid(path):
+    """
+    Load a risk grid unless it is missing or older than the models it was built from
+
+    Returns:
+        RiskGrid or None
+    """
+    if not os.path.exists(path):
+        return None
+    grid = RiskGrid.load(path)
+    grid_mtime = os.path.getmtime(path)
+    for model_path in grid.meta.get('model_paths', []):
+        if os.path.exists(model_path) and os.path.getmtime(model_path) > grid_mtime:
+            print(f"⚠️  Risk grid {path} is older than {model_path} - rebuild it with build_risk_grid.py")
+            return None
+    return grid
+
+
+def build_risk_grid(models, map_features, tier, chunk_size=100000):
+    """
+    Evaluate risk models over every grid node
+
+    Args:
+        models (dict): Condition -> model wrapper with get_risk_scores()
+        map_features (dict): Condition -> callable(user_data) returning the
+                             model's feature dict (FeatureMapper.map_to_*)
+        tier (str): Model tier the scores come from (stored in the metadata)
+        chunk_size (int): Nodes scored per batch
+
+    Returns:
+        RiskGrid: Grid holding the quantized scores
+    """
+    tables = {}
+    for name, axis_specs in GRID_AXES.items():
+        breakpoints = BREAKPOINTS.get(name, {})
+        axes = [grid_axis(start, stop, step, breakpoints.get(field, ()))
+                for field, start, stop, step in axis_specs]
+        genders = GENDERS if name in GENDERED else (None,)
+
+        scores = []
+        for gender in genders:
+            users = grid_users(name, axes, gender)
+            while True:
+                chunk = [map_features[name](user) for user in itertools.islice(users, chunk_size)]
+                if not chunk:
+                    break
+                scores.append(np.asarray(models[name].get_risk_scores(chunk), dtype=float))
+
+        shape = ([len(genders)] if name in GENDERED else []) + [len(axis) for axis in axes]
+        values = np.rint(np.concatenate(scores) * VALUE_SCALE).astype(np.uint16).reshape(shape)
+        tables[name] = {'fields': [field for field, *_ in axis_specs], 'axes': axes, 'values': values}
+
+    meta = {
+        'tier': tier,
+        'fields': {name: table['fields'] for name, table in tables.items()},
+        'model_paths': [model.model_path for model in models.values()],
+    }
+    return RiskGrid(tables, meta)
@@ -0,0 +1,107 @@
+"""
+Multi-process sharded health assessment
+Splits a population into contiguous shards and assesses them on a pool of
+worker processes, each holding its own HealthAssessmentPipeline. Feature
+mapping and scoring run in parallel without sharing one interpreter's GIL, and
+the columnar results are merged back in input order.
+
+Usage:
+    with ParallelAssessor(workers=4) as assessor:
+        results = assessor.batch_assess(patients).results
+"""
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pipeline import HealthAssessmentPipeline, BatchAssessment
+
+# The pipeline of the current worker process, loaded once by _init_worker
+_worker_pipeline = None
+
+
+def _init_worker(engine, bundle_path):
+    """Pool initializer: load the models once per worker"""
+    global _worker_pipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_pipeline = HealthAssessmentPipeline(engine=engine, bundle_path=bundle_path)
+
+
+def _assess_shard(shard, tier, reports):
+    """Assess one shard in a worker"""
+    return _worker_pipeline.batch_assess(shard, tier=tier, reports=reports, verbose=False)
+
+
+class ParallelAssessor:
+    """
+    Process pool of assessment pipelines with the batch_assess() interface
+
+    Can stand in for a HealthAssessmentPipeline wherever only batch_assess()
+    is used (e.g. bulk_assess.bulk_assess). Workers start with the assessor and
+    load the models from the bundle when one is given, so the memory-mapped
+    forests are shared between them.
+    """
+
+    def __init__(self, workers=None, engine='flat', bundle_path=None, shard_size=10000):
+        """
+        Args:
+            workers (int): Worker processes (default: one per CPU)
+            engine (str): Inference engine of the worker pipelines
+            bundle_path (str): Optional model bundle, see HealthAssessmentPipeline
+            shard_size (int): Most patients sent to a worker at a time
+        """
+        if shard_size < 1:
+            raise ValueError(f"shard_size must be positive, got {shard_size}")
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(engine, bundle_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes"""
+        self.executor.shutdown()
+
+    def shard_bounds(self, n_users):
+        """(start, stop) of contiguous shards: at least one per worker, at most shard_size rows each"""
+        n_shards = max(self.workers, -(-n_users // self.shard_size))
+        bounds = [n_users * i // n_shards for i in range(n_shards + 1)]
+        return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    def batch_assess(self, users, tier=None, reports=False, verbose=False):
+        """
+        Assess users on the worker pool
+
+        Args:
+            users: List of user data dicts, a DataFrame or a pyarrow Table
+            tier (str): Model tier, see HealthAssessmentPipeline.batch_assess()
+            reports (bool): Also return the per-user reports (pickled back from
+                            the workers, which costs more than the assessment)
+            verbose (bool): Print a one-line summary
+
+        Returns:
+            BatchAssessment: Results in input order, as batch_assess() returns them
+        """
+        if hasattr(users, 'to_pandas'):
+            users = users.to_pandas()
+        is_list = isinstance(users, list)
+        shards = [users[start:stop] if is_list else users.iloc[start:stop]
+                  for start, stop in self.shard_bounds(len(users))] or [users]
+
+        # map() yields in submission order, so the merge keeps the input order
+        parts = list(self.executor.map(_assess_shard, shards, [tier] * len(shards), [reports] * len(shards)))
+        results = pd.concat([part.results for part in parts])
+        if is_list:
+            results.index = pd.RangeIndex(len(results))
+        user_reports = [report for part in parts for report in part.reports] if reports else None
+
+        if verbose:
+            print(f"✅ Assessed {len(results)} users on {self.workers} worker processes")
+        return BatchAssessment(results, user_reports)
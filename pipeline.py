@@ -3,6 +3,15 @@ Health Assessment Pipeline - Integrates all models and generates comprehensive h
 """
 import sys
 import os
+import contextlib
+import hashlib
+import io
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 
 # Add models directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
@@ -11,42 +20,166 @@ from models.diabetes_model import DiabetesModel
 from models.heart_model import HeartModel
 from models.hypertension_model import HypertensionModel
 from models.obesity_model import ObesityModel
+from models.bundle import load_bundle
+from models.imputer import load_imputer
+from models.inference import top_drivers
+from models.quick_models import create_quick_models, dataset_path
 from feature_mapper import FeatureMapper
 from health_scorer import HealthScorer
 
+# Columnar results of batch_assess() plus the per-user reports (None if not requested)
+BatchAssessment = namedtuple('BatchAssessment', ['results', 'reports'])
+
+# Models in evaluation order, with the names used in progress output
+MODEL_LABELS = {'diabetes': 'diabetes', 'heart': 'heart disease',
+                'hypertension': 'hypertension', 'obesity': 'obesity'}
+
+# Report keys of HealthScorer.generate_health_report per model
+REPORT_KEYS = {'heart': 'heart_disease', 'diabetes': 'diabetes',
+               'hypertension': 'hypertension', 'obesity': 'obesity'}
+
+# Measurement error of home devices and self-reported values per user_data
+# field, as (kind, standard deviation): 'abs' in the field's units, 'rel' as a
+# fraction of the value
+MEASUREMENT_ERRORS = {
+    'systolic_bp': ('abs', 5),
+    'diastolic_bp': ('abs', 5),
+    'glucose': ('rel', 0.10),
+    'cholesterol': ('rel', 0.10),
+    'ldl': ('rel', 0.10),
+    'hdl': ('rel', 0.10),
+    'triglycerides': ('rel', 0.10),
+    'insulin': ('rel', 0.15),
+    'weight': ('abs', 1),
+    'resting_heart_rate': ('abs', 3),
+    'max_heart_rate': ('abs', 5),
+}
+
+
+def aged_profile(user_data, years):
+    """
+    User data as it would be `years` from now if nothing else changes
+    
+    A measured max heart rate falls with the age-expected maximum
+    (220 - age), keeping its share of it; the heart model's clinical rules
+    compare the two, so a fixed max heart rate would look better every year.
+    
+    Args:
+        user_data (dict): User health information, including 'age'
+        years (float): Years from now
+    
+    Returns:
+        dict: Copy of user_data with the aged fields
+    """
+    age = user_data['age']
+    aged = dict(user_data, age=age + years)
+    if user_data.get('max_heart_rate') is not None and age < 220 and years:
+        aged['max_heart_rate'] = round(user_data['max_heart_rate'] * (220 - age - years) / (220 - age), 1)
+    return aged
+
+
+
+def grid_health_report(risk_scores, user_data, feature_mapper, health_scorer=None):
+    """
+    Health report of risk scores looked up in a RiskGrid (models/risk_grid.py)
+    
+    The report has the keys of an assess_health() report that consumers read:
+    the grid stores no attributions, so every model's drivers are empty, and
+    feature_sets are the mapped features the grid was built from.
+    
+    Args:
+        risk_scores (dict): Risk score per model, from RiskGrid.lookup()
+        user_data (dict): Quick-check inputs the scores were looked up for
+        feature_mapper (FeatureMapper): Mapper the grid was built with
+        health_scorer (HealthScorer): Scorer to compose the report (default: a new one)
+    
+    Returns:
+        dict: Health assessment report with model_tier 'grid'
+    """
+    health_report = (health_scorer or HealthScorer()).generate_health_report(risk_scores)
+    for key in REPORT_KEYS.values():
+        health_report['individual_risks'][key]['drivers'] = []
+    health_report['user_data'] = user_data
+    health_report['feature_sets'] = feature_mapper.get_all_features(user_data)
+    health_report['model_tier'] = 'grid'
+    return health_report
 
 class HealthAssessmentPipeline:
     """
     Main pipeline that orchestrates the entire health assessment process
     """
     
-    def __init__(self, train_models=False):
+    def __init__(self, train_models=False, engine='sklearn', bundle_path=None, max_workers=0,
+                 imputer_path=None):
         """
         Initialize the pipeline
         
         Args:
             train_models (bool): If True, train all models. If False, load existing models.
+            engine (str or dict): Inference engine, 'sklearn', 'flat' (compiled
+                                  flat-array forests) or 'compact'/'compact8' (quantized
+                                  forests with 16/8-bit leaves; the sklearn forests are
+                                  released after compiling to save memory). A dict
+                                  selects it per model, e.g. {'heart': 'flat'};
+                                  unlisted models use sklearn.
+            bundle_path (str): Optional memory-mapped model bundle (see
+                               build_model_bundle.py). When it exists and is newer
+                               than the pickles, all models are served from it with
+                               the flat engine instead of loading the pickles.
+            max_workers (int): Run the four models of assess_health() concurrently on a
+                               thread pool of this size, shared by all requests. 0 (the
+                               default) runs them one after another.
+            imputer_path (str): Optional nearest-neighbour imputer (see build_imputer.py).
+                                When it exists and is newer than the datasets, features
+                                the user did not supply are filled from the most similar
+                                training records instead of constant defaults.
         """
         print("🏥 Initializing Health Assessment Pipeline...")
         
+        if isinstance(engine, dict):
+            engines = {name: engine.get(name, 'sklearn') for name in ('diabetes', 'heart', 'hypertension', 'obesity')}
+        else:
+            engines = dict.fromkeys(('diabetes', 'heart', 'hypertension', 'obesity'), engine)
+        
         # Initialize models
-        self.diabetes_model = DiabetesModel()
-        self.heart_model = HeartModel()
-        self.hypertension_model = HypertensionModel()
-        self.obesity_model = ObesityModel()
+        self.diabetes_model = DiabetesModel(engine=engines['diabetes'])
+        self.heart_model = HeartModel(engine=engines['heart'])
+        self.hypertension_model = HypertensionModel(engine=engines['hypertension'])
+        self.obesity_model = ObesityModel(engine=engines['obesity'])
+        
+        # Small models trained on the quick-check fields only (see models/quick_models.py)
+        self.quick_models = create_quick_models(engines)
         
         # Initialize feature mapper and scorer
         self.feature_mapper = FeatureMapper()
         self.health_scorer = HealthScorer()
+        if imputer_path:
+            imputer = load_imputer(imputer_path)
+            if imputer is not None:
+                self.feature_mapper.use_imputer(imputer)
+                print(f"✅ Imputing missing inputs from {imputer_path}")
+        
+        # Tree traversal releases the GIL, so the models can overlap
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='health-model') if max_workers else None
         
         # Train or load models
         if train_models:
             self._train_all_models()
-        else:
+        elif not (bundle_path and self._load_bundle(bundle_path)):
             self._load_all_models()
+        self._load_quick_models(retrain=train_models)
+        self._compact_models()
+        # Stamped on every report, so reports of other models are never reused
+        self.model_version = self._model_version((bundle_path, imputer_path))
         
         print("✅ Pipeline initialized successfully!\n")
     
+    def close(self):
+        """Shut down the model thread pool (if any)"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+    
     def _train_all_models(self):
         """Train all models with their respective datasets"""
         print("\n🔄 Training all models...")
@@ -147,17 +280,158 @@ class HealthAssessmentPipeline:
             print(f"\n❌ Critical error during model initialization: {e}")
             raise
     
-    def assess_health(self, user_data, verbose=True):
+    def _load_quick_models(self, retrain=False):
+        """
+        Load the quick-check tier (retrained only when retrain is set)
+        
+        The quick tier is optional: if its models are missing or cannot be
+        loaded, every assessment uses the full models. Missing models are
+        built by `python train_all_models.py --tier quick`, not on startup.
+        """
+        try:
+            if retrain:
+                print("\n⚡ Training quick-check models...")
+                for name, model in self.quick_models.items():
+                    model.train(dataset_path(name))
+                return
+            missing = []
+            for name, model in self.quick_models.items():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not model.load_model():
+                        missing.append(name)
+            if missing:
+                print(f"⚠️  Quick-check models missing ({', '.join(missing)}) - run "
+                      "`python train_all_models.py --tier quick`. Using full models for all assessments")
+                self.quick_models = {}
+            else:
+                print("⚡ Quick-check models loaded")
+        except Exception as e:
+            print(f"⚠️  Quick-check models unavailable, using full models for all assessments: {e}")
+            self.quick_models = {}
+    
+    def _resolve_tier(self, user_data, tier=None):
+        """
+        Model tier serving an input
+        
+        Args:
+            user_data: User dict, or a DataFrame with one user per row
+            tier (str): 'quick' or 'full', or None to use the quick tier for
+                        inputs that only contain quick-check fields. 'quick'
+                        falls back to 'full' when the quick tier is unavailable
+        
+        Returns:
+            'quick' or 'full' for a user dict; for a DataFrame, a boolean array
+            that is True for the users served by the quick tier
+        """
+        if tier == 'quick' and not self.quick_models:
+            tier = 'full'
+        if tier is not None:
+            self._tier_models(tier)     # Rejects unknown tiers
+        batch = isinstance(user_data, pd.DataFrame)
+        if tier is None:
+            if not self.quick_models:
+                tier = 'full'
+            elif batch:
+                return self.feature_mapper.quick_input_mask(user_data)
+            else:
+                tier = 'quick' if self.feature_mapper.is_quick_input(user_data) else 'full'
+        return np.full(len(user_data), tier == 'quick') if batch else tier
+    
+    def _tier_models(self, tier):
+        """Models of a tier: 'full' or 'quick'"""
+        if tier == 'quick':
+            return self.quick_models
+        if tier != 'full':
+            raise ValueError(f"Unknown model tier: {tier}")
+        return {
+            'diabetes': self.diabetes_model,
+            'heart': self.heart_model,
+            'hypertension': self.hypertension_model,
+            'obesity': self.obesity_model
+        }
+    
+    def _compact_models(self):
+        """Replace the sklearn forests of models using a compact engine with quantized copies"""
+        for model in (self.diabetes_model, self.heart_model, self.hypertension_model, self.obesity_model,
+                      *self.quick_models.values()):
+            if model.engine.startswith('compact') and model.model is not None:
+                model.load_compiled(*model.bundle_entry(model.engine))
+    
+    def _model_version(self, extra_paths=()):
+        """
+        Short fingerprint of the served models: engine, file and modification
+        time of every model, plus those of the bundle and imputer files given
+        """
+        models = [self.diabetes_model, self.heart_model, self.hypertension_model,
+                  self.obesity_model, *self.quick_models.values()]
+        paths = [model.model_path for model in models] + [path for path in extra_paths if path]
+        stamps = [model.engine for model in models] + [
+            (path, os.path.getmtime(path) if os.path.exists(path) else None) for path in paths
+        ]
+        return hashlib.sha1(repr(stamps).encode()).hexdigest()[:12]
+    
+    def _load_bundle(self, bundle_path):
+        """
+        Load all models from a memory-mapped model bundle
+        
+        Returns:
+            bool: True if every model was loaded from the bundle, False if the
+                  bundle is missing, incomplete or older than the pickles
+        """
+        models = {
+            'diabetes': self.diabetes_model,
+            'heart': self.heart_model,
+            'hypertension': self.hypertension_model,
+            'obesity': self.obesity_model
+        }
+        
+        if not os.path.exists(bundle_path):
+            return False
+        
+        bundle_mtime = os.path.getmtime(bundle_path)
+        stale = [name for name, model in models.items()
+                 if os.path.exists(model.model_path) and os.path.getmtime(model.model_path) > bundle_mtime]
+        if stale:
+            print(f"⚠️  Model bundle is older than retrained models ({', '.join(stale)}) - loading pickles")
+            return False
+        
+        print(f"📦 Loading model bundle {bundle_path}...")
+        try:
+            bundle = load_bundle(bundle_path)
+        except Exception as e:
+            print(f"⚠️  Model bundle load failed: {e}")
+            return False
+        
+        missing = [name for name in models if name not in bundle]
+        if missing:
+            print(f"⚠️  Model bundle is missing: {', '.join(missing)} - loading pickles")
+            return False
+        
+        for name, model in models.items():
+            model.load_compiled(*bundle[name])
+        
+        print(f"✅ Loaded models from bundle: {', '.join(models)}")
+        return True
+    
+    def assess_health(self, user_data, verbose=True, tier=None):
         """
         Perform comprehensive health assessment
         
         Args:
             user_data (dict): User health information
             verbose (bool): If True, print detailed progress
+            tier (str): 'quick' or 'full' models. By default inputs that only
+                        contain quick-check fields use the quick tier
         
         Returns:
-            dict: Complete health assessment report
+            dict: Complete health assessment report; 'model_timings_ms' holds
+                  the inference time of each model, 'model_version' identifies
+                  the models (see _model_version) and every individual risk
+                  lists its 'drivers' (see _add_drivers)
         """
+        tier = self._resolve_tier(user_data, tier)
+        models = self._tier_models(tier)
+        
         if verbose:
             print("\n" + "="*80)
             print("🔍 ANALYZING HEALTH DATA...")
@@ -171,50 +445,299 @@ class HealthAssessmentPipeline:
         
         # Step 2: Get predictions from each model
         if verbose:
-            print("🤖 Step 2: Running predictions across all health models...")
+            print(f"🤖 Step 2: Running predictions across all health models ({tier} tier)...")
         
         risk_scores = {}
+        drivers = {}
+        model_timings = {}
+        
+        def score(name):
+            start = time.perf_counter()
+            risk, risk_drivers = models[name].explain_risk_score(features[name])
+            return risk, risk_drivers, (time.perf_counter() - start) * 1000
         
         try:
-            # Diabetes prediction
-            if verbose:
-                print("   ├─ Analyzing diabetes risk...")
-            risk_scores['diabetes'] = self.diabetes_model.get_risk_score(features['diabetes'])
-            
-            # Heart disease prediction
-            if verbose:
-                print("   ├─ Analyzing heart disease risk...")
-            risk_scores['heart'] = self.heart_model.get_risk_score(features['heart'])
-            
-            # Hypertension prediction
-            if verbose:
-                print("   ├─ Analyzing hypertension risk...")
-            risk_scores['hypertension'] = self.hypertension_model.get_risk_score(features['hypertension'])
-            
-            # Obesity prediction
-            if verbose:
-                print("   └─ Analyzing obesity risk...")
-            risk_scores['obesity'] = self.obesity_model.get_risk_score(features['obesity'])
+            if self.executor is not None:
+                if verbose:
+                    print("   └─ Analyzing diabetes, heart disease, hypertension and obesity risk concurrently...")
+                futures = {name: self.executor.submit(score, name) for name in MODEL_LABELS}
+                for name, future in futures.items():
+                    risk_scores[name], drivers[name], model_timings[name] = future.result()
+            else:
+                for name, label in MODEL_LABELS.items():
+                    if verbose:
+                        branch = '└─' if name == 'obesity' else '├─'
+                        print(f"   {branch} Analyzing {label} risk...")
+                    risk_scores[name], drivers[name], model_timings[name] = score(name)
         
         except Exception as e:
             print(f"\n❌ Error during prediction: {e}")
             raise
         
+        if verbose:
+            print("   ⏱️  " + " | ".join(f"{name} {ms:.1f} ms" for name, ms in model_timings.items()))
+        
         # Step 3: Calculate composite health score
         if verbose:
             print("\n📊 Step 3: Calculating composite health score...")
         
         health_report = self.health_scorer.generate_health_report(risk_scores)
+        self._add_drivers(health_report, drivers)
         
         # Step 4: Add user data to report
         health_report['user_data'] = user_data
         health_report['feature_sets'] = features
+        health_report['model_tier'] = tier
+        health_report['model_version'] = self.model_version
+        health_report['model_timings_ms'] = model_timings
+        # Unrounded model outputs, for assess_delta()
+        health_report['risk_scores'] = risk_scores
         
         if verbose:
             print("✅ Assessment complete!\n")
         
         return health_report
     
+    def assess_delta(self, previous_report, changed_fields, tier=None):
+        """
+        Re-assess after some inputs changed, rerunning only the affected models
+        
+        Models whose features do not depend on any changed field (see
+        FeatureMapper.dependencies), or whose features come out unchanged,
+        keep their previous score. The report is then recomposed as in
+        assess_health() and equals a full recomputation. A report from other
+        models (see model_version) or another tier is recomputed in full.
+        
+        Args:
+            previous_report (dict): Report from assess_health() or assess_delta()
+            changed_fields (dict): user_data keys with their new values; None
+                                   removes a field
+            tier (str): Model tier, see assess_health()
+        
+        Returns:
+            dict: Health assessment report; 'model_timings_ms' lists only the
+                  models that were rerun
+        """
+        user_data = dict(previous_report['user_data'])
+        for field, value in changed_fields.items():
+            if value is None:
+                user_data.pop(field, None)
+            else:
+                user_data[field] = value
+        
+        tier = self._resolve_tier(user_data, tier)
+        # Another tier means other models: nothing to reuse
+        previous_risks = previous_report['individual_risks']
+        if tier != previous_report['model_tier'] or 'risk_scores' not in previous_report or \
+                previous_report.get('model_version') != self.model_version or \
+                any('drivers' not in risk for risk in previous_risks.values()):
+            return self.assess_health(user_data, verbose=False, tier=tier)
+        models = self._tier_models(tier)
+        
+        features = dict(previous_report['feature_sets'])
+        risk_scores = dict(previous_report['risk_scores'])
+        drivers = {name: previous_risks[key]['drivers'] for name, key in REPORT_KEYS.items()}
+        model_timings = {}
+        for name in self.feature_mapper.dependent_models(changed_fields):
+            model_features = getattr(self.feature_mapper, f'map_to_{name}_features')(user_data)
+            if model_features == features[name]:
+                continue
+            start = time.perf_counter()
+            features[name] = model_features
+            risk_scores[name], drivers[name] = models[name].explain_risk_score(model_features)
+            model_timings[name] = (time.perf_counter() - start) * 1000
+        
+        health_report = self.health_scorer.generate_health_report(risk_scores)
+        self._add_drivers(health_report, drivers)
+        health_report['user_data'] = user_data
+        health_report['feature_sets'] = features
+        health_report['model_tier'] = tier
+        health_report['model_version'] = self.model_version
+        health_report['model_timings_ms'] = model_timings
+        health_report['risk_scores'] = risk_scores
+        return health_report
+    
+    @staticmethod
+    def _add_drivers(health_report, drivers):
+        """
+        Add each model's top risk drivers to the report's individual risks
+        
+        A driver is {'feature', 'contribution'}: the risk percentage points a
+        model input adds to (or, if negative, takes from) the score, from the
+        path attributions of the forest and the clinical rules (see the
+        models' explain_risk_scores).
+        """
+        for name, key in REPORT_KEYS.items():
+            health_report['individual_risks'][key]['drivers'] = drivers[name]
+    
+    def sensitivity(self, user_data, field, values, tier=None):
+        """
+        Risk curves over a sweep of one input ("what if my systolic BP were ...")
+        
+        All sweep points go through each model as one batch, and models that do
+        not depend on the field are evaluated once, so a sweep costs about as
+        much as a single assessment.
+        
+        Args:
+            user_data (dict): User health information
+            field (str): user_data key to sweep, e.g. 'systolic_bp'
+            values (list): Values of the field
+            tier (str): Model tier, see assess_health(). By default the tier
+                        the swept input routes to
+        
+        Returns:
+            dict: 'field', 'values', 'model_tier', per-condition 'risks' and
+                  'levels' (keyed like individual_risks) and the
+                  'composite_risk', 'health_score' and 'health_grade' curves
+        """
+        values = list(values)
+        if not values:
+            raise ValueError("values must not be empty")
+        users = [{**user_data, field: value} for value in values]
+        
+        tier = self._resolve_tier(users[0], tier)
+        
+        curves = self._curves(users, self.feature_mapper.dependent_models([field]), tier)
+        return {'field': field, 'values': values, 'model_tier': tier, **curves}
+    
+    def project(self, user_data, years=range(1, 11), tier=None):
+        """
+        Risk trajectories if nothing but age changes over the coming years
+        
+        Every projected year goes through each model as one batch, as in
+        sensitivity(). Derived inputs age along (see aged_profile()), and the
+        heart model derives the age-expected max heart rate from the aged age.
+        
+        Args:
+            user_data (dict): User health information, including 'age'
+            years (list): Years from now to project, e.g. range(1, 11)
+            tier (str): Model tier, see assess_health()
+        
+        Returns:
+            dict: 'years', 'ages', 'model_tier', per-condition 'risks' and
+                  'levels' (keyed like individual_risks) and the
+                  'composite_risk', 'health_score' and 'health_grade'
+                  trajectories
+        """
+        years = list(years)
+        if not years:
+            raise ValueError("years must not be empty")
+        if user_data.get('age') is None:
+            raise ValueError("Projecting risks needs the user's age")
+        users = [aged_profile(user_data, year) for year in years]
+        
+        tier = self._resolve_tier(user_data, tier)
+        
+        aged = self.feature_mapper.dependent_models(['age', 'max_heart_rate'])
+        curves = self._curves(users, aged, tier)
+        return {'years': years, 'ages': [user['age'] for user in users], 'model_tier': tier, **curves}
+    
+    def uncertainty(self, user_data, samples=1000, percentiles=(5, 50, 95), errors=None, seed=None,
+                    tier=None):
+        """
+        Percentile bands of every risk under measurement error of the inputs
+        
+        Draws `samples` perturbed copies of the measured inputs (normal errors,
+        see MEASUREMENT_ERRORS) and pushes them, with the exact input as an
+        extra first row, through each affected model as one batch. Models
+        that read no perturbed field are evaluated once.
+        
+        Args:
+            user_data (dict): User health information
+            samples (int): Perturbed copies drawn
+            percentiles (tuple): Percentiles of each band, 0-100
+            errors (dict): Override MEASUREMENT_ERRORS
+            seed (int): Random seed, for reproducible bands
+            tier (str): Model tier, see assess_health()
+        
+        Returns:
+            dict: 'samples', 'model_tier', 'perturbed' (field -> error
+                  standard deviation in the field's units), per-condition
+                  'risks' (keyed like individual_risks), 'composite_risk' and
+                  'health_score' - each {'score' for the exact input, 'mean',
+                  'p<percentile>': ...} - and 'health_grade' (grade -> share
+                  of the samples)
+        """
+        if samples < 1:
+            raise ValueError(f"samples must be positive, got {samples}")
+        errors = MEASUREMENT_ERRORS if errors is None else errors
+        tier = self._resolve_tier(user_data, tier)
+        models = self._tier_models(tier)
+        
+        rng = np.random.default_rng(seed)
+        n_rows = samples + 1
+        users = pd.DataFrame({field: [value] * n_rows for field, value in user_data.items()})
+        perturbed = {}
+        for field, (kind, size) in errors.items():
+            value = user_data.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float, np.number)):
+                continue
+            sd = size * abs(value) if kind == 'rel' else size
+            column = np.empty(n_rows)
+            column[0] = value
+            # Devices report no negative readings
+            column[1:] = np.maximum(rng.normal(value, sd, samples), 0)
+            users[field] = column
+            perturbed[field] = round(float(sd), 2)
+        
+        varying = self.feature_mapper.dependent_models(perturbed)
+        features = self.feature_mapper.get_all_feature_frames(users) if varying else {}
+        risk_scores = {}
+        for name, model in models.items():
+            if name in varying:
+                risk_scores[name] = np.asarray(model.get_risk_scores(features[name]), dtype=float)
+            else:
+                map_features = getattr(self.feature_mapper, f'map_to_{name}_features')
+                risk_scores[name] = np.full(n_rows, model.get_risk_score(map_features(user_data)))
+        batch = self.health_scorer.score_batch(risk_scores)
+        
+        def band(values):
+            values = np.asarray(values, dtype=float)
+            summary = {'score': round(float(values[0]), 2), 'mean': round(float(values[1:].mean()), 2)}
+            for q, value in zip(percentiles, np.percentile(values[1:], percentiles)):
+                summary[f'p{q:g}'] = round(float(value), 2)
+            return summary
+        
+        grades, counts = np.unique(batch['health_grade'][1:], return_counts=True)
+        return {
+            'samples': samples,
+            'model_tier': tier,
+            'perturbed': perturbed,
+            'risks': {key: band(risk_scores[name]) for name, key in REPORT_KEYS.items()},
+            'composite_risk': band(batch['composite_risk']),
+            'health_score': band(batch['health_score']),
+            'health_grade': {grade: round(count / samples, 4) for grade, count in zip(grades.tolist(), counts.tolist())}
+        }
+    
+    def _curves(self, users, varying, tier):
+        """
+        Risk, score and grade curves over variants of one user
+        
+        Args:
+            users (list): User data dicts that differ only in fields read by
+                          the `varying` models
+            varying (set): Models evaluated as one batch over all users; the
+                           others are evaluated once
+            tier (str): 'quick' or 'full'
+        """
+        models = self._tier_models(tier)
+        risk_scores = {}
+        for name, model in models.items():
+            map_features = getattr(self.feature_mapper, f'map_to_{name}_features')
+            if name in varying:
+                risk_scores[name] = model.get_risk_scores([map_features(user) for user in users])
+            else:
+                risk_scores[name] = np.full(len(users), model.get_risk_score(map_features(users[0])))
+        
+        batch = self.health_scorer.score_batch(risk_scores)
+        return {
+            'risks': {key: batch[f'{name}_risk'].tolist() for name, key in REPORT_KEYS.items()},
+            'levels': {key: batch[f'{name}_level'].tolist() for name, key in REPORT_KEYS.items()},
+            'composite_risk': batch['composite_risk'].tolist(),
+            'health_score': batch['health_score'].tolist(),
+            'health_grade': batch['health_grade'].tolist()
+        }
+    
     def print_report(self, health_report):
         """
         Print formatted health assessment report
@@ -224,43 +747,157 @@ class HealthAssessmentPipeline:
         """
         self.health_scorer.print_health_report(health_report)
     
-    def assess_and_report(self, user_data):
+    def assess_and_report(self, user_data, tier=None):
         """
         Convenience method: Assess health and print report
         
         Args:
             user_data (dict): User health information
+            tier (str): Model tier, see assess_health()
         
         Returns:
             dict: Health assessment report
         """
-        report = self.assess_health(user_data, verbose=True)
+        report = self.assess_health(user_data, verbose=True, tier=tier)
         self.print_report(report)
         return report
     
-    def batch_assess(self, users_data_list):
+    def assess_risk_levels(self, user_data, confidence=1.0, tier=None):
         """
-        Assess health for multiple users
+        Risk level per model with early-exit forest evaluation
+        
+        Trees stop being evaluated once the level can no longer change, so
+        this is cheaper than assess_health() when only the levels are needed.
         
         Args:
-            users_data_list (list): List of user data dictionaries
+            user_data (dict): User health information
+            confidence (float): 1 for exact levels, < 1 for earlier statistical exit
+            tier (str): Model tier, see assess_health()
         
         Returns:
-            list: List of health reports
+            dict: Model name -> {'level', 'score', 'low', 'high', 'trees'}; the
+                  score is an estimate guaranteed to lie in [low, high]
         """
-        print(f"\n🔄 Processing batch assessment for {len(users_data_list)} users...")
+        tier = self._resolve_tier(user_data, tier)
         
-        reports = []
-        for i, user_data in enumerate(users_data_list, 1):
-            print(f"\n{'='*80}")
-            print(f"Processing User {i}/{len(users_data_list)}")
-            print(f"{'='*80}")
-            
-            report = self.assess_health(user_data, verbose=False)
-            reports.append(report)
-            
-            print(f"✅ User {i} assessment complete. Health Score: {report['health_score']:.1f}/100")
+        features = self.feature_mapper.get_all_features(user_data)
+        levels = {}
+        for name, model in self._tier_models(tier).items():
+            result = model.anytime_risk(features[name], self.health_scorer.risk_thresholds,
+                                        self.health_scorer.risk_levels, confidence=confidence)
+            levels[name] = {
+                'level': result.level,
+                'score': round(float(result.score), 2),
+                'low': round(float(result.low), 2),
+                'high': round(float(result.high), 2),
+                'trees': int(result.trees)
+            }
+        return levels
+    
+    def batch_assess(self, users, tier=None, reports=True, verbose=True):
+        """
+        Assess health for many users at once
+        
+        Features are mapped column-wise, each model runs one batched inference
+        per tier and scores, levels and grades are computed with array
+        operations. Results match assess_health() user by user.
+        
+        Args:
+            users: List of user data dicts, a pandas DataFrame with one row per
+                   user, or a pyarrow Table (converted with to_pandas())
+            tier (str): 'quick' or 'full' models for every user. By default each
+                        user is routed as in assess_health()
+            reports (bool): Also build the per-user report dicts
+            verbose (bool): Print a one-line summary
         
+        Returns:
+            BatchAssessment: (results, reports)
+                - results: DataFrame with one row per user (same index as the
+                  input frame): '<condition>_risk' and '<condition>_level' per
+                  model, composite_risk, health_score, risk_level,
+                  health_grade and model_tier
+                - reports: list of assess_health() reports, or None
+        """
+        start_time = time.perf_counter()
+        user_dicts = users if isinstance(users, list) else None
+        if hasattr(users, 'to_pandas'):
+            users = users.to_pandas()
+        elif user_dicts is not None:
+            users = pd.DataFrame(users)
+        n_users = len(users)
+        
+        quick = self._resolve_tier(users, tier)
+        
+        features = self.feature_mapper.get_all_feature_frames(users)
+        risk_scores = {name: np.zeros(n_users) for name in REPORT_KEYS}
+        # Reports list risk drivers, which come from the same forest pass
+        drivers = {name: [None] * n_users for name in REPORT_KEYS} if reports else None
+        for tier_name, rows in (('quick', np.flatnonzero(quick)), ('full', np.flatnonzero(~quick))):
+            if len(rows) == 0:
+                continue
+            for name, model in self._tier_models(tier_name).items():
+                tier_features = features[name] if len(rows) == n_users else features[name].iloc[rows]
+                if not reports:
+                    risk_scores[name][rows] = model.get_risk_scores(tier_features)
+                    continue
+                risk_scores[name][rows], contributions = model.explain_risk_scores(tier_features)
+                names = model.driver_names
+                for row, row_contributions in zip(rows.tolist(), contributions):
+                    drivers[name][row] = top_drivers(row_contributions, names)
+        
+        batch = self.health_scorer.score_batch(risk_scores, recommendations=reports)
+        columns = {}
+        for name, key in REPORT_KEYS.items():
+            columns[f'{key}_risk'] = batch[f'{name}_risk']
+            columns[f'{key}_level'] = batch[f'{name}_level']
+        for key in ('composite_risk', 'health_score', 'risk_level', 'health_grade'):
+            columns[key] = batch[key]
+        columns['model_tier'] = np.where(quick, 'quick', 'full')
+        results = pd.DataFrame(columns, index=users.index)
+        
+        user_reports = None
+        if reports:
+            user_reports = self._batch_reports(users, user_dicts, features, risk_scores, drivers, results,
+                                               batch['recommendations'])
+        
+        if verbose:
+            elapsed = time.perf_counter() - start_time
+            print(f"✅ Assessed {n_users} users in {elapsed:.2f} s "
+                  f"({n_users / max(elapsed, 1e-9) * 60:,.0f} users/min)")
+        
+        return BatchAssessment(results, user_reports)
+    
+    def _batch_reports(self, users, user_dicts, features, risk_scores, drivers, results, recommendations):
+        """Per-user report dicts (as from assess_health) for a batch_assess() result"""
+        if user_dicts is None:
+            user_dicts = [{key: value for key, value in row.items()
+                           if not (value is None or (isinstance(value, float) and np.isnan(value)))}
+                          for row in users.to_dict('records')]
+        feature_rows = {name: frame.to_dict('records') for name, frame in features.items()}
+        columns = {key: results[key].tolist() for key in results.columns}
+        model_scores = {name: scores.tolist() for name, scores in risk_scores.items()}
+        
+        reports = []
+        for i, user_data in enumerate(user_dicts):
+            scores = {name: model_scores[name][i] for name in REPORT_KEYS}
+            reports.append({
+                'individual_risks': {
+                    key: {'score': columns[f'{key}_risk'][i], 'level': columns[f'{key}_level'][i],
+                          'drivers': drivers[name][i]}
+                    for name, key in REPORT_KEYS.items()
+                },
+                'composite_risk': columns['composite_risk'][i],
+                'health_score': columns['health_score'][i],
+                'risk_level': columns['risk_level'][i],
+                'health_grade': columns['health_grade'][i],
+                'recommendations': recommendations[i],
+                'weights_used': self.health_scorer.weights,
+                'user_data': user_data,
+                'feature_sets': {name: rows[i] for name, rows in feature_rows.items()},
+                'model_tier': columns['model_tier'][i],
+                'model_version': self.model_version,
+                'risk_scores': scores
+            })
         return reports
     
     def export_report_to_file(self, health_report, filename="health_report.txt"):
@@ -0,0 +1,143 @@
+"""
+Prune Trained Health Prediction Models
+Keeps the smallest greedy subset of trees (optionally depth-capped) whose
+held-out accuracy/AUC stays within a tolerance of the full forest, and saves
+the result in the same format as the original model files
+
+Usage:
+    python prune_models.py                              # all models, 1% accuracy tolerance
+    python prune_models.py heart obesity --max-depth 10
+    python prune_models.py --metric auc --tolerance 0.005 --replace
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+
+from models.diabetes_model import DiabetesModel
+from models.heart_model import HeartModel
+from models.hypertension_model import HypertensionModel
+from models.obesity_model import ObesityModel
+from models.pruning import METRICS, load_holdout, prune_forest, pruning_report
+
+MODELS = {
+    'diabetes': DiabetesModel,
+    'heart': HeartModel,
+    'hypertension': HypertensionModel,
+    'obesity': ObesityModel,
+}
+
+REPORT_PATH = 'saved_models/pruning_report.json'
+
+
+def prune_models(names=None, tolerance=0.01, max_depth=None, metric='accuracy',
+                 engine='flat', replace=False):
+    """
+    Prune the selected models and save drop-in artifacts
+
+    Args:
+        names (list): Models to prune (all by default)
+        tolerance (float): Allowed drop of the held-out metric
+        max_depth (int): Optional depth cap for every tree
+        metric (str): 'accuracy' or 'auc'
+        engine (str): Engine used for the latency measurements
+        replace (bool): Overwrite saved_models/<name>_model.pkl (the original is
+                        kept as <name>_model.unpruned.pkl) instead of writing
+                        <name>_model.pruned.pkl next to it
+
+    Returns:
+        dict: Pruning report per model
+    """
+    print("=" * 60)
+    print("Pruning Health Prediction Models")
+    print("=" * 60)
+    print(f"Metric: {metric} | tolerance: {tolerance} | max depth: {max_depth or 'unchanged'}\n")
+
+    reports = {}
+    for name in names or list(MODELS):
+        wrapper = MODELS[name]()
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = wrapper.load_model()
+        if not loaded:
+            print(f"⚠️  {name}: no saved model - run train_all_models.py first")
+            continue
+
+        X_val, y_val = load_holdout(name, wrapper)
+        original = wrapper.model
+        pruned, info = prune_forest(original, X_val, y_val, tolerance, max_depth, metric)
+        report = pruning_report(original, pruned, X_val, y_val, info, metric, engine)
+
+        print(f"{name}: {report['trees_kept']}/{report['trees_total']} trees, "
+              f"depth {report['max_depth_before']} -> {report['max_depth_after']}, "
+              f"nodes {report['nodes_before']} -> {report['nodes_after']}")
+        print(f"  {metric}: {report[f'{metric}_before']:.4f} -> {report[f'{metric}_after']:.4f} | "
+              f"accuracy delta {report['accuracy_delta']:+.4f}")
+        print(f"  latency ({engine}) p50 {report['latency_p50_us'][0]:.0f} -> "
+              f"{report['latency_p50_us'][1]:.0f} µs | p99 {report['latency_p99_us'][0]:.0f} -> "
+              f"{report['latency_p99_us'][1]:.0f} µs")
+
+        if not info['within_tolerance']:
+            print("  ❌ Even all trees miss the tolerance at this depth cap - not saved\n")
+            reports[name] = report
+            continue
+
+        original_path = wrapper.model_path
+        if replace:
+            backup_path = original_path.replace('.pkl', '.unpruned.pkl')
+            if not os.path.exists(backup_path):
+                shutil.copy2(original_path, backup_path)
+            output_path = original_path
+        else:
+            output_path = original_path.replace('.pkl', '.pruned.pkl')
+
+        wrapper.model = pruned
+        wrapper.model_path = output_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            wrapper.save_model()
+        report['artifact'] = output_path
+        reports[name] = report
+        print(f"  ✅ Saved to {output_path}\n")
+
+    # Keep earlier results for models not pruned in this run
+    all_reports = {}
+    if os.path.exists(REPORT_PATH):
+        with open(REPORT_PATH) as f:
+            all_reports = json.load(f)
+    all_reports.update(reports)
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(all_reports, f, indent=2)
+    print(f"Report written to {REPORT_PATH}")
+    if replace:
+        print("Rebuild the model bundle with: python build_model_bundle.py")
+
+    return reports
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Prune trained random forests")
+    parser.add_argument('models', nargs='*',
+                        help=f"Models to prune: {', '.join(MODELS)} (default: all)")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Allowed drop of the held-out metric (default: 0.01)")
+    parser.add_argument('--max-depth', type=int, default=None, help="Cap every tree at this depth")
+    parser.add_argument('--metric', choices=METRICS, default='accuracy')
+    parser.add_argument('--engine', choices=['sklearn', 'flat', 'compact'], default='flat',
+                        help="Engine used for latency measurements (default: flat)")
+    parser.add_argument('--replace', action='store_true',
+                        help="Overwrite the model files (originals kept as *.unpruned.pkl)")
+    args = parser.parse_args()
+    unknown = [name for name in args.models if name not in MODELS]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+
+    try:
+        prune_models(args.models, args.tolerance, args.max_depth, args.metric,
+                     args.engine, args.replace)
+    except Exception as e:
+        print(f"\n❌ Error during pruning: {e}")
+        sys.exit(1)
@@ -0,0 +1,42 @@
+"""
+Shared test setup
+Tests run from the repository root, where the models and datasets are found
+by relative paths, and are skipped when the scientific stack, the saved models
+or the datasets are missing
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+MODEL_FILES = {
+    'diabetes': 'saved_models/diabetes_model.pkl',
+    'heart': 'saved_models/heart_model.pkl',
+    'hypertension': 'saved_models/hypertension_model.pkl',
+    'obesity': 'saved_models/obesity_model.pkl',
+}
+
+
+def require_models():
+    """Skip the calling test unless every saved model exists"""
+    missing = [path for path in MODEL_FILES.values() if not os.path.exists(path)]
+    if missing:
+        pytest.skip(f"saved models missing ({', '.join(missing)}) - run train_all_models.py first")
+
+
+@pytest.fixture(scope='session')
+def pipeline():
+    """Pipeline on the compiled flat engine, built once per test run"""
+    pytest.importorskip('sklearn')
+    require_models()
+    from pipeline import HealthAssessmentPipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        health_pipeline = HealthAssessmentPipeline(engine='flat')
+    yield health_pipeline
+    health_pipeline.close()
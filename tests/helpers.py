@@ -0,0 +1,106 @@
+"""
+Inputs and data shared by the tests
+Kept apart from benchmark_models.py so that the tests do not depend on the
+benchmark script
+"""
+import os
+
+DATASETS = {
+    'diabetes': ('dataset/diabetes.csv', 'Outcome'),
+    'heart': ('dataset/heart.csv', 'target'),
+    'hypertension': ('dataset/hypertension_dataset.csv', 'Hypertension'),
+    'obesity': ('dataset/obesity.csv', 'NObeyesdad'),
+}
+
+
+def load_dataset_matrix(name, wrapper):
+    """Encoded feature matrix of a model's full training dataset, or None if missing"""
+    path, target = DATASETS[name]
+    if not os.path.exists(path):
+        return None
+    import pandas as pd
+    X = pd.read_csv(path).drop(target, axis=1)
+    if name in ('diabetes', 'heart'):
+        return X[wrapper.feature_names].to_numpy(dtype=float)
+    return wrapper._encode_batch(X)
+
+
+SAMPLE_USER = {
+    'age': 52, 'gender': 'Male', 'height': 178, 'weight': 92,
+    'systolic_bp': 142, 'diastolic_bp': 92, 'glucose': 126, 'cholesterol': 245,
+    'ldl': 155, 'hdl': 42, 'triglycerides': 195, 'resting_heart_rate': 78,
+    'max_heart_rate': 145, 'smoking_status': 'Former', 'alcohol_intake': 'Moderate',
+    'physical_activity': 'Low', 'sleep_hours': 5.5, 'stress_level': 'High',
+    'family_history_diabetes': 'yes', 'family_history_hypertension': 'Yes',
+    'insulin': 95, 'chest_pain_type': 1
+}
+
+# What the quick assessment collects
+QUICK_USER = {
+    'age': 52, 'gender': 'Male', 'height': 178, 'weight': 92,
+    'systolic_bp': 142, 'diastolic_bp': 92, 'glucose': 126, 'cholesterol': 245
+}
+
+# A valid value for every input the feature mappers read, different from
+# SAMPLE_USER's
+EDITED_VALUES = {
+    'age': 61, 'gender': 'Female', 'height': 165, 'weight': 80, 'bmi': 29.4,
+    'systolic_bp': 128, 'diastolic_bp': 84, 'blood_pressure': 88, 'resting_bp': 135,
+    'glucose': 105, 'fasting_glucose': 130, 'cholesterol': 190, 'ldl': 120, 'hdl': 55,
+    'triglycerides': 140, 'insulin': 120, 'skin_thickness': 25, 'diabetes_pedigree': 0.8,
+    'pregnancies': 2, 'resting_heart_rate': 66, 'max_heart_rate': 160, 'st_depression': 1.5,
+    'chest_pain_type': 3, 'resting_ecg': 1, 'slope_st_segment': 2, 'num_major_vessels': 1,
+    'thalassemia': 3, 'exercise_induced_angina': 'yes', 'sleep_hours': 8,
+    'smoking_status': 'Current', 'alcohol_intake': 'Heavy', 'physical_activity': 'High',
+    'stress_level': 'Low', 'salt_intake': 'High', 'family_history_hypertension': 'No',
+    'has_diabetes': 'Yes', 'family_history_diabetes': 'no', 'family_history_overweight': 'yes',
+    'frequent_high_caloric_food': 'yes', 'vegetable_consumption_frequency': 3,
+    'num_main_meals': 2, 'food_between_meals': 'Frequently', 'smokes': 'yes',
+    'daily_water_consumption': 3, 'calorie_monitoring': 'yes', 'physical_activity_frequency': 2,
+    'tech_usage_time': 0.5, 'alcohol_consumption': 'Sometimes', 'transportation_mode': 'Walking',
+}
+
+
+def random_user_data(rng):
+    """
+    A random user_data dict for property checks: any subset of the mapped
+    keys (aliases included), with numbers, mixed-case strings and values
+    on the feature thresholds
+    """
+    numbers = {
+        'age': (18, 90), 'height': (140, 200), 'weight': (40, 150), 'bmi': (15, 50),
+        'systolic_bp': (90, 200), 'diastolic_bp': (60, 120), 'blood_pressure': (60, 200),
+        'resting_bp': (90, 200), 'glucose': (60, 250), 'fasting_glucose': (110, 130),
+        'cholesterol': (120, 350), 'ldl': (50, 250), 'hdl': (20, 100), 'triglycerides': (50, 400),
+        'insulin': (0, 300), 'skin_thickness': (0, 60), 'pregnancies': (0, 10),
+        'diabetes_pedigree': (0, 2), 'max_heart_rate': (90, 200), 'resting_heart_rate': (45, 110),
+        'sleep_hours': (3, 10), 'st_depression': (0, 5), 'chest_pain_type': (0, 3),
+        'resting_ecg': (0, 2), 'slope_st_segment': (0, 2), 'num_major_vessels': (0, 3),
+        'thalassemia': (1, 3), 'vegetable_consumption_frequency': (1, 3), 'num_main_meals': (1, 4),
+        'daily_water_consumption': (1, 3), 'physical_activity_frequency': (0, 3), 'tech_usage_time': (0, 2),
+    }
+    choices = {
+        'gender': ['Male', 'Female', 'male', 'FEMALE', 'M', 'F', '1', '0'],
+        'family_history_diabetes': ['yes', 'no', 'Yes', 'NO'],
+        'exercise_induced_angina': ['yes', 'no', 'YES', 'No'],
+        'smoking_status': ['Never', 'Former', 'Current'],
+        'alcohol_intake': ['None', 'Moderate', 'Heavy'],
+        'physical_activity': ['Low', 'Moderate', 'High'],
+        'stress_level': ['Low', 'Moderate', 'High'], 'salt_intake': ['Low', 'Moderate', 'High'],
+        'family_history_hypertension': ['Yes', 'No'], 'has_diabetes': ['Yes', 'No'],
+        'family_history_overweight': ['yes', 'no'], 'frequent_high_caloric_food': ['yes', 'no'],
+        'food_between_meals': ['no', 'Sometimes', 'Frequently', 'Always'], 'smokes': ['yes', 'no'],
+        'calorie_monitoring': ['yes', 'no'], 'alcohol_consumption': ['no', 'Sometimes', 'Frequently'],
+        'transportation_mode': ['Public_Transportation', 'Walking', 'Automobile', 'Bike'],
+    }
+    user = {}
+    for key, (low, high) in numbers.items():
+        if rng.random() < 0.5:
+            value = rng.uniform(low, high)
+            # Whole numbers, one decimal (BMI rounding ties) or the fbs threshold
+            user[key] = [int(round(value)), round(value, 1), 120][rng.integers(3)] if key == 'fasting_glucose' \
+                else [int(round(value)), round(value, 1)][rng.integers(2)]
+    for key, options in choices.items():
+        if rng.random() < 0.5:
+            user[key] = options[rng.integers(len(options))]
+    return user
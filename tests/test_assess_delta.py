@@ -0,0 +1,58 @@
+"""
+assess_delta() equals a full assess_health() of the edited inputs, for every
+single-field edit and removal of every input the four models read
+"""
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+
+from feature_mapper import FeatureMapper
+from helpers import EDITED_VALUES, QUICK_USER, SAMPLE_USER
+
+FIELDS = sorted(set().union(*FeatureMapper().dependencies.values()))
+
+
+def edits(base):
+    """changed_fields of every single-field edit and removal from a base user"""
+    for field in FIELDS:
+        if field in EDITED_VALUES:
+            yield pytest.param({field: EDITED_VALUES[field]}, id=f'{field}=edit')
+        if field in base:
+            yield pytest.param({field: None}, id=f'{field}=None')
+
+
+def without_timings(report):
+    """Report without model_timings_ms, which differs between the two paths by design"""
+    return {key: value for key, value in report.items() if key != 'model_timings_ms'}
+
+
+def assert_delta_equals_full(pipeline, base, changed):
+    previous = pipeline.assess_health(base, verbose=False)
+    updated = {key: value for key, value in {**base, **changed}.items() if value is not None}
+    assert without_timings(pipeline.assess_delta(previous, changed)) == \
+        without_timings(pipeline.assess_health(updated, verbose=False))
+
+
+def test_every_mapped_input_can_be_edited():
+    assert set(FIELDS) <= set(EDITED_VALUES)
+
+
+@pytest.mark.parametrize('changed', list(edits(SAMPLE_USER)))
+def test_delta_from_full_report(pipeline, changed):
+    assert_delta_equals_full(pipeline, SAMPLE_USER, changed)
+
+
+@pytest.mark.parametrize('changed', list(edits(QUICK_USER)))
+def test_delta_from_quick_report(pipeline, changed):
+    assert_delta_equals_full(pipeline, QUICK_USER, changed)
+
+
+def test_delta_recomputes_reports_of_other_models(pipeline):
+    previous = pipeline.assess_health(SAMPLE_USER, verbose=False)
+    previous['model_version'] = 'retrained'
+    previous['risk_scores'] = dict.fromkeys(previous['risk_scores'], 0.0)
+    report = pipeline.assess_delta(previous, {'weight': 80})
+    assert set(report['model_timings_ms']) == set(previous['risk_scores'])
+    assert without_timings(report) == \
+        without_timings(pipeline.assess_health({**SAMPLE_USER, 'weight': 80}, verbose=False))
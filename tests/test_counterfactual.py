@@ -0,0 +1,63 @@
+"""
+Stop reasons of the counterfactual search, on a stand-in pipeline whose health
+score only depends on weight (150 - weight), so every outcome is known
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('numpy')
+
+from counterfactual import CounterfactualSearch
+from health_scorer import HealthScorer
+
+USER = {'weight': 100}  # health score 50, grade D
+
+
+class WeightScoredPipeline:
+    """batch_assess() of HealthAssessmentPipeline, scoring users by weight alone"""
+
+    def __init__(self):
+        self.scorer = HealthScorer()
+
+    def batch_assess(self, users, reports=True, verbose=True):
+        scores = [150.0 - user['weight'] for user in users]
+        results = pd.DataFrame({'health_score': scores,
+                                'health_grade': [self.scorer.get_health_grade(score) for score in scores]})
+        return SimpleNamespace(results=results, reports=None)
+
+
+def weight_search(bound=40, **kwargs):
+    """Search that may only lose weight, 2 kg per step down to bound"""
+    return CounterfactualSearch(WeightScoredPipeline(), numeric_actions={'weight': (-2, bound, 1.0)},
+                                category_actions={}, **kwargs)
+
+
+def test_max_steps_ends_the_search_early():
+    # Grade A needs 70 kg: 15 steps
+    result = weight_search(max_steps=5).search(USER, 'A')
+    assert result['stop_reason'] == 'max_steps'
+    assert not result['complete']
+    assert result['plans'] == []
+
+
+def test_running_out_of_candidates_is_a_complete_search():
+    # 90 kg is as low as weight may go, 5 steps short of grade A
+    result = weight_search(bound=90).search(USER, 'A')
+    assert result['stop_reason'] == 'no_candidates'
+    assert result['complete']
+    assert result['plans'] == []
+    assert result['evaluated'] == 1 + 5
+
+
+def test_plan_found_within_max_steps():
+    result = weight_search().search(USER, 'C')
+    assert result['complete']
+    assert [plan['changes'] for plan in result['plans']] == [{'weight': {'from': 100, 'to': 90}}]
+
+
+def test_user_at_target_needs_no_search():
+    result = weight_search().search(USER, 'D')
+    assert result['stop_reason'] == 'at_target'
+    assert result['complete'] and result['plans'] == []
@@ -0,0 +1,63 @@
+"""
+FeatureMapper.get_all_feature_frames() equals the per-user map_to_*_features
+on random inputs, with absent keys, None and NaN all meaning a missing input
+"""
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from feature_mapper import FeatureMapper
+from helpers import random_user_data
+
+MAPPER = FeatureMapper()
+KEYS = sorted(set().union(*MAPPER.dependencies.values()))
+
+
+def random_users(seed, n_users=500, blank_share=0.2):
+    """Random user dicts, some keys set to None and the rest dropped"""
+    rng = np.random.default_rng(seed)
+    users = []
+    for _ in range(n_users):
+        user = random_user_data(rng)
+        for key in KEYS:
+            if key not in user and rng.random() < blank_share:
+                user[key] = None
+        users.append(user)
+    return users
+
+
+def assert_frames_equal_dicts(frames, users):
+    for name, frame in frames.items():
+        expected = pd.DataFrame([getattr(MAPPER, f'map_to_{name}_features')(user) for user in users])
+        for column in frame.columns:
+            assert frame[column].tolist() == expected[column].tolist(), f'{name}.{column}'
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_frames_equal_dict_path(seed):
+    users = random_users(seed)
+    assert_frames_equal_dicts(MAPPER.get_all_feature_frames(pd.DataFrame(users)), users)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_none_is_missing_in_dicts(seed):
+    for user in random_users(seed, n_users=200, blank_share=0.5):
+        present = {key: value for key, value in user.items() if value is not None}
+        assert MAPPER.get_all_features(user) == MAPPER.get_all_features(present)
+        for name in MAPPER.compiled.models:
+            mapper = getattr(MAPPER, f'map_to_{name}_features')
+            assert mapper(user) == mapper(present)
+
+
+def test_nan_is_missing_in_frames():
+    users = random_users(0, n_users=200)
+    frame = pd.DataFrame(users)
+    # Object columns keep None; casting them to float turns it into NaN
+    numeric = [key for key in frame.columns
+               if all(value is None or isinstance(value, (int, float)) for value in frame[key])]
+    as_nan = frame.astype({key: float for key in numeric})
+    assert any(math.isnan(value) for key in numeric for value in as_nan[key])
+    assert_frames_equal_dicts(MAPPER.get_all_feature_frames(as_nan), users)
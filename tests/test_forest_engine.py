@@ -0,0 +1,80 @@
+"""
+Compiled forest engines against the sklearn forests they were exported from,
+over every row of each model's training dataset
+"""
+import contextlib
+import io
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('sklearn')
+
+from helpers import load_dataset_matrix
+from models.diabetes_model import DiabetesModel
+from models.forest_engine import CompactForest, FlatForest
+from models.heart_model import HeartModel
+from models.hypertension_model import HypertensionModel
+from models.obesity_model import ObesityModel
+
+WRAPPERS = {'diabetes': DiabetesModel, 'heart': HeartModel,
+            'hypertension': HypertensionModel, 'obesity': ObesityModel}
+
+
+@pytest.fixture(scope='module', params=sorted(WRAPPERS))
+def trained(request):
+    """(wrapper, encoded dataset) of one saved model"""
+    wrapper = WRAPPERS[request.param]()
+    if not os.path.exists(wrapper.model_path):
+        pytest.skip(f"{wrapper.model_path} missing - run train_all_models.py first")
+    with contextlib.redirect_stdout(io.StringIO()):
+        wrapper.load_model()
+    X = load_dataset_matrix(request.param, wrapper)
+    if X is None:
+        pytest.skip(f"dataset of {request.param} missing")
+    return wrapper, X
+
+
+def test_flat_forest_is_bit_identical(trained):
+    wrapper, X = trained
+    result = FlatForest.from_sklearn(wrapper.model).predict(X)
+    assert np.array_equal(result.probabilities, wrapper.model.predict_proba(X))
+    assert np.array_equal(result.classes, wrapper.model.predict(X))
+
+
+def threshold_probes(forest, n_features, n_rows=2000, seed=0):
+    """
+    float32 rows whose values sit on a split threshold of their feature or
+    on a neighbouring float32, where a rounded threshold would flip the split
+    """
+    rng = np.random.default_rng(seed)
+    internal = forest.left != np.arange(len(forest.feature))
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    for j in range(n_features):
+        thresholds = forest.threshold[internal & (forest.feature == j)].astype(np.float32)
+        if len(thresholds):
+            candidates = np.concatenate([thresholds, np.nextafter(thresholds, np.float32(np.inf)),
+                                         np.nextafter(thresholds, np.float32(-np.inf))])
+            X[:, j] = rng.choice(candidates, n_rows)
+    return X
+
+
+@pytest.mark.parametrize('leaf_bits', [16, 8])
+def test_compact_forest_routes_exactly(trained, leaf_bits):
+    wrapper, X = trained
+    flat = FlatForest.from_sklearn(wrapper.model)
+    compact = CompactForest.from_flat(flat, leaf_bits)
+    for rows in (X, threshold_probes(flat, X.shape[1])):
+        leaves = compact.apply(rows)
+        assert np.array_equal(leaves, flat.apply(rows))
+        assert np.array_equal(leaves - compact.roots, wrapper.model.apply(rows))
+
+
+@pytest.mark.parametrize('leaf_bits', [16, 8])
+def test_compact_forest_probability_bound(trained, leaf_bits):
+    wrapper, X = trained
+    compact = CompactForest.from_sklearn(wrapper.model, leaf_bits)
+    deviation = np.abs(compact.predict_proba(X) - wrapper.model.predict_proba(X)).max()
+    # Rounding every leaf to 1 / value_scale moves the tree average by at most half a step
+    assert deviation <= 0.5 / compact.value_scale + 1e-12
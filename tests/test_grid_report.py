@@ -0,0 +1,35 @@
+"""
+Reports served from the risk grid carry the keys consumers read from live
+assess_health() reports
+"""
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+pytest.importorskip('sklearn')
+
+from feature_mapper import FeatureMapper
+from helpers import QUICK_USER
+from pipeline import grid_health_report
+
+GRID_SCORES = {'heart': 31.5, 'diabetes': 48.25, 'hypertension': 62.0, 'obesity': 12.75}
+
+
+def test_grid_report_has_empty_drivers_and_feature_sets():
+    mapper = FeatureMapper()
+    report = grid_health_report(GRID_SCORES, QUICK_USER, mapper)
+    assert report['model_tier'] == 'grid'
+    assert report['user_data'] == QUICK_USER
+    assert report['feature_sets'] == mapper.get_all_features(QUICK_USER)
+    assert all(risk['drivers'] == [] for risk in report['individual_risks'].values())
+
+
+def test_grid_report_matches_live_report_shape(pipeline):
+    live = pipeline.assess_health(QUICK_USER, verbose=False)
+    grid = grid_health_report(GRID_SCORES, QUICK_USER, pipeline.feature_mapper)
+    assert grid['feature_sets'] == live['feature_sets']
+    assert grid['individual_risks'].keys() == live['individual_risks'].keys()
+    for key, risk in live['individual_risks'].items():
+        assert grid['individual_risks'][key].keys() == risk.keys()
+    # Grid reports lack only the live model bookkeeping
+    assert set(live) - set(grid) <= {'model_version', 'model_timings_ms', 'risk_scores'}
@@ -1,15 +1,23 @@
 """
 Train All Health Prediction Models
 Run this script to train all models and save them to the saved_models directory
+(--tier full or --tier quick trains one tier only)
 """
+import argparse
 from models.diabetes_model import DiabetesModel
 from models.heart_model import HeartModel
 from models.hypertension_model import HypertensionModel
 from models.obesity_model import ObesityModel
+from models.quick_models import QUICK_MODEL_DIR, create_quick_models, dataset_path
 import os
 
-def train_all_models():
-    """Train all health prediction models"""
+def train_all_models(quick=True):
+    """
+    Train all health prediction models
+    
+    Args:
+        quick (bool): Also train the quick-check tier
+    """
     print("=" * 60)
     print("Training All Health Prediction Models")
     print("=" * 60)
@@ -41,6 +49,11 @@ def train_all_models():
     obesity_accuracy = obesity_model.train('dataset/obesity.csv')
     print(f"✅ Obesity Model trained with accuracy: {obesity_accuracy:.4f}")
     
+    # Train the quick-check tier (small models on the quick assessment fields)
+    if quick:
+        print("\n5. Training Quick-Check Models...")
+        train_quick_models()
+    
     print("\n" + "=" * 60)
     print("✅ All models trained successfully!")
     print("=" * 60)
@@ -49,7 +62,20 @@ def train_all_models():
     print(f"  - Heart Disease Model: {heart_accuracy:.2%} accuracy")
     print(f"  - Hypertension Model: {hypertension_accuracy:.2%} accuracy")
     print(f"  - Obesity Model: {obesity_accuracy:.2%} accuracy")
-    print("\nModels saved to: saved_models/")
+    print("\nModels saved to: saved_models/" + (f" (quick-check tier: {QUICK_MODEL_DIR}/)" if quick else ""))
+
+def train_quick_models():
+    """Train the quick-check tier into saved_models/quick/"""
+    for name, model in create_quick_models().items():
+        model.train(dataset_path(name))
+    print(f"✅ Quick-check models saved to: {QUICK_MODEL_DIR}/")
 
 if __name__ == "__main__":
-    train_all_models()
+    parser = argparse.ArgumentParser(description="Train the health prediction models")
+    parser.add_argument('--tier', default='all', choices=['all', 'full', 'quick'],
+                        help="Models to train: both tiers (default), the full models or the quick-check tier")
+    args = parser.parse_args()
+    if args.tier == 'quick':
+        train_quick_models()
+    else:
+        train_all_models(quick=args.tier == 'all')
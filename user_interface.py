@@ -1,6 +1,7 @@
 """
 User Interface - Interactive CLI for collecting health information
 """
+from input_schema import InputSchema
 
 
 class UserInterface:
@@ -10,8 +11,9 @@ class UserInterface:
     
     def __init__(self):
         self.user_data = {}
+        self.schema = InputSchema()
     
-    def _get_input(self, prompt, default=None, input_type=str, validation=None):
+    def _get_input(self, prompt, default=None, input_type=str, validation=None, field=None):
         """
         Get validated input from user
         
@@ -20,6 +22,8 @@ class UserInterface:
             default: Default value if user presses Enter
             input_type: Type to convert input to (int, float, str)
             validation: Function to validate input
+            field (str): InputSchema field whose type and range the input
+                         must meet (replaces input_type and validation)
         
         Returns:
             Validated user input
@@ -33,6 +37,14 @@ class UserInterface:
                 if not user_input and default is not None:
                     return default
                 
+                # Check against the input schema shared with the web API
+                if field is not None:
+                    try:
+                        return self.schema.coerce(field, user_input)
+                    except ValueError as e:
+                        print(f"❌ Value {e}. Please try again.")
+                        continue
+                
                 # Convert to appropriate type
                 if input_type == int:
                     value = int(user_input)
@@ -90,28 +102,25 @@ class UserInterface:
         self.user_data['age'] = self._get_input(
             "Age (years)", 
             default=30, 
-            input_type=int,
-            validation=lambda x: 1 <= x <= 120
+            field='age'
         )
         
         self.user_data['gender'] = self._get_choice(
             "Gender",
-            choices=['Male', 'Female', 'Other'],
+            choices=['Male', 'Female'],
             default='Male'
         )
         
         self.user_data['height'] = self._get_input(
             "Height (cm)",
             default=170,
-            input_type=float,
-            validation=lambda x: 50 <= x <= 250
+            field='height'
         )
         
         self.user_data['weight'] = self._get_input(
             "Weight (kg)",
             default=70,
-            input_type=float,
-            validation=lambda x: 20 <= x <= 300
+            field='weight'
         )
         
         # Calculate and display BMI
@@ -122,8 +131,7 @@ class UserInterface:
             self.user_data['pregnancies'] = self._get_input(
                 "Number of pregnancies",
                 default=0,
-                input_type=int,
-                validation=lambda x: x >= 0
+                field='pregnancies'
             )
         else:
             self.user_data['pregnancies'] = 0
@@ -137,29 +145,25 @@ class UserInterface:
         self.user_data['systolic_bp'] = self._get_input(
             "Systolic Blood Pressure (mm Hg)",
             default=120,
-            input_type=int,
-            validation=lambda x: 70 <= x <= 200
+            field='systolic_bp'
         )
         
         self.user_data['diastolic_bp'] = self._get_input(
             "Diastolic Blood Pressure (mm Hg)",
             default=80,
-            input_type=int,
-            validation=lambda x: 40 <= x <= 130
+            field='diastolic_bp'
         )
         
         self.user_data['resting_heart_rate'] = self._get_input(
             "Resting Heart Rate (bpm)",
             default=70,
-            input_type=int,
-            validation=lambda x: 40 <= x <= 150
+            field='resting_heart_rate'
         )
         
         self.user_data['max_heart_rate'] = self._get_input(
             "Maximum Heart Rate during exercise (bpm)",
             default=150,
-            input_type=int,
-            validation=lambda x: 60 <= x <= 220
+            field='max_heart_rate'
         )
     
     def collect_blood_tests(self):
@@ -172,43 +176,37 @@ class UserInterface:
         self.user_data['glucose'] = self._get_input(
             "Fasting Blood Glucose (mg/dL)",
             default=100,
-            input_type=float,
-            validation=lambda x: 50 <= x <= 400
+            field='glucose'
         )
         
         self.user_data['cholesterol'] = self._get_input(
             "Total Cholesterol (mg/dL)",
             default=200,
-            input_type=float,
-            validation=lambda x: 100 <= x <= 500
+            field='cholesterol'
         )
         
         self.user_data['ldl'] = self._get_input(
             "LDL Cholesterol (mg/dL)",
             default=100,
-            input_type=float,
-            validation=lambda x: 40 <= x <= 300
+            field='ldl'
         )
         
         self.user_data['hdl'] = self._get_input(
             "HDL Cholesterol (mg/dL)",
             default=50,
-            input_type=float,
-            validation=lambda x: 20 <= x <= 100
+            field='hdl'
         )
         
         self.user_data['triglycerides'] = self._get_input(
             "Triglycerides (mg/dL)",
             default=150,
-            input_type=float,
-            validation=lambda x: 50 <= x <= 500
+            field='triglycerides'
         )
         
         self.user_data['insulin'] = self._get_input(
             "Insulin level (mu U/ml)",
             default=80,
-            input_type=float,
-            validation=lambda x: 0 <= x <= 300
+            field='insulin'
         )
     
     def collect_lifestyle(self):
@@ -238,8 +236,7 @@ class UserInterface:
         self.user_data['sleep_hours'] = self._get_input(
             "Average sleep duration (hours per night)",
             default=7,
-            input_type=float,
-            validation=lambda x: 0 <= x <= 24
+            field='sleep_hours'
         )
         
         self.user_data['stress_level'] = self._get_choice(
@@ -263,22 +260,19 @@ class UserInterface:
         self.user_data['vegetable_consumption_frequency'] = self._get_input(
             "Vegetable consumption frequency (1=rarely, 2=sometimes, 3=always)",
             default=2,
-            input_type=int,
-            validation=lambda x: 1 <= x <= 3
+            field='vegetable_consumption_frequency'
         )
         
         self.user_data['num_main_meals'] = self._get_input(
             "Number of main meals per day",
             default=3,
-            input_type=int,
-            validation=lambda x: 1 <= x <= 6
+            field='num_main_meals'
         )
         
         self.user_data['daily_water_consumption'] = self._get_input(
             "Daily water consumption (liters)",
             default=2,
-            input_type=float,
-            validation=lambda x: 0 <= x <= 10
+            field='daily_water_consumption'
         )
         
         self.user_data['frequent_high_caloric_food'] = 'yes' if self._get_yes_no(
@@ -326,8 +320,7 @@ class UserInterface:
         self.user_data['chest_pain_type'] = self._get_input(
             "Chest pain type (0=none, 1=typical angina, 2=atypical, 3=non-anginal)",
             default=0,
-            input_type=int,
-            validation=lambda x: 0 <= x <= 3
+            field='chest_pain_type'
         )
         
         self.user_data['exercise_induced_angina'] = 'yes' if self._get_yes_no(
@@ -337,15 +330,13 @@ class UserInterface:
         self.user_data['physical_activity_frequency'] = self._get_input(
             "Physical activity frequency per week (0-7 days)",
             default=3,
-            input_type=int,
-            validation=lambda x: 0 <= x <= 7
+            field='physical_activity_frequency'
         )
         
         self.user_data['tech_usage_time'] = self._get_input(
             "Technology usage time per day (hours)",
             default=2,
-            input_type=float,
-            validation=lambda x: 0 <= x <= 24
+            field='tech_usage_time'
         )
         
         self.user_data['transportation_mode'] = self._get_choice(
@@ -412,14 +403,14 @@ class UserInterface:
         
         try:
             # Essential information only
-            self.user_data['age'] = self._get_input("Age", default=30, input_type=int)
+            self.user_data['age'] = self._get_input("Age", default=30, field='age')
             self.user_data['gender'] = self._get_choice("Gender", ['Male', 'Female'], 'Male')
-            self.user_data['height'] = self._get_input("Height (cm)", default=170, input_type=float)
-            self.user_data['weight'] = self._get_input("Weight (kg)", default=70, input_type=float)
-            self.user_data['systolic_bp'] = self._get_input("Blood Pressure (systolic)", default=120, input_type=int)
-            self.user_data['diastolic_bp'] = self._get_input("Blood Pressure (diastolic)", default=80, input_type=int)
-            self.user_data['glucose'] = self._get_input("Blood Glucose (mg/dL)", default=100, input_type=float)
-            self.user_data['cholesterol'] = self._get_input("Cholesterol (mg/dL)", default=200, input_type=float)
+            self.user_data['height'] = self._get_input("Height (cm)", default=170, field='height')
+            self.user_data['weight'] = self._get_input("Weight (kg)", default=70, field='weight')
+            self.user_data['systolic_bp'] = self._get_input("Blood Pressure (systolic)", default=120, field='systolic_bp')
+            self.user_data['diastolic_bp'] = self._get_input("Blood Pressure (diastolic)", default=80, field='diastolic_bp')
+            self.user_data['glucose'] = self._get_input("Blood Glucose (mg/dL)", default=100, field='glucose')
+            self.user_data['cholesterol'] = self._get_input("Cholesterol (mg/dL)", default=200, field='cholesterol')
             
             # Set defaults for other fields
             self._set_defaults()
@@ -0,0 +1,5 @@
+"""
+Utilities package initialization
+Small helpers that depend on numpy only, shared by the models, the feature
+mapper and the health scorer
+"""
@@ -0,0 +1,29 @@
+"""
+Rounding helpers
+Python's round() semantics over numpy arrays, kept free of pandas and sklearn
+so the health scorer can use them without loading the models
+"""
+import numpy as np
+
+
+def round_array(values, digits, exact=None):
+    """
+    Python's round() over an array: numpy's rounding, redone where a value is
+    close enough to a decimal tie for numpy and round() to disagree
+
+    Args:
+        values: 1-D array of floats
+        digits (int): Decimals kept
+        exact: callable(i) returning the rounded value of row i near a tie
+               (default: round() of values[i])
+
+    Returns:
+        np.ndarray: Rounded values
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 10 ** digits
+    rounded = np.rint(scaled) / 10 ** digits
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in near_tie.tolist():
+        rounded[i] = round(float(values[i]), digits) if exact is None else exact(i)
+    return rounded